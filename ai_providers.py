@@ -1,11 +1,12 @@
 import asyncio
-import aiohttp
 import logging
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 import json
 import os
 from pathlib import Path
+from deadline import within_deadline
+from http_client import HttpClient
 
 @dataclass
 class AIConfig:
@@ -44,38 +45,61 @@ class AIConfig:
             self.fallback_enabled = os.getenv("FALLBACK_ENABLED", "true").lower() == "true"
 
 class BaseAIProvider:
-    def __init__(self, config: AIConfig):
+    def __init__(self, config: AIConfig, http: Optional[HttpClient] = None):
         self.config = config
-        self.session = None
+        self._owns_http = http is None
+        self.http = http or HttpClient()
+        # Models that rejected a response_format; they get the schema in the prompt only
+        self._unstructured_models = set()
         
     async def get_session(self):
-        """Get or create HTTP session"""
-        if not self.session or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=60)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+        """Get this provider's session on the shared connection pool"""
+        return await self.http.session(type(self).__name__, timeout=60)
     
     async def close(self):
-        """Close HTTP session safely"""
-        if self.session and not self.session.closed:
-            try:
-                await self.session.close()
-            except Exception as e:
-                logging.warning(f"Error closing session: {e}")
-            finally:
-                self.session = None
+        """Close the HTTP client, unless it is shared and closed by its owner"""
+        if self._owns_http:
+            await self.http.close()
     
     async def test_connection(self) -> Dict[str, Any]:
         """Test provider connection"""
         return {"status": "error", "message": "Not implemented"}
     
-    async def generate_response(self, prompt: str, model: str = None) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, model: str = None,
+                                json_schema: Optional[Dict[str, Any]] = None,
+                                max_tokens: int = 1000) -> Dict[str, Any]:
         """Generate response from AI provider"""
         return {"content": "Not implemented", "model": model}
+    
+    def _request_body(self, prompt: str, model: str, json_schema: Optional[Dict[str, Any]] = None,
+                      max_tokens: int = 1000) -> Dict[str, Any]:
+        """Chat completion request, constrained to ``json_schema`` where the model allows it"""
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+        if json_schema is not None:
+            data["temperature"] = 0.2
+            if model not in self._unstructured_models:
+                data["response_format"] = {
+                    "type": "json_schema",
+                    "json_schema": {"name": json_schema.get("title", "response"), "schema": json_schema}
+                }
+        return data
+    
+    def _rejected_response_format(self, status: int, data: Dict[str, Any]) -> bool:
+        """Whether a failed request should be retried without response_format"""
+        if status in (400, 422) and "response_format" in data:
+            logging.info(f"{data['model']} does not accept response_format; using prompt-only JSON")
+            self._unstructured_models.add(data["model"])
+            return True
+        return False
 
 class OpenAIProvider(BaseAIProvider):
-    def __init__(self, config: AIConfig):
-        super().__init__(config)
+    def __init__(self, config: AIConfig, http: Optional[HttpClient] = None):
+        super().__init__(config, http)
         self.api_key = config.openai_api_key
         self.base_url = "https://api.openai.com/v1"
         
@@ -100,7 +124,9 @@ class OpenAIProvider(BaseAIProvider):
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    async def generate_response(self, prompt: str, model: str = None) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, model: str = None,
+                                json_schema: Optional[Dict[str, Any]] = None,
+                                max_tokens: int = 1000) -> Dict[str, Any]:
         """Generate response using OpenAI"""
         if not self.api_key:
             raise Exception("No OpenAI API key provided")
@@ -114,12 +140,7 @@ class OpenAIProvider(BaseAIProvider):
                 "Content-Type": "application/json"
             }
             
-            data = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1000,
-                "temperature": 0.7
-            }
+            data = self._request_body(prompt, model, json_schema, max_tokens)
             
             async with session.post(f"{self.base_url}/chat/completions", 
                                    headers=headers, json=data) as response:
@@ -135,6 +156,8 @@ class OpenAIProvider(BaseAIProvider):
                     }
                 else:
                     error_text = await response.text()
+                    if self._rejected_response_format(response.status, data):
+                        return await self.generate_response(prompt, model, json_schema, max_tokens)
                     raise Exception(f"OpenAI API error {response.status}: {error_text}")
                     
         except Exception as e:
@@ -159,8 +182,8 @@ class OpenAIProvider(BaseAIProvider):
         return (total_tokens / 1000) * cost_per_1k
 
 class OpenRouterProvider(BaseAIProvider):
-    def __init__(self, config: AIConfig):
-        super().__init__(config)
+    def __init__(self, config: AIConfig, http: Optional[HttpClient] = None):
+        super().__init__(config, http)
         self.api_key = config.openrouter_api_key
         self.base_url = "https://openrouter.ai/api/v1"
         
@@ -191,7 +214,9 @@ class OpenRouterProvider(BaseAIProvider):
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    async def generate_response(self, prompt: str, model: str = None) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, model: str = None,
+                                json_schema: Optional[Dict[str, Any]] = None,
+                                max_tokens: int = 1000) -> Dict[str, Any]:
         """Generate response using OpenRouter"""
         if not self.api_key:
             raise Exception("No OpenRouter API key provided")
@@ -211,12 +236,7 @@ class OpenRouterProvider(BaseAIProvider):
                 logged_headers["Authorization"] = f"Bearer {masked_key}"
             logging.info(f"OpenRouter request headers: {logged_headers}")
             
-            data = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1000,
-                "temperature": 0.7
-            }
+            data = self._request_body(prompt, model, json_schema, max_tokens)
             
             async with session.post(f"{self.base_url}/chat/completions", 
                                    headers=headers, json=data) as response:
@@ -232,6 +252,8 @@ class OpenRouterProvider(BaseAIProvider):
                     }
                 else:
                     error_text = await response.text()
+                    if self._rejected_response_format(response.status, data):
+                        return await self.generate_response(prompt, model, json_schema, max_tokens)
                     raise Exception(f"OpenRouter API error {response.status}: {error_text}")
                     
         except Exception as e:
@@ -239,8 +261,8 @@ class OpenRouterProvider(BaseAIProvider):
             raise
 
 class LMStudioProvider(BaseAIProvider):
-    def __init__(self, config: AIConfig):
-        super().__init__(config)
+    def __init__(self, config: AIConfig, http: Optional[HttpClient] = None):
+        super().__init__(config, http)
         self.base_url = config.lmstudio_base_url
         self.model = config.lmstudio_model
         
@@ -257,7 +279,9 @@ class LMStudioProvider(BaseAIProvider):
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    async def generate_response(self, prompt: str, model: str = None) -> Dict[str, Any]:
+    async def generate_response(self, prompt: str, model: str = None,
+                                json_schema: Optional[Dict[str, Any]] = None,
+                                max_tokens: int = 1000) -> Dict[str, Any]:
         """Generate response using LM Studio"""
         model = model or self.model
         
@@ -265,12 +289,7 @@ class LMStudioProvider(BaseAIProvider):
             session = await self.get_session()
             headers = {"Content-Type": "application/json"}
             
-            data = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1000,
-                "temperature": 0.7
-            }
+            data = self._request_body(prompt, model, json_schema, max_tokens)
             
             async with session.post(f"{self.base_url}/v1/chat/completions", 
                                    headers=headers, json=data) as response:
@@ -286,6 +305,8 @@ class LMStudioProvider(BaseAIProvider):
                     }
                 else:
                     error_text = await response.text()
+                    if self._rejected_response_format(response.status, data):
+                        return await self.generate_response(prompt, model, json_schema, max_tokens)
                     raise Exception(f"LM Studio API error {response.status}: {error_text}")
                     
         except Exception as e:
@@ -293,21 +314,24 @@ class LMStudioProvider(BaseAIProvider):
             raise
 
 class AIProviderManager:
-    def __init__(self, config: AIConfig):
+    def __init__(self, config: AIConfig, http: Optional[HttpClient] = None):
         self.config = config
+        # Providers share one connection pool; a manager without one owns its own
+        self._owns_http = http is None
+        self.http = http or HttpClient()
         self.providers = {}
         self._initialize_providers()
     
     def _initialize_providers(self):
         """Initialize all available providers"""
         if self.config.openai_api_key:
-            self.providers["openai"] = OpenAIProvider(self.config)
+            self.providers["openai"] = OpenAIProvider(self.config, self.http)
         
         if self.config.openrouter_api_key:
-            self.providers["openrouter"] = OpenRouterProvider(self.config)
+            self.providers["openrouter"] = OpenRouterProvider(self.config, self.http)
         
         # LM Studio doesn't require API key
-        self.providers["lmstudio"] = LMStudioProvider(self.config)
+        self.providers["lmstudio"] = LMStudioProvider(self.config, self.http)
     
     def get_available_providers(self) -> List[str]:
         """Get list of available providers"""
@@ -319,16 +343,21 @@ class AIProviderManager:
             return {"status": "error", "message": f"Provider {provider_name} not available"}
         
         provider = self.providers[provider_name]
-        return await provider.test_connection()
+        return await within_deadline(provider.test_connection())
     
     async def generate_response(self, provider_name: str, prompt: str, 
-                              model: str = None) -> Dict[str, Any]:
-        """Generate response using specified provider"""
+                              model: str = None, json_schema: Optional[Dict[str, Any]] = None,
+                              max_tokens: int = 1000) -> Dict[str, Any]:
+        """Generate response using specified provider.
+
+        With ``json_schema`` the reply is requested as JSON matching it, using the
+        provider's structured output mode when the model supports one.
+        """
         if provider_name not in self.providers:
             raise Exception(f"Provider {provider_name} not available")
         
         provider = self.providers[provider_name]
-        return await provider.generate_response(prompt, model)
+        return await within_deadline(provider.generate_response(prompt, model, json_schema, max_tokens))
     
     async def close_all(self):
         """Close all provider sessions safely"""
@@ -337,4 +366,6 @@ class AIProviderManager:
                 await provider.close()
                 logging.info(f"Closed {provider_name} provider")
             except Exception as e:
-                logging.warning(f"Error closing {provider_name} provider: {e}")
\ No newline at end of file
+                logging.warning(f"Error closing {provider_name} provider: {e}")
+        if self._owns_http:
+            await self.http.close()
\ No newline at end of file
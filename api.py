@@ -13,6 +13,8 @@ from deep_character_researcher import DeepCharacterResearcher
 from config import ResearchConfig
 from typing import Dict, Any, Optional, List
 from storage import DocumentStore
+from async_storage import AsyncStorage
+from deadline import Deadline, DeadlineExceeded
 
 app = FastAPI()
 
@@ -44,30 +46,75 @@ def get_config_from_env():
         # Add more as needed
     )
 
+# Shared researcher and storage, created on first use and reused across requests
+_researcher: Optional[DeepCharacterResearcher] = None
+_api_storage: Optional[AsyncStorage] = None
+
+def get_researcher() -> DeepCharacterResearcher:
+    global _researcher
+    if _researcher is None:
+        _researcher = DeepCharacterResearcher(get_config_from_env())
+    return _researcher
+
+def get_async_store() -> AsyncStorage:
+    global _api_storage
+    if _api_storage is None:
+        config = get_config_from_env()
+        _api_storage = AsyncStorage(
+            get_store(),
+            max_workers=config.storage_max_workers,
+            max_pending=config.storage_max_pending
+        )
+    return _api_storage
+
+@app.on_event("shutdown")
+async def shutdown_storage():
+    if _researcher is not None:
+        await _researcher.cleanup()
+    if _api_storage is not None:
+        _api_storage.close()
+
 # Minimal wrapper to call research_character asynchronously
 async def perform_research(task_id: str, character: str, query: str):
-    config = get_config_from_env()
-    researcher = DeepCharacterResearcher(config)
+    # The shared researcher keeps its HTTP connection pool warm across tasks
+    researcher = get_researcher()
+    task = task_store[task_id]
     try:
-        # Mark as running
-        task_store[task_id]["status"] = "running"
-        # Simulate research and store result (replace with actual result as needed)
-        await researcher.research_character(character_name=character)
-        # For demonstration, store a dummy result
-        result = {"message": f"Research completed for {character}"}
-        task_store[task_id]["status"] = "completed"
-        task_store[task_id]["result"] = result
+        # Mark as running, unless cancelled before it started
+        if task["status"] == "started":
+            task["status"] = "running"
+        profile, run = await researcher.run_research(character, deadline=task["deadline"])
+        if run.cancelled:
+            task["status"] = "cancelled"
+        elif run.partial or run.profile_degraded:
+            task["status"] = "partial"
+        else:
+            task["status"] = "completed"
+        task["result"] = {
+            "message": f"Research {task['status']} for {character}",
+            "partial": run.partial or run.cancelled,
+            "profile_stored": profile is not None and not run.profile_degraded,
+            "documents_added": run.documents_added,
+            "queries_fetched": run.queries_fetched,
+        }
+    except DeadlineExceeded:
+        task["status"] = "cancelled" if task["deadline"].cancelled else "failed"
+        task["result"] = {"error": "Research stopped before any results were gathered"}
     except Exception as e:
         logging.error(f"Research failed: {e}")
-        task_store[task_id]["status"] = "failed"
-        task_store[task_id]["result"] = {"error": str(e)}
+        task["status"] = "failed"
+        task["result"] = {"error": str(e)}
 
 @app.post("/api/research", response_model=ResearchResponse)
 async def research_endpoint(request: ResearchRequest):
     task_id = str(uuid.uuid4())
     try:
-        # Register task as started
-        task_store[task_id] = {"status": "started", "result": None}
+        # Register task as started; its deadline bounds the whole run and lets it be cancelled
+        task_store[task_id] = {
+            "status": "started",
+            "result": None,
+            "deadline": Deadline(get_config_from_env().research_timeout or None)
+        }
         # Launch research as a background task
         asyncio.create_task(perform_research(task_id, request.character, request.query))
         return ResearchResponse(task_id=task_id, status="started")
@@ -82,13 +129,24 @@ async def get_research_status(task_id: str):
         raise HTTPException(status_code=404, detail="Task not found")
     return {"task_id": task_id, "status": task["status"]}
 
+@app.delete("/api/research/{task_id}")
+async def cancel_research(task_id: str):
+    """Stop a research task; documents found so far are still stored"""
+    task = task_store.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task["status"] in ("started", "running"):
+        task["deadline"].cancel()
+        task["status"] = "cancelling"
+    return {"task_id": task_id, "status": task["status"]}
+
 @app.get("/api/research/{task_id}/result")
 async def get_research_result(task_id: str):
     task = task_store.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task["status"] == "completed":
-        return {"task_id": task_id, "result": task["result"]}
+    if task["status"] in ("completed", "partial", "cancelled"):
+        return {"task_id": task_id, "status": task["status"], "result": task["result"]}
     elif task["status"] == "failed":
         return JSONResponse(status_code=500, content={"task_id": task_id, "error": task["result"]})
     else:
@@ -106,10 +164,11 @@ async def get_characters(
     Returns: id, name, years, era, shortDescription, portraitUrl, contemporaries
     """
     try:
-        config = get_config_from_env()
-        db_path = getattr(config, "db_path", "data/characters.sqlite")
-        store = DocumentStore(db_path)
-        characters = store.get_characters()
+        storage = get_async_store()
+        characters = await storage.get_characters()
+        all_docs = await asyncio.gather(*[
+            storage.get_character_documents(char.get("name", "")) for char in characters
+        ])
 
         # Prepare keyword list
         keyword_list = []
@@ -118,10 +177,9 @@ async def get_characters(
             keyword_list = [k.strip().lower() for k in keywords.replace(",", " ").split() if k.strip()]
 
         results = []
-        for char in characters:
+        for char, docs in zip(characters, all_docs):
             char_name = char.get("name", "")
             char_id = char.get("id")
-            docs = store.get_character_documents(char_name)
 
             # Aggregate metadata
             years = None
@@ -197,27 +255,92 @@ async def get_characters(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch characters: {e}")
 
+@app.get("/api/search")
+async def search_documents(
+    query: str = Query(..., description="Natural-language search query"),
+    characters: Optional[str] = Query(None, description="Comma-separated character names"),
+    source_type: Optional[str] = Query(None, description="Filter by source type, e.g. wikipedia"),
+    language: Optional[str] = Query(None, description="Filter by language code, e.g. it"),
+    domain: Optional[str] = Query(None, description="Filter by research domain"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Semantic search across characters. With VECTOR_INDEX_MODE=unified this is a
+    single filtered vector query over the whole gallery.
+    """
+    character_list = [c.strip() for c in characters.split(",") if c.strip()] if characters else None
+    results = await get_researcher().storage.search_across_characters(
+        query,
+        characters=character_list,
+        source_type=source_type,
+        language=language,
+        domain=domain,
+        limit=limit
+    )
+    return {"query": query, "results": results}
+
+@app.get("/api/storage/metrics")
+async def get_storage_metrics():
+    """Thread pool utilisation and per-operation timings for storage calls"""
+    metrics = {"api": get_async_store().get_metrics()}
+    if _researcher is not None:
+        metrics["researcher"] = _researcher.storage.get_metrics()
+        metrics["chat_log"] = _researcher.character_engine.chat_log.get_metrics()
+    return metrics
+
+@app.get("/api/http/metrics")
+async def get_http_metrics():
+    """Connection pool settings and per-component request, connection reuse and DNS cache counts"""
+    return get_researcher().http.get_metrics()
+
 # --- Chat API ---
 
 class ChatRequest(BaseModel):
     character: str
     message: str
+    session_id: Optional[str] = None  # Conversation to continue; without one the chat is stateless
 
 class ChatResponse(BaseModel):
     response: str
+    sources: List[Dict[str, str]] = []
+    session_id: Optional[str] = None
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     try:
-        config = get_config_from_env()
-        researcher = DeepCharacterResearcher(config)
-        response = await researcher.chat_with_character(request.character, request.message)
+        researcher = get_researcher()
+        # Without a session_id the turn is logged but keeps no conversation memory
+        session_id = request.session_id
+        response = await researcher.chat_with_character(
+            request.character, request.message, session_id=session_id
+        )
         if response and hasattr(response, "content"):
-            return ChatResponse(response=response.content)
+            return ChatResponse(response=response.content, sources=response.sources,
+                                session_id=session_id)
         else:
-            return ChatResponse(response="No response generated.")
+            return ChatResponse(response="No response generated.", session_id=session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {e}")
+
+class FeedbackRequest(BaseModel):
+    character: str
+    url: str
+    helpful: bool
+    chat_id: Optional[int] = None
+
+@app.post("/api/feedback")
+async def submit_feedback(request: FeedbackRequest):
+    """Rate a source cited in a chat response; used by `python scoring.py calibrate`"""
+    # The researcher's database, where researched characters live and calibration reads feedback
+    storage = get_researcher().storage
+    characters = await storage.get_characters()
+    character_id = next((c["id"] for c in characters if c["name"] == request.character), None)
+    if character_id is None:
+        raise HTTPException(status_code=404, detail="Character not found")
+    feedback_id = await storage.add_document_feedback(
+        character_id, request.url, request.helpful, request.chat_id
+    )
+    return {"id": feedback_id}
 # --- CRUD API Endpoints for Characters, Documents, Chat History, User Searches ---
 
 from fastapi import Path
@@ -265,12 +388,18 @@ class ChatHistoryCreate(BaseModel):
     character_id: int
     user_message: str
     character_response: str
+    session_id: str = 'default'
 
 class ChatHistoryOut(BaseModel):
     id: int
     character_id: int
     user_message: str
     character_response: str
+    session_id: str = 'default'
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    tokens_used: Optional[int] = None
+    latency_ms: Optional[float] = None
     timestamp: str
 
 class UserSearchCreate(BaseModel):
@@ -295,14 +424,12 @@ def get_store():
 
 @app.post("/api/characters", response_model=CharacterOut)
 async def create_character(request: CharacterCreate):
-    store = get_store()
-    char_id = store.add_character(request.name)
+    char_id = await get_async_store().add_character(request.name)
     return CharacterOut(id=char_id, name=request.name)
 
 @app.get("/api/characters/{character_id}", response_model=CharacterOut)
 async def get_character(character_id: int = Path(...)):
-    store = get_store()
-    chars = store.get_characters()
+    chars = await get_async_store().get_characters()
     for c in chars:
         if c["id"] == character_id:
             return CharacterOut(id=c["id"], name=c["name"])
@@ -331,8 +458,7 @@ async def delete_character(character_id: int):
 
 @app.post("/api/documents", response_model=DocumentOut)
 async def create_document(request: DocumentCreate):
-    store = get_store()
-    doc_id = store.add_document(request.character_id, request.dict())
+    doc_id = await get_async_store().add_document(request.character_id, request.dict())
     return DocumentOut(id=doc_id, **request.dict())
 
 @app.get("/api/documents/{document_id}", response_model=DocumentOut)
@@ -380,7 +506,9 @@ async def delete_document(document_id: int):
 @app.post("/api/chat_history", response_model=ChatHistoryOut)
 async def create_chat_history(request: ChatHistoryCreate):
     store = get_store()
-    chat_id = store.add_chat_history(request.character_id, request.user_message, request.character_response)
+    chat_id = await get_async_store().add_chat_history(
+        request.character_id, request.user_message, request.character_response, request.session_id
+    )
     with sqlite3.connect(store.db_path) as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.execute("SELECT * FROM chat_history WHERE id = ?", (chat_id,))
@@ -411,7 +539,9 @@ async def delete_chat_history(chat_id: int):
 @app.post("/api/user_searches", response_model=UserSearchOut)
 async def create_user_search(request: UserSearchCreate):
     store = get_store()
-    search_id = store.add_user_search(request.user_query, request.character_id, request.results_count)
+    search_id = await get_async_store().add_user_search(
+        request.user_query, request.character_id, request.results_count
+    )
     with sqlite3.connect(store.db_path) as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.execute("SELECT * FROM user_searches WHERE id = ?", (search_id,))
@@ -0,0 +1,189 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from storage import DocumentStore, VectorDatabase
+
+
+@dataclass
+class OperationStats:
+    count: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    total_wait: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_time / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max_time * 1000, 2),
+            "avg_wait_ms": round(self.total_wait / self.count * 1000, 2) if self.count else 0.0,
+        }
+
+
+class AsyncStorage:
+    """Async facade over DocumentStore and VectorDatabase.
+
+    Blocking SQLite and vector search calls run on a bounded thread pool so
+    they never stall the event loop. At most ``max_pending`` operations may be
+    queued or running at once; further callers wait for a free slot.
+    """
+
+    def __init__(self, doc_store: DocumentStore, vector_db: Optional[VectorDatabase] = None,
+                 max_workers: int = 4, max_pending: int = 64):
+        self.doc_store = doc_store
+        self.vector_db = vector_db
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+        self._slots = asyncio.Semaphore(max_pending)
+        self._in_flight = 0
+        self.stats: Dict[str, OperationStats] = {}
+
+    async def run(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking storage call on the thread pool and record timings"""
+        stats = self.stats.setdefault(name, OperationStats())
+        queued_at = time.perf_counter()
+
+        async with self._slots:
+            self._in_flight += 1
+            loop = asyncio.get_running_loop()
+            started_at = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                elapsed = time.perf_counter() - started_at
+                stats.count += 1
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
+                stats.total_wait += started_at - queued_at
+
+    # Document store operations
+
+    async def get_characters(self, **filters) -> List[Dict[str, Any]]:
+        return await self.run("get_characters", self.doc_store.get_characters, **filters)
+
+    async def add_character(self, name: str) -> int:
+        return await self.run("add_character", self.doc_store.add_character, name)
+
+    async def add_document(self, character_id: int, document: Dict[str, Any]) -> int:
+        return await self.run("add_document", self.doc_store.add_document, character_id, document)
+
+    async def get_character_documents(self, character_name: str) -> List[Dict[str, Any]]:
+        return await self.run("get_character_documents", self.doc_store.get_character_documents,
+                              character_name)
+
+    async def add_chat_history(self, character_id: int, user_message: str, character_response: str,
+                               session_id: str = 'default') -> int:
+        return await self.run("add_chat_history", self.doc_store.add_chat_history,
+                              character_id, user_message, character_response, session_id)
+
+    async def add_chat_turns(self, turns: List[Dict[str, Any]]) -> List[int]:
+        return await self.run("add_chat_turns", self.doc_store.add_chat_turns, turns)
+
+    async def get_chat_turns(self, character_id: int, session_id: str, after_id: int = 0,
+                             limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+        return await self.run("get_chat_turns", self.doc_store.get_chat_turns,
+                              character_id, session_id, after_id, limit)
+
+    async def get_conversation_summary(self, character_id: int, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self.run("get_conversation_summary", self.doc_store.get_conversation_summary,
+                              character_id, session_id)
+
+    async def save_conversation_summary(self, character_id: int, session_id: str, summary: str,
+                                        last_turn_id: int):
+        return await self.run("save_conversation_summary", self.doc_store.save_conversation_summary,
+                              character_id, session_id, summary, last_turn_id)
+
+    async def get_chat_history(self, character_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.run("get_chat_history", self.doc_store.get_chat_history, character_id, limit)
+
+    async def add_user_search(self, user_query: str, character_id: int, results_count: int) -> int:
+        return await self.run("add_user_search", self.doc_store.add_user_search,
+                              user_query, character_id, results_count)
+
+    async def get_user_searches(self, character_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.run("get_user_searches", self.doc_store.get_user_searches, character_id, limit)
+
+    async def get_document_hashes(self, character_id: int):
+        return await self.run("get_document_hashes", self.doc_store.get_document_hashes, character_id)
+
+    async def get_duplicate_hashes(self, character_id: int):
+        return await self.run("get_duplicate_hashes", self.doc_store.get_duplicate_hashes, character_id)
+
+    async def add_duplicate_hashes(self, character_id: int, hashes: List[str]):
+        await self.run("add_duplicate_hashes", self.doc_store.add_duplicate_hashes, character_id, hashes)
+
+    async def get_document_set_hash(self, character_id: int) -> str:
+        return await self.run("get_document_set_hash", self.doc_store.get_document_set_hash, character_id)
+
+    async def add_document_feedback(self, character_id: int, url: str, helpful: bool,
+                                    chat_id: Optional[int] = None) -> int:
+        return await self.run("add_document_feedback", self.doc_store.add_document_feedback,
+                              character_id, url, helpful, chat_id)
+
+    async def get_research_query(self, character_id: int, source: str, query: str) -> Optional[Dict[str, Any]]:
+        return await self.run("get_research_query", self.doc_store.get_research_query,
+                              character_id, source, query)
+
+    async def record_research_query(self, character_id: int, source: str, query: str,
+                                    result_hash: str, results: List[Dict[str, Any]]):
+        await self.run("record_research_query", self.doc_store.record_research_query,
+                       character_id, source, query, result_hash, results)
+
+    async def get_character_profile(self, character_id: int) -> Optional[Dict[str, Any]]:
+        return await self.run("get_character_profile", self.doc_store.get_character_profile, character_id)
+
+    async def get_character_profile_by_name(self, character_name: str) -> Optional[Dict[str, Any]]:
+        return await self.run("get_character_profile_by_name", self.doc_store.get_character_profile_by_name,
+                              character_name)
+
+    async def save_character_profile(self, character_id: int, profile: Dict[str, Any], document_set_hash: str,
+                                     prompt_scaffold: Optional[str] = None):
+        await self.run("save_character_profile", self.doc_store.save_character_profile,
+                       character_id, profile, document_set_hash, prompt_scaffold)
+
+    # Vector database operations
+
+    async def add_vector_documents(self, character_name: str, documents: List[Any],
+                                   embeddings=None):
+        if not self.vector_db:
+            return
+        await self.run("add_vector_documents", self.vector_db.add_documents,
+                       character_name, documents, embeddings)
+
+    async def search_similar(self, character_name: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        if not self.vector_db:
+            return []
+        return await self.run("search_similar", self.vector_db.search_similar, character_name, query, limit)
+
+    async def search_across_characters(self, query: str, **filters) -> List[Dict[str, Any]]:
+        if not self.vector_db:
+            return []
+        return await self.run("search_across_characters", self.vector_db.search_across_characters,
+                              query, **filters)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get pool utilisation and per-operation timing metrics"""
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "operations": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
+
+    def close(self):
+        """Shut down the storage thread pool"""
+        try:
+            self.executor.shutdown(wait=True)
+        except Exception as e:
+            logging.warning(f"Error shutting down storage executor: {e}")
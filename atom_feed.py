@@ -0,0 +1,86 @@
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Optional
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+
+@dataclass
+class AtomEntry:
+    title: str
+    summary: str
+    authors: List[str] = field(default_factory=list)
+    url: str = ''
+    published: str = ''
+
+
+def _text(element: ET.Element, tag: str) -> Optional[str]:
+    child = element.find(f'{ATOM_NS}{tag}')
+    return child.text if child is not None else None
+
+
+class AtomStreamParser:
+    """Incremental Atom feed parser.
+
+    Feed it raw chunks as they arrive. Each completed ``<entry>`` is yielded
+    as an AtomEntry and then detached from the tree, so memory stays bounded
+    by a single entry however long the feed is. Entries without a title or
+    summary are skipped.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root: Optional[ET.Element] = None
+
+    def feed(self, chunk: bytes) -> Iterator[AtomEntry]:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> Iterator[AtomEntry]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> Iterator[AtomEntry]:
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag != f'{ATOM_NS}entry':
+                continue
+
+            title = _text(element, 'title')
+            summary = _text(element, 'summary')
+            authors = [
+                name.text for name in element.iterfind(f'{ATOM_NS}author/{ATOM_NS}name')
+                if name.text
+            ]
+            entry = AtomEntry(
+                title=title.strip() if title else '',
+                summary=summary.strip() if summary else '',
+                authors=authors,
+                url=_text(element, 'id') or '',
+                published=_text(element, 'published') or ''
+            )
+
+            # Entries are direct children of <feed>; drop them once read
+            element.clear()
+            if self._root is not None:
+                self._root.remove(element)
+
+            if title is not None and summary is not None:
+                yield entry
+
+
+async def iter_atom_entries(response, chunk_size: int = 16384) -> AsyncIterator[AtomEntry]:
+    """Yield entries from an aiohttp response carrying an Atom feed, as they arrive"""
+    parser = AtomStreamParser()
+    try:
+        async for chunk in response.content.iter_chunked(chunk_size):
+            for entry in parser.feed(chunk):
+                yield entry
+        for entry in parser.close():
+            yield entry
+    except ET.ParseError as e:
+        logging.error(f"Atom feed parse error: {e}")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Batch Character Research
+Researches a roster of characters through one shared DeepCharacterResearcher
+
+Usage:
+    python batch_research.py characters.txt [--concurrency 4] [--host-rate 2]
+                             [--host-limit export.arxiv.org=0.33] [--incremental]
+
+The roster has one name per line; blank lines and lines starting with # are
+ignored. Progress is checkpointed after every character, so an interrupted
+batch resumes where it stopped when run again with the same roster.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+load_dotenv()
+from deep_character_researcher import DeepCharacterResearcher
+from config import ResearchConfig
+from rate_limit import HostRateLimiter
+
+
+def load_roster(path: str) -> List[str]:
+    """Read character names, skipping blanks, comments and repeats"""
+    names = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name = line.strip()
+            if name and not name.startswith('#') and name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+    return names
+
+
+class Checkpoint:
+    """Per-character outcome of a batch, saved atomically after each update"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def is_done(self, name: str) -> bool:
+        return self.entries.get(name, {}).get('status') == 'done'
+
+    def record(self, name: str, **entry):
+        entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        self.entries[name] = entry
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class BatchStats:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.completed = 0
+        self.partial = 0  # Cut short or with a fallback profile; retried on the next batch
+        self.failed = 0
+        self.skipped = 0
+        self.documents = 0
+        self.queries_fetched = 0
+        self.queries_cached = 0
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        queries = self.queries_fetched + self.queries_cached
+        return {
+            "completed": self.completed,
+            "partial": self.partial,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 1),
+            "characters_per_hour": round(self.completed / elapsed * 3600, 1) if elapsed else 0.0,
+            "documents_per_second": round(self.documents / elapsed, 2) if elapsed else 0.0,
+            "cache_hit_rate": round(self.queries_cached / queries, 3) if queries else 0.0,
+        }
+
+
+async def research_one(researcher: DeepCharacterResearcher, name: str, args, slots: asyncio.Semaphore,
+                       checkpoint: Checkpoint, stats: BatchStats, position: str):
+    async with slots:
+        print(f"\n🔍 {position} Researching {name}...")
+        started_at = time.perf_counter()
+        try:
+            _, run = await researcher.run_research(
+                name, args.depth, ai_provider=args.provider, incremental=args.incremental
+            )
+        except Exception as e:
+            stats.failed += 1
+            checkpoint.record(name, status='failed', error=str(e),
+                              seconds=round(time.perf_counter() - started_at, 1))
+            print(f"❌ {position} {name} failed: {e}")
+            return
+
+        seconds = time.perf_counter() - started_at
+        stats.documents += run.documents_added
+        stats.queries_fetched += run.queries_fetched
+        stats.queries_cached += run.queries_cached
+        # Cut-short runs and profiles with fallback values are retried on the next batch,
+        # and only fully completed characters count towards throughput
+        complete = not (run.partial or run.cancelled or run.profile_degraded)
+        if complete:
+            stats.completed += 1
+        else:
+            stats.partial += 1
+        checkpoint.record(
+            name, status='done' if complete else 'partial', seconds=round(seconds, 1),
+            documents_added=run.documents_added, documents_unchanged=run.documents_unchanged,
+            queries_fetched=run.queries_fetched, queries_cached=run.queries_cached,
+            profile_rebuilt=run.profile_rebuilt
+        )
+        print(f"{'✅' if complete else '⚠️ '} {position} {name}: {run.documents_added} new documents "
+              f"in {seconds:.1f}s{'' if complete else ' (partial, retried next batch)'}")
+
+
+async def run_batch(args) -> Dict[str, Any]:
+    roster = load_roster(args.roster)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.roster}.checkpoint.json")
+    stats = BatchStats()
+
+    pending = []
+    for name in roster:
+        if checkpoint.is_done(name) and not args.restart:
+            stats.skipped += 1
+        else:
+            pending.append(name)
+
+    config = ResearchConfig()
+    researcher = DeepCharacterResearcher(config)
+    host_rates = {}
+    for limit in args.host_limit:
+        host, _, rate = limit.partition('=')
+        host_rates[host] = float(rate)
+    limiter = HostRateLimiter(args.host_rate, host_rates)
+    researcher.use_rate_limiter(limiter)
+    args.provider = args.provider or config.default_provider
+
+    print(f"📋 {len(roster)} characters, {stats.skipped} already done, {len(pending)} to research")
+    print(f"⚙️  Concurrency {args.concurrency}, {args.host_rate:g} requests/s per host, "
+          f"incremental={'on' if args.incremental else 'off'}")
+
+    slots = asyncio.Semaphore(args.concurrency)
+    try:
+        await asyncio.gather(*(
+            research_one(researcher, name, args, slots, checkpoint, stats, f"[{i}/{len(pending)}]")
+            for i, name in enumerate(pending, 1)
+        ))
+    finally:
+        await researcher.cleanup()
+
+    summary = stats.summary()
+    summary["hosts"] = limiter.get_metrics()
+    summary["http"] = researcher.http.get_metrics()["totals"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Research a roster of characters")
+    parser.add_argument("roster", help="File with one character name per line")
+    parser.add_argument("--depth", default="comprehensive", choices=["basic", "comprehensive", "exhaustive"])
+    parser.add_argument("--provider", default=None, help="AI provider (defaults to DEFAULT_AI_PROVIDER)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Characters researched at once")
+    parser.add_argument("--host-rate", type=float, default=2.0,
+                        help="Default requests per second to any one host (0 disables)")
+    parser.add_argument("--host-limit", action="append", default=[], metavar="HOST=RATE",
+                        help="Per-host requests per second override; may be repeated")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse recent query results and unchanged profiles")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file (defaults to <roster>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore completed entries in the checkpoint")
+    args = parser.parse_args()
+
+    try:
+        summary = asyncio.run(run_batch(args))
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted; run again to resume from the checkpoint")
+        return
+
+    print(f"\n{'=' * 60}")
+    print("📊 BATCH SUMMARY")
+    print(f"{'=' * 60}")
+    print(f"  Completed:        {summary['completed']} ({summary['partial']} partial, "
+          f"{summary['failed']} failed, {summary['skipped']} skipped)")
+    print(f"  Elapsed:          {summary['elapsed_seconds']}s")
+    print(f"  Characters/hour:  {summary['characters_per_hour']}")
+    print(f"  Documents/second: {summary['documents_per_second']}")
+    print(f"  Cache hit rate:   {summary['cache_hit_rate']:.1%}")
+    print(f"  Connection reuse: {summary['http']['reuse_rate']:.1%} of "
+          f"{summary['http']['connections_created'] + summary['http']['connections_reused']} connections")
+    for host, metrics in summary["hosts"].items():
+        print(f"  {host}: {metrics['requests']} requests, {metrics['wait_seconds']}s rate-limit wait")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks
+Measures startup and storage performance for Deep Character Research
+
+Usage:
+    python benchmark.py startup [--runs N] [--budget SECONDS]
+    python benchmark.py embedding [--backends sentence_transformers,onnx] [--docs N]
+    python benchmark.py index [--backends chroma,numpy] [--sizes 50,200,1000]
+"""
+
+import argparse
+import itertools
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent
+
+# Commands that should start quickly because they never embed anything
+STARTUP_COMMANDS = {
+    "import config": [sys.executable, "-c", "import config"],
+    "import storage": [sys.executable, "-c", "import storage"],
+    "import deep_character_researcher": [sys.executable, "-c", "import deep_character_researcher"],
+    "construct DeepCharacterResearcher": [
+        sys.executable, "-c",
+        "from dotenv import load_dotenv; load_dotenv(); "
+        "from config import ResearchConfig; "
+        "from deep_character_researcher import DeepCharacterResearcher; "
+        "DeepCharacterResearcher(ResearchConfig())"
+    ],
+    "chat_only.py --list": [sys.executable, "chat_only.py", "--list"],
+    "check_env.py": [sys.executable, "check_env.py"],
+}
+
+
+def time_command(command, runs: int):
+    """Run a command several times and return wall-clock timings in seconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=PROJECT_DIR, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            error = result.stderr.decode(errors="replace").strip().splitlines()
+            raise RuntimeError(error[-1] if error else f"exit code {result.returncode}")
+        timings.append(elapsed)
+    return timings
+
+
+def benchmark_startup(args) -> bool:
+    """Benchmark cold-start time of the CLI entry points"""
+    print("=" * 60)
+    print(f"STARTUP BENCHMARK ({args.runs} runs, budget {args.budget:.2f}s)")
+    print("=" * 60)
+
+    all_passed = True
+    for name, command in STARTUP_COMMANDS.items():
+        try:
+            timings = time_command(command, args.runs)
+        except Exception as e:
+            print(f"  ✗ {name:<36} error: {e}")
+            all_passed = False
+            continue
+
+        median = statistics.median(timings)
+        passed = median <= args.budget
+        all_passed = all_passed and passed
+        mark = "✓" if passed else "✗"
+        print(f"  {mark} {name:<36} median {median:.3f}s  min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+    return all_passed
+
+
+SAMPLE_SUBJECTS = [
+    "Leonardo da Vinci", "Julius Caesar", "Marie Curie", "Napoleon Bonaparte", "Ada Lovelace",
+    "Galileo Galilei", "Cleopatra", "Confucius", "Isaac Newton", "Hypatia of Alexandria",
+]
+SAMPLE_TOPICS = [
+    "painted portraits and studied the anatomy of the human body",
+    "led armies in long military campaigns and wrote about strategy",
+    "conducted experiments on radioactivity in a small laboratory",
+    "reformed the legal code and reorganised the administration of the state",
+    "wrote notes on an analytical engine and the mathematics of computation",
+    "observed the moons of Jupiter through an improved telescope",
+    "negotiated alliances through diplomacy and political marriage",
+    "taught ethics, ritual and the duties of rulers to their subjects",
+    "formulated laws of motion and universal gravitation",
+    "lectured on philosophy, geometry and astronomy in a great library",
+]
+SAMPLE_QUERIES = [
+    "Who studied human anatomy?",
+    "What did you write about war and strategy?",
+    "Tell me about your scientific experiments.",
+    "How did you govern the state?",
+    "What are your views on mathematics?",
+    "What did you see in the night sky?",
+    "How should a ruler behave?",
+    "What is the nature of gravity?",
+]
+
+
+def build_sample_corpus(size: int):
+    """Build a synthetic corpus of biographical sentences"""
+    pairs = itertools.cycle(itertools.product(SAMPLE_SUBJECTS, SAMPLE_TOPICS))
+    return [f"{subject} {topic} (note {i})." for i, (subject, topic) in zip(range(size), pairs)]
+
+
+def top_k_indices(doc_vectors, query_vectors, k: int):
+    import numpy as np
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def benchmark_embedding(args) -> bool:
+    """Compare embedding backends on throughput and retrieval parity"""
+    import numpy as np
+    from embeddings import create_embedding_backend
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    corpus = build_sample_corpus(args.docs)
+
+    print("=" * 60)
+    print(f"EMBEDDING BENCHMARK ({len(corpus)} documents, {len(SAMPLE_QUERIES)} queries)")
+    print("=" * 60)
+
+    doc_vectors = {}
+    query_vectors = {}
+    for name in backends:
+        start = time.perf_counter()
+        backend = create_embedding_backend(name, cache_dir=args.cache_dir)
+        load_time = time.perf_counter() - start
+
+        backend.embed(corpus[:8])  # Warm up
+        start = time.perf_counter()
+        doc_vectors[name] = backend.embed(corpus)
+        ingest_time = time.perf_counter() - start
+
+        query_times = []
+        vectors = []
+        for query in SAMPLE_QUERIES:
+            start = time.perf_counter()
+            vectors.append(backend.embed([query])[0])
+            query_times.append(time.perf_counter() - start)
+        query_vectors[name] = np.stack(vectors)
+
+        print(f"  {name:<24} load {load_time:6.2f}s  "
+              f"ingest {len(corpus) / ingest_time:8.1f} docs/s  "
+              f"query p50 {statistics.median(query_times) * 1000:6.1f}ms")
+
+    if len(backends) < 2:
+        return True
+
+    # Retrieval parity against the first (reference) backend
+    reference = backends[0]
+    reference_top = top_k_indices(doc_vectors[reference], query_vectors[reference], args.k)
+    all_passed = True
+    for name in backends[1:]:
+        candidate_top = top_k_indices(doc_vectors[name], query_vectors[name], args.k)
+        overlap = np.mean([
+            len(set(ref) & set(cand)) / args.k for ref, cand in zip(reference_top, candidate_top)
+        ])
+        cosine = float(np.mean(np.sum(doc_vectors[reference] * doc_vectors[name], axis=1)))
+        passed = overlap >= args.min_overlap
+        all_passed = all_passed and passed
+        mark = "✓" if passed else "✗"
+        print(f"  {mark} parity {name} vs {reference}: top-{args.k} overlap {overlap:.2%}, "
+              f"mean cosine {cosine:.4f}")
+
+    return all_passed
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import os
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource  # Peak RSS only; not available on Windows
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_index(args) -> bool:
+    """Compare vector index backends on query latency and memory"""
+    import numpy as np
+    from vector_index import create_vector_index
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    sizes = [int(size) for size in args.sizes.split(",")]
+    rng = np.random.default_rng(0)
+
+    print("=" * 60)
+    print(f"VECTOR INDEX BENCHMARK (dim {args.dim}, {args.queries} queries, top-{args.k})")
+    print("=" * 60)
+
+    for name in backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            rss_before = current_rss_mb()
+            index = create_vector_index(name, tmp)
+
+            for size in sizes:
+                character = f"Benchmark Character {size}"
+                vectors = rng.standard_normal((size, args.dim)).astype(np.float32)
+                ids = [f"doc_{size}_{i}" for i in range(size)]
+                documents = [f"Document {i}" for i in range(size)]
+                metadatas = [{"title": f"Document {i}", "quality_score": 0.5} for i in range(size)]
+
+                start = time.perf_counter()
+                index.add(character, ids, vectors, documents, metadatas)
+                add_time = time.perf_counter() - start
+
+                queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+                index.query(character, queries[0], args.k)  # Warm up
+                timings = []
+                for query in queries:
+                    start = time.perf_counter()
+                    index.query(character, query, args.k)
+                    timings.append(time.perf_counter() - start)
+
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f"  {name:<8} {size:>6} docs  add {add_time * 1000:8.1f}ms  "
+                      f"query p50 {statistics.median(timings) * 1000:7.3f}ms  p95 {p95 * 1000:7.3f}ms")
+
+            print(f"  {name:<8} memory +{current_rss_mb() - rss_before:.1f} MB RSS")
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deep Character Research benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    startup = subparsers.add_parser("startup", help="Cold-start time of CLI entry points")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget", type=float, default=1.0,
+                         help="Maximum acceptable median time in seconds")
+    startup.set_defaults(func=benchmark_startup)
+
+    embedding = subparsers.add_parser("embedding", help="Embedding backend throughput and parity")
+    embedding.add_argument("--backends", default="sentence_transformers,onnx",
+                           help="Comma-separated backends; the first is the parity reference")
+    embedding.add_argument("--docs", type=int, default=500)
+    embedding.add_argument("--k", type=int, default=5)
+    embedding.add_argument("--min-overlap", type=float, default=0.9,
+                           help="Minimum top-k overlap with the reference backend")
+    embedding.add_argument("--cache-dir", default=None)
+    embedding.set_defaults(func=benchmark_embedding)
+
+    index = subparsers.add_parser("index", help="Vector index query latency and memory")
+    index.add_argument("--backends", default="chroma,numpy")
+    index.add_argument("--sizes", default="50,200,1000", help="Comma-separated documents per character")
+    index.add_argument("--dim", type=int, default=384)
+    index.add_argument("--queries", type=int, default=200)
+    index.add_argument("--k", type=int, default=5)
+    index.set_defaults(func=benchmark_index)
+
+    args = parser.parse_args()
+    passed = args.func(args)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
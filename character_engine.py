@@ -1,10 +1,19 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from storage import VectorDatabase, DocumentStore
+from async_storage import AsyncStorage
 from ai_providers import AIProviderManager
 import json
+import time
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
+from scoring import rerank
+from context_packing import ContextPacker, PackedContext
+from conversation import ConversationMemory, DEFAULT_SESSION
+from chat_log import ChatLog, ChatTurn
+from profile_extraction import ProfileExtractor
+from document_features import DocumentFeatures, extract_features
+from deadline import DeadlineExceeded
 
 @dataclass
 class AIResponse:
@@ -13,23 +22,46 @@ class AIResponse:
     model: str
     tokens_used: Optional[int] = None
     cost: Optional[float] = None
+    # Title and url of each document the response drew on
+    sources: List[Dict[str, str]] = field(default_factory=list)
 
 class CharacterEngine:
     def __init__(self, vector_db: VectorDatabase, doc_store: DocumentStore, 
-                 ai_manager: AIProviderManager):
+                 ai_manager: AIProviderManager, storage: Optional[AsyncStorage] = None,
+                 packer: Optional[ContextPacker] = None, memory: Optional[ConversationMemory] = None,
+                 chat_log: Optional[ChatLog] = None, extractor: Optional[ProfileExtractor] = None,
+                 structured_profiles: bool = True):
         self.vector_db = vector_db
         self.doc_store = doc_store
         self.ai_manager = ai_manager
+        self.storage = storage or AsyncStorage(doc_store, vector_db)
+        self.packer = packer or ContextPacker()
+        self.memory = memory or ConversationMemory(self.storage, ai_manager)
+        self.chat_log = chat_log or ChatLog(self.storage)
+        self.extractor = extractor or ProfileExtractor(ai_manager, self.packer)
+        # One schema-constrained LLM call per profile, instead of an analysis step per field
+        self.structured_profiles = structured_profiles
         self.character_profiles = {}
+        self.prompt_scaffolds: Dict[str, str] = {}
+        self._character_ids: Dict[str, int] = {}
+        # Characters whose latest profile has canned values from a failed or skipped analysis
+        self.fallback_profiles: Set[str] = set()
         
     async def create_character_embodiment(self, character_name: str, 
                                         provider: str = "openrouter") -> Dict[str, Any]:
-        """Create a comprehensive character embodiment"""
+        """Create a comprehensive character embodiment.
+
+        Raises DeadlineExceeded if the active deadline passes or is cancelled
+        while the profile is being built. A profile that needed fallbacks is
+        returned but marked in ``fallback_profiles``.
+        """
         
         # Retrieve all character knowledge
-        documents = self.doc_store.get_character_documents(character_name)
+        documents = await self.storage.get_character_documents(character_name)
+        self.fallback_profiles.discard(character_name)
         
         if not documents:
+            self.fallback_profiles.add(character_name)
             # If no documents found, create a basic profile
             return {
                 "name": character_name,
@@ -41,58 +73,123 @@ class CharacterEngine:
                 "historical_context": {"time_period": "Unknown"}
             }
         
-        # Analyze knowledge to extract character traits
-        personality_analysis = await self._analyze_personality(character_name, documents, provider)
-        knowledge_domains = await self._extract_knowledge_domains(character_name, documents, provider)
-        speech_patterns = await self._analyze_speech_patterns(character_name, documents, provider)
-        
-        # Create character profile
-        character_profile = {
-            "name": character_name,
-            "personality": personality_analysis,
-            "knowledge_domains": knowledge_domains,
-            "speech_patterns": speech_patterns,
-            "response_style": await self._determine_response_style(character_name, documents, provider),
-            "core_beliefs": await self._extract_core_beliefs(character_name, documents, provider),
-            "historical_context": await self._compile_historical_context(character_name, documents, provider)
-        }
+        # Scan the documents once, off the event loop, while the profile call is in flight
+        features_task = asyncio.get_running_loop().run_in_executor(None, extract_features, documents)
         
-        self.character_profiles[character_name] = character_profile
+        character_profile = {"name": character_name}
+        if self.structured_profiles:
+            character_profile.update(
+                await self.extractor.extract(character_name, documents, provider)
+            )
+        features = await features_task
+        
+        # Fields the structured extraction did not deliver come from the analysis steps,
+        # which are independent of each other and share the document features
+        analysis_steps = {
+            "personality": self._analyze_personality,
+            "knowledge_domains": self._extract_knowledge_domains,
+            "speech_patterns": self._analyze_speech_patterns,
+            "response_style": self._determine_response_style,
+            "core_beliefs": self._extract_core_beliefs,
+            "historical_context": self._compile_historical_context
+        }
+        missing = [field_name for field_name in analysis_steps if field_name not in character_profile]
+        if self.structured_profiles and missing:
+            self.fallback_profiles.add(character_name)
+        results = await asyncio.gather(*(
+            analysis_steps[field_name](character_name, documents, provider, features)
+            for field_name in missing
+        ))
+        character_profile.update(zip(missing, results))
+        
+        self.cache_profile(character_name, character_profile)
         return character_profile
     
+    def cache_profile(self, character_name: str, profile: Dict[str, Any],
+                      scaffold: Optional[str] = None) -> str:
+        """Keep a profile and its prompt scaffold in memory for chat; returns the scaffold"""
+        self.character_profiles[character_name] = profile
+        self.prompt_scaffolds[character_name] = scaffold or self.build_prompt_scaffold(profile)
+        return self.prompt_scaffolds[character_name]
+    
+    async def get_profile(self, character_name: str, provider: str = "openrouter") -> Dict[str, Any]:
+        """The character's profile: cached, else stored at ingest, else built now"""
+        if character_name in self.character_profiles:
+            return self.character_profiles[character_name]
+        
+        # Precomputed after research; one indexed read instead of a profile build
+        stored = await self.storage.get_character_profile_by_name(character_name)
+        if stored:
+            self._character_ids[character_name] = stored['character_id']
+            self.cache_profile(character_name, stored['profile'], stored.get('prompt_scaffold'))
+            return stored['profile']
+        
+        return await self.create_character_embodiment(character_name, provider)
+    
     async def respond_as_character(self, character_name: str, query: str, 
-                                 provider: str = "openrouter", model: str = None) -> AIResponse:
-        """Generate a response as the character"""
+                                 provider: str = "openrouter", model: str = None,
+                                 session_id: Optional[str] = None) -> AIResponse:
+        """Generate a response as the character.
+        
+        Every turn is logged to chat history in the background. With a
+        ``session_id`` the turn joins that conversation: earlier turns are
+        remembered in the prompt.
+        """
+        started_at = time.perf_counter()
         
         # Get character profile
-        if character_name not in self.character_profiles:
-            await self.create_character_embodiment(character_name, provider)
+        profile = await self.get_profile(character_name, provider)
         
-        profile = self.character_profiles.get(character_name, {})
+        # Get relevant documents for context, over-fetching so source quality can reorder them
+        candidates = await self.storage.search_similar(character_name, query, limit=10)
+        relevant_docs = rerank(candidates)
         
-        # Get relevant documents for context
-        relevant_docs = self.vector_db.search_similar(character_name, query, limit=5)
+        # Pack the most relevant sentences into the model's context budget
+        packed = self._build_context_from_documents(relevant_docs, query, model)
+        context = packed.text or "Limited historical information available."
+        sources = [{'title': doc.get('title', ''), 'url': doc.get('url', '')} for doc in packed.documents]
         
-        # Build context from documents
-        context = self._build_context_from_documents(relevant_docs)
+        # Conversation so far, as a rolling summary plus the latest turns
+        conversation = ""
+        if session_id is not None:
+            character_id = await self._character_id(character_name)
+            conversation = await self.memory.context(character_id, character_name, session_id)
         
         # Create character prompt
-        character_prompt = self._build_character_prompt(profile, context, query)
+        character_prompt = self._build_character_prompt(
+            profile, context, query, conversation, self.prompt_scaffolds.get(character_name)
+        )
         
         # Generate response using AI provider
         try:
             response = await self.ai_manager.generate_response(
                 provider, character_prompt, model
             )
-            
-            return AIResponse(
+            ai_response = AIResponse(
                 content=response.get('content', 'I cannot respond at this time.'),
                 provider=provider,
                 model=response.get('model', model or 'unknown'),
                 tokens_used=response.get('tokens_used'),
-                cost=response.get('cost')
+                cost=response.get('cost'),
+                sources=sources
             )
             
+            # Queued, not awaited: the turn is written after the reply goes out
+            written = self.chat_log.log(ChatTurn(
+                character_name=character_name,
+                user_message=query,
+                character_response=ai_response.content,
+                session_id=session_id or DEFAULT_SESSION,
+                provider=provider,
+                model=ai_response.model,
+                tokens_used=ai_response.tokens_used,
+                latency_ms=round((time.perf_counter() - started_at) * 1000, 1)
+            ))
+            if session_id is not None:
+                self.memory.remember(character_id, character_name, session_id, written, provider, model)
+            
+            return ai_response
+            
         except Exception as e:
             logging.error(f"Error generating character response: {e}")
             return AIResponse(
@@ -102,18 +199,21 @@ class CharacterEngine:
             )
     
     async def _analyze_personality(self, character_name: str, documents: List[Dict], 
-                                 provider: str) -> Dict[str, Any]:
+                                 provider: str, features: Optional[DocumentFeatures] = None) -> Dict[str, Any]:
         """Analyze personality traits from documents"""
         
         if not documents:
             return {"traits": [], "description": "Personality analysis unavailable"}
         
-        # Combine document content for analysis
-        combined_text = "\n".join([doc.get('content', doc.get('abstract', '')) for doc in documents[:3]])
+        # Gather the passages that say most about character and temperament
+        combined_text = self.packer.pack(
+            documents, f"{character_name} personality character temperament traits habits described",
+            budget=self.packer.default_budget // 2
+        ).text
         
         prompt = f"""Analyze the personality of {character_name} based on this historical information:
 
-{combined_text[:2000]}
+{combined_text}
 
 Extract key personality traits, temperament, and character qualities. Respond in JSON format:
 {{
@@ -133,62 +233,36 @@ Extract key personality traits, temperament, and character qualities. Respond in
                 return personality_data
             except json.JSONDecodeError:
                 # Fallback if JSON parsing fails
+                self.fallback_profiles.add(character_name)
                 return {
                     "traits": ["Intelligent", "Creative", "Determined"],
                     "temperament": "Complex and multifaceted",
                     "description": content[:200]
                 }
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logging.error(f"Error analyzing personality: {e}")
+            self.fallback_profiles.add(character_name)
             return {"traits": ["Historical Figure"], "description": "Analysis unavailable"}
     
     async def _extract_knowledge_domains(self, character_name: str, documents: List[Dict], 
-                                       provider: str) -> List[str]:
-        """Extract knowledge domains from documents"""
+                                       provider: str, features: Optional[DocumentFeatures] = None) -> List[str]:
+        """Extract knowledge domains from document metadata and content keywords"""
         
         if not documents:
             return ["General Knowledge"]
         
-        # Extract domains from document metadata and content
-        domains = set()
-        
-        for doc in documents:
-            # Check metadata for domains
-            metadata = doc.get('metadata', {})
-            if 'domain' in metadata:
-                domains.add(metadata['domain'])
-            
-            # Analyze content for implicit domains
-            content = doc.get('content', doc.get('abstract', ''))
-            title = doc.get('title', '')
-            
-            # Simple keyword-based domain detection
-            text = (title + ' ' + content).lower()
-            
-            if any(word in text for word in ['art', 'paint', 'sculpture', 'drawing']):
-                domains.add('Art')
-            if any(word in text for word in ['science', 'engineer', 'invention', 'machine']):
-                domains.add('Science & Engineering')
-            if any(word in text for word in ['anatomy', 'medical', 'body', 'dissection']):
-                domains.add('Anatomy & Medicine')
-            if any(word in text for word in ['military', 'war', 'battle', 'strategy']):
-                domains.add('Military Strategy')
-            if any(word in text for word in ['philosophy', 'thought', 'idea', 'belief']):
-                domains.add('Philosophy')
-            if any(word in text for word in ['mathematics', 'geometry', 'calculation']):
-                domains.add('Mathematics')
-            if any(word in text for word in ['architecture', 'building', 'design']):
-                domains.add('Architecture')
-        
-        return list(domains) if domains else ["General Knowledge"]
+        features = features or extract_features(documents)
+        return features.domains or ["General Knowledge"]
     
     async def _analyze_speech_patterns(self, character_name: str, documents: List[Dict], 
-                                     provider: str) -> Dict[str, Any]:
+                                     provider: str, features: Optional[DocumentFeatures] = None) -> Dict[str, Any]:
         """Analyze speech patterns and communication style"""
         
         # For now, return basic patterns based on historical period
-        time_period = await self._determine_time_period(character_name, documents)
+        time_period = self._determine_time_period(character_name, features or extract_features(documents))
         
         if "renaissance" in time_period.lower() or "15th" in time_period or "16th" in time_period:
             return {
@@ -204,7 +278,7 @@ Extract key personality traits, temperament, and character qualities. Respond in
             }
     
     async def _determine_response_style(self, character_name: str, documents: List[Dict], 
-                                      provider: str) -> str:
+                                      provider: str, features: Optional[DocumentFeatures] = None) -> str:
         """Determine overall response style"""
         
         # Simple heuristic based on character
@@ -220,7 +294,7 @@ Extract key personality traits, temperament, and character qualities. Respond in
             return "Historical figure - knowledgeable, reflective"
     
     async def _extract_core_beliefs(self, character_name: str, documents: List[Dict], 
-                                  provider: str) -> List[str]:
+                                  provider: str, features: Optional[DocumentFeatures] = None) -> List[str]:
         """Extract core beliefs and values"""
         
         # Basic beliefs based on character type
@@ -241,10 +315,10 @@ Extract key personality traits, temperament, and character qualities. Respond in
             ]
     
     async def _compile_historical_context(self, character_name: str, documents: List[Dict], 
-                                        provider: str) -> Dict[str, str]:
+                                        provider: str, features: Optional[DocumentFeatures] = None) -> Dict[str, str]:
         """Compile historical context information"""
         
-        time_period = await self._determine_time_period(character_name, documents)
+        time_period = self._determine_time_period(character_name, features or extract_features(documents))
         
         context = {
             "time_period": time_period,
@@ -265,31 +339,12 @@ Extract key personality traits, temperament, and character qualities. Respond in
         
         return context
     
-    async def _determine_time_period(self, character_name: str, documents: List[Dict]) -> str:
+    def _determine_time_period(self, character_name: str, features: DocumentFeatures) -> str:
         """Determine the character's historical time period"""
         
-        # Check documents for date information
-        for doc in documents:
-            content = doc.get('content', '') + ' ' + doc.get('abstract', '')
-            
-            # Look for date patterns
-            import re
-            
-            # Look for birth/death dates
-            date_patterns = [
-                r'(\d{4})-(\d{4})',  # 1452-1519
-                r'born.*?(\d{4})',   # born 1452
-                r'died.*?(\d{4})',   # died 1519
-                r'(\d{4}).*?(\d{4})', # 1452 ... 1519
-            ]
-            
-            for pattern in date_patterns:
-                matches = re.findall(pattern, content)
-                if matches:
-                    if isinstance(matches[0], tuple):
-                        return f"{matches[0][0]}-{matches[0][1]}"
-                    else:
-                        return f"Around {matches[0]}"
+        # Dates found in the documents
+        if features.time_period:
+            return features.time_period
         
         # Fallback based on character name
         name_lower = character_name.lower()
@@ -302,25 +357,19 @@ Extract key personality traits, temperament, and character qualities. Respond in
         
         return "Historical period"
     
-    def _build_context_from_documents(self, documents: List[Dict]) -> str:
-        """Build context string from relevant documents"""
-        
-        if not documents:
-            return "Limited historical information available."
-        
-        context_parts = []
-        for doc in documents[:3]:  # Use top 3 most relevant
-            title = doc.get('title', 'Historical Document')
-            content = doc.get('content', doc.get('abstract', ''))
-            
-            # Truncate content
-            content_snippet = content[:300] + "..." if len(content) > 300 else content
-            context_parts.append(f"From {title}: {content_snippet}")
-        
-        return "\n\n".join(context_parts)
+    async def _character_id(self, character_name: str) -> int:
+        if character_name not in self._character_ids:
+            self._character_ids[character_name] = await self.storage.add_character(character_name)
+        return self._character_ids[character_name]
     
-    def _build_character_prompt(self, profile: Dict, context: str, query: str) -> str:
-        """Build the prompt for character response generation"""
+    def _build_context_from_documents(self, documents: List[Dict], query: str = '',
+                                      model: Optional[str] = None) -> PackedContext:
+        """Build context from relevant documents within the model's token budget"""
+        return self.packer.pack(documents, query, model=model)
+    
+    @staticmethod
+    def build_prompt_scaffold(profile: Dict) -> str:
+        """The part of every chat prompt that depends only on the profile"""
         
         name = profile.get('name', 'Historical Figure')
         personality = profile.get('personality', {})
@@ -329,17 +378,27 @@ Extract key personality traits, temperament, and character qualities. Respond in
         historical_context = profile.get('historical_context', {})
         response_style = profile.get('response_style', 'thoughtful historical figure')
         
-        prompt = f"""You are {name}, responding as this historical figure would.
+        return f"""You are {name}, responding as this historical figure would.
 
 CHARACTER PROFILE:
 - Personality traits: {', '.join(traits)}
 - Areas of expertise: {', '.join(domains)}
 - Time period: {historical_context.get('time_period', 'Historical period')}
 - Response style: {response_style}
-
+"""
+    
+    def _build_character_prompt(self, profile: Dict, context: str, query: str,
+                                conversation: str = "", scaffold: Optional[str] = None) -> str:
+        """Build the prompt for character response generation"""
+        
+        name = profile.get('name', 'Historical Figure')
+        scaffold = scaffold or self.build_prompt_scaffold(profile)
+        conversation_section = f"\nCONVERSATION SO FAR:\n{conversation}\n" if conversation else ""
+        
+        prompt = f"""{scaffold}
 HISTORICAL CONTEXT:
 {context}
-
+{conversation_section}
 Please respond to this question as {name} would, drawing upon your historical knowledge, personality, and the context provided. Stay in character and speak from your historical perspective:
 
 QUESTION: {query}
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_storage import AsyncStorage
+
+
+@dataclass
+class ChatTurn:
+    """One exchange with a character, as written to chat_history"""
+    character_name: str
+    user_message: str
+    character_response: str
+    session_id: str = 'default'
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    tokens_used: Optional[int] = None
+    latency_ms: Optional[float] = None
+
+
+class ChatLog:
+    """Write-behind log of chat turns.
+
+    ``log`` only queues a turn and returns at once, so recording a chat adds
+    nothing to the reply. A background worker writes queued turns to SQLite in
+    batches, one transaction per batch, coalescing whatever arrives within
+    ``max_wait_ms`` of the first. When the queue is full, turns are dropped
+    and counted rather than slowing the chat down.
+    """
+
+    def __init__(self, storage: AsyncStorage, max_batch_size: int = 32,
+                 max_wait_ms: float = 50.0, max_queue: int = 1000):
+        self.storage = storage
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def log(self, turn: ChatTurn) -> asyncio.Future:
+        """Queue ``turn`` for writing; the returned future resolves to its chat_history id"""
+        loop = asyncio.get_running_loop()
+        # Created on first use, inside the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._write_worker())
+
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((turn, future))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"Chat log queue full, dropped a turn with {turn.character_name}")
+            future.set_exception(RuntimeError("chat log queue full"))
+            # Nobody may await it; mark the exception as retrieved
+            future.exception()
+        return future
+
+    async def _write_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Coalesce whatever else arrives before the wait window closes
+            while len(pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write(pending)
+            for _ in pending:
+                self._queue.task_done()
+
+    async def _write(self, pending: List[Tuple[ChatTurn, asyncio.Future]]):
+        try:
+            ids = await self.storage.add_chat_turns([asdict(turn) for turn, _ in pending])
+        except Exception as e:
+            self.failed += len(pending)
+            logging.error(f"Writing {len(pending)} chat turns failed: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+            return
+
+        self.batches += 1
+        self.written += len(ids)
+        for (_, future), chat_id in zip(pending, ids):
+            if not future.done():
+                future.set_result(chat_id)
+
+    async def flush(self):
+        """Wait until every queued turn is written"""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def close(self):
+        """Write what is queued, then stop the worker"""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -1,10 +1,30 @@
 import asyncio
+import uuid
 import sys
-from main import DeepCharacterResearcher
+from dotenv import load_dotenv
+load_dotenv()
 from config import ResearchConfig
 
+def list_characters():
+    """List researched characters without loading the research stack"""
+    from storage import DocumentStore
+    
+    config = ResearchConfig()
+    store = DocumentStore(config.doc_store_path)
+    characters = store.get_characters()
+    
+    if not characters:
+        print("No researched characters found")
+        return
+    
+    print(f"📚 {len(characters)} researched characters:")
+    for character in characters:
+        print(f"  - {character['name']}")
+
 async def quick_chat(character_name: str):
     """Quick chat with a character (assumes already researched)"""
+    # Deferred so that --list does not pay for the AI and vector stack
+    from deep_character_researcher import DeepCharacterResearcher
     
     config = ResearchConfig()
     researcher = DeepCharacterResearcher(config)
@@ -36,6 +56,8 @@ async def quick_chat(character_name: str):
         current_provider = config.default_provider
         current_model = config.default_model
         
+        # One conversation per chat session, so the character remembers earlier turns
+        session_id = uuid.uuid4().hex
         while True:
             try:
                 user_input = input(f"\nYou ({current_provider}/{current_model}): ").strip()
@@ -44,7 +66,7 @@ async def quick_chat(character_name: str):
                     break
                 elif user_input.lower() == 'info':
                     # Show character info
-                    profile = await researcher.character_engine.create_character_embodiment(character_name)
+                    profile = await researcher.character_engine.get_profile(character_name)
                     print(f"\n📋 Character Profile for {character_name}:")
                     print(f"⏰ Time period: {profile.get('historical_context', {}).get('time_period', 'Unknown')}")
                     print(f"🎭 Traits: {profile.get('personality', {}).get('traits', [])}")
@@ -66,7 +88,8 @@ async def quick_chat(character_name: str):
                         character_name, 
                         user_input, 
                         current_provider,
-                        current_model
+                        current_model,
+                        session_id=session_id
                     )
                     
             except KeyboardInterrupt:
@@ -85,6 +108,10 @@ async def quick_chat(character_name: str):
         await researcher.cleanup()
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--list"]:
+        list_characters()
+        sys.exit(0)
+    
     if len(sys.argv) > 1:
         character_name = " ".join(sys.argv[1:])
     else:
@@ -16,6 +16,21 @@ class ResearchConfig:
         self.vector_db_path = str(Path(self.base_data_dir) / "vector_db")
         self.doc_store_path = str(Path(self.base_data_dir) / "documents.db")
 
+        # Embedding settings: backend is "sentence_transformers" or "onnx" (int8, CPU)
+        self.embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "sentence_transformers")
+        self.model_cache_dir = str(Path(self.base_data_dir) / "models")
+
+        # Vector index backend: "chroma" or "numpy" (in-process, memory-mapped)
+        self.vector_backend: str = os.getenv("VECTOR_BACKEND", "chroma")
+        # "per_character" collections, or one "unified" collection for cross-character search
+        self.vector_index_mode: str = os.getenv("VECTOR_INDEX_MODE", "per_character")
+
+        # Source-quality scoring weights, written by `python scoring.py calibrate`
+        self.scoring_weights_path = str(Path(self.base_data_dir) / "scoring_weights.json")
+
+        # Shared embedding service, e.g. unix:/tmp/dcr-embeddings.sock (optional)
+        self.embedding_service_url: Optional[str] = os.getenv("EMBEDDING_SERVICE_URL")
+
         # AI Provider settings (runtime env loading)
         self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
         self.openrouter_api_key: Optional[str] = os.getenv("OPENROUTER_API_KEY")
@@ -41,7 +56,29 @@ class ResearchConfig:
     
     # Research settings
     max_sources_per_domain: int = 50
-    research_timeout: int = 300  # 5 minutes
+    research_timeout: int = 300  # 5 minutes; 0 disables the deadline
+    research_synthesis_reserve: int = 60  # Seconds of the deadline kept back for storage and profiling
+    research_query_max_age_hours: float = 24 * 7  # Incremental runs re-fetch queries older than this
+    semantic_dedup_threshold: float = 0.92  # Embedding cosine to merge same-language results
+    semantic_dedup_cross_language_threshold: float = 0.8  # ...and results in different languages
+
+    # Tokens of retrieved context per chat prompt, for models without a family budget
+    context_token_budget: int = 1200
+    # Tokens of conversation memory (rolling summary plus recent turns) per chat prompt
+    conversation_token_budget: int = 800
+    conversation_recent_turns: int = 6  # Turns quoted verbatim; older ones are summarized
+    # Build character profiles with one structured (JSON) LLM call rather than step by step
+    structured_profile_extraction: bool = True
+
+    # Storage settings
+    storage_max_workers: int = 4  # Threads serving blocking DB calls
+    storage_max_pending: int = 64  # Queued storage calls before callers wait
+
+    # HTTP connection pool shared by research sources and AI providers
+    http_max_connections: int = 100
+    http_max_connections_per_host: int = 8
+    http_keepalive_timeout: float = 30.0  # Seconds an idle connection is kept for reuse
+    http_dns_cache_ttl: int = 300  # Seconds a DNS lookup is cached
     
     def get_ai_config(self):
         """Get AI configuration object"""
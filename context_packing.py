@@ -0,0 +1,144 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional
+
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?。！？])\s+|\n+')
+WORD_PATTERN = re.compile(r'\w+')
+
+STOPWORDS = frozenset(
+    "the and for are but not you your with what who whom whose how why when where was were "
+    "has have had did does this that these those from into about than then them they their "
+    "there his her its our all any can could would should will shall may might".split()
+)
+
+# Tokens of retrieved context per prompt, by model family (matched as a substring of the
+# model name). Small local models get less room; unknown models use the packer default.
+DEFAULT_MODEL_BUDGETS = {
+    "gpt-4": 2000,
+    "gpt-3.5": 1200,
+    "claude": 2000,
+    "nemotron": 1500,
+    "llama": 1000,
+    "mistral": 1000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token) without a tokenizer"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def _terms(text: str) -> FrozenSet[str]:
+    return frozenset(
+        word for word in WORD_PATTERN.findall(text.lower())
+        if len(word) > 2 and word not in STOPWORDS
+    )
+
+
+@dataclass
+class PackedContext:
+    """Context text for a prompt and the documents it quotes"""
+    text: str
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: int = 0
+
+
+class ContextPacker:
+    """Fills a prompt's context budget with the most relevant sentences per token.
+
+    Each document is split into sentences, and each sentence is scored by its
+    document's retrieval weight and its overlap with the query. Sentences are
+    taken greedily by score per token until the budget is spent. Sentences
+    scoring below ``min_relative_score`` of the best one are never taken, so
+    spare budget stays unused rather than filled with noise. A sentence that
+    mostly repeats one already taken is skipped, which drops overlapping
+    chunks and near-duplicate documents. The chosen sentences are put back in
+    document order under each document's title.
+    """
+
+    def __init__(self, default_budget: int = 1200, model_budgets: Optional[Dict[str, int]] = None,
+                 overlap_threshold: float = 0.7, min_sentence_chars: int = 20,
+                 min_relative_score: float = 0.25):
+        self.default_budget = default_budget
+        self.model_budgets = dict(DEFAULT_MODEL_BUDGETS if model_budgets is None else model_budgets)
+        self.overlap_threshold = overlap_threshold
+        self.min_sentence_chars = min_sentence_chars
+        self.min_relative_score = min_relative_score
+
+    def budget_for(self, model: Optional[str]) -> int:
+        model = (model or '').lower()
+        for family, budget in self.model_budgets.items():
+            if family in model:
+                return budget
+        return self.default_budget
+
+    def pack(self, documents: List[Dict[str, Any]], query: str = '', budget: Optional[int] = None,
+             model: Optional[str] = None) -> PackedContext:
+        """Select sentences from ``documents`` (best first) that fit in ``budget`` tokens.
+
+        Without a query, sentences are ranked by how many distinct terms they carry.
+        """
+        budget = budget if budget is not None else self.budget_for(model)
+        query_terms = _terms(query)
+
+        candidates = []
+        for doc_index, doc in enumerate(documents):
+            weight = self._document_weight(doc, doc_index)
+            content = doc.get('content') or doc.get('abstract') or ''
+            for sentence_index, sentence in enumerate(SENTENCE_PATTERN.split(content)):
+                sentence = sentence.strip()
+                if len(sentence) < self.min_sentence_chars:
+                    continue
+                terms = _terms(sentence)
+                if not terms:
+                    continue
+                tokens = estimate_tokens(sentence) + 1
+                if query_terms:
+                    relevance = 0.1 + len(terms & query_terms) / len(query_terms)
+                else:
+                    relevance = len(terms) / tokens
+                score = weight * relevance
+                candidates.append((score / tokens, score, doc_index, sentence_index, sentence, terms, tokens))
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        cutoff = max((candidate[1] for candidate in candidates), default=0.0) * self.min_relative_score
+
+        chosen: Dict[int, List] = {}
+        chosen_terms: List[FrozenSet[str]] = []
+        used = 0
+        for _, score, doc_index, sentence_index, sentence, terms, tokens in candidates:
+            if score < cutoff:
+                continue
+            header = 0 if doc_index in chosen else self._header_tokens(documents[doc_index])
+            if used + header + tokens > budget:
+                continue
+            if any(len(terms & other) / min(len(terms), len(other)) >= self.overlap_threshold
+                   for other in chosen_terms):
+                continue
+            chosen.setdefault(doc_index, []).append((sentence_index, sentence))
+            chosen_terms.append(terms)
+            used += header + tokens
+
+        parts = []
+        packed_documents = []
+        for doc_index in sorted(chosen):
+            doc = documents[doc_index]
+            sentences = sorted(chosen[doc_index])
+            text = sentences[0][1]
+            for (previous, _), (index, sentence) in zip(sentences, sentences[1:]):
+                text += (" " if index == previous + 1 else " … ") + sentence
+            parts.append(f"From {doc.get('title') or 'Historical Document'}: {text}")
+            packed_documents.append(doc)
+        return PackedContext(text="\n\n".join(parts), documents=packed_documents, tokens=used)
+
+    @staticmethod
+    def _document_weight(doc: Dict[str, Any], rank: int) -> float:
+        """Retrieval similarity when present, else stored quality, else rank"""
+        for key in ('similarity', 'quality_score'):
+            value = doc.get(key)
+            if isinstance(value, (int, float)) and value > 0:
+                return float(value)
+        return 1.0 / (1 + rank)
+
+    @staticmethod
+    def _header_tokens(doc: Dict[str, Any]) -> int:
+        return estimate_tokens(f"From {doc.get('title') or 'Historical Document'}: ") + 1
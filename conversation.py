@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import Awaitable, Dict, List, Optional, Set, Tuple
+
+from async_storage import AsyncStorage
+from context_packing import estimate_tokens
+
+DEFAULT_SESSION = 'default'
+
+
+def format_turns(turns: List[Dict], character_name: str) -> str:
+    return "\n".join(
+        f"User: {turn['user_message']}\n{character_name}: {turn['character_response']}"
+        for turn in turns
+    )
+
+
+class ConversationMemory:
+    """Conversation state for multi-turn chats, kept under a fixed token budget.
+
+    A prompt gets the session's rolling summary plus its latest turns
+    verbatim. Once enough turns have fallen out of the recent window, they
+    are folded into the summary by one background LLM call. The summary is
+    updated incrementally from where it last stopped, so prompt size stays
+    flat however long the conversation runs.
+    """
+
+    def __init__(self, storage: AsyncStorage, ai_manager, token_budget: int = 800,
+                 recent_turns: int = 6, summarize_every: int = 4, summary_words: int = 150):
+        self.storage = storage
+        self.ai_manager = ai_manager
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.summarize_every = summarize_every
+        self.summary_words = summary_words
+        # Only sessions with a summary update running or a turn being written have entries
+        self._summarizing: Set[Tuple[int, str]] = set()
+        self._writes: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    async def context(self, character_id: int, character_name: str,
+                      session_id: str = DEFAULT_SESSION) -> str:
+        """Summary and recent turns for a prompt, newest turns kept first when over budget"""
+        await self._written(character_id, session_id)
+        summary = await self.storage.get_conversation_summary(character_id, session_id)
+        turns = await self.storage.get_chat_turns(
+            character_id, session_id, after_id=summary['last_turn_id'] if summary else 0,
+            limit=self.recent_turns + self.summarize_every
+        )
+
+        parts = []
+        used = 0
+        if summary:
+            summary_text = f"Earlier in this conversation: {summary['summary']}"
+            parts.append(summary_text)
+            used += estimate_tokens(summary_text)
+
+        recent = []
+        for turn in reversed(turns):
+            text = format_turns([turn], character_name)
+            tokens = estimate_tokens(text)
+            if used + tokens > self.token_budget:
+                break
+            recent.append(text)
+            used += tokens
+        parts.extend(reversed(recent))
+        return "\n\n".join(parts)
+
+    def remember(self, character_id: int, character_name: str, session_id: str, written: Awaitable[int],
+                 provider: str, model: Optional[str] = None):
+        """Track a turn being logged and, when due, fold older turns into the summary in the background"""
+        key = (character_id, session_id)
+        write = asyncio.ensure_future(written)
+        self._writes[key] = write
+        write.add_done_callback(lambda done: self._forget_write(key, done))
+        task = asyncio.create_task(self._maybe_summarize(character_id, character_name, session_id, provider, model))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _forget_write(self, key: Tuple[int, str], write: asyncio.Future):
+        # A later turn's write may have replaced this one already
+        if self._writes.get(key) is write:
+            del self._writes[key]
+
+    async def _written(self, character_id: int, session_id: str):
+        """Wait for the session's latest turn to reach storage, usually long done by the next message"""
+        write = self._writes.get((character_id, session_id))
+        if write is not None and not write.done():
+            await asyncio.wait([write])
+
+    async def _maybe_summarize(self, character_id: int, character_name: str, session_id: str,
+                               provider: str, model: Optional[str]):
+        key = (character_id, session_id)
+        if key in self._summarizing:
+            # An update is running; the next turn will pick up what it misses
+            return
+        self._summarizing.add(key)
+        try:
+            await self._written(character_id, session_id)
+            summary = await self.storage.get_conversation_summary(character_id, session_id)
+            # Every turn since the summary stopped, so a lagging summary catches up
+            # instead of skipping what it missed
+            turns = await self.storage.get_chat_turns(
+                character_id, session_id, after_id=summary['last_turn_id'] if summary else 0, limit=None
+            )
+            older = turns[:-self.recent_turns] if self.recent_turns else turns
+            if len(older) < self.summarize_every:
+                return
+
+            # Folded in pages, so no single summary call grows with the backlog
+            text = summary['summary'] if summary else ''
+            page_size = self.summarize_every * 4
+            for start in range(0, len(older), page_size):
+                page = older[start:start + page_size]
+                updated = await self._summarize(character_name, text, page, provider, model)
+                if not updated:
+                    return
+                text = updated
+                await self.storage.save_conversation_summary(character_id, session_id, text,
+                                                             page[-1]['id'])
+        except Exception as e:
+            logging.warning(f"Conversation summary update failed for {character_name}: {e}")
+        finally:
+            self._summarizing.discard(key)
+
+    async def _summarize(self, character_name: str, previous: str, turns: List[Dict],
+                         provider: str, model: Optional[str]) -> str:
+        prompt = f"""Update the running summary of a conversation between a user and {character_name}.
+
+CURRENT SUMMARY:
+{previous or "(none yet)"}
+
+NEW EXCHANGES:
+{format_turns(turns, character_name)}
+
+Write the updated summary in at most {self.summary_words} words. Keep names, facts the user shared, \
+questions still open and anything {character_name} promised or claimed. Reply with the summary only."""
+        response = await self.ai_manager.generate_response(provider, prompt, model)
+        return (response.get('content') or '').strip()
+
+    async def flush(self):
+        """Wait for pending summary updates, e.g. before shutdown"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
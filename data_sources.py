@@ -1,128 +1,233 @@
 import asyncio
 import aiohttp
-from typing import Dict, List, Any
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, List, Optional
 import logging
+import re
+from deadline import DeadlineExceeded, deadline_expired, time_left
+from atom_feed import AtomEntry, iter_atom_entries
 from config import ResearchConfig
+from rate_limit import HostRateLimiter
+from http_client import HttpClient
+from research_result import ResearchResult
+
+MARKUP_PATTERN = re.compile(r'<[^>]+>')
+
+@dataclass(frozen=True)
+class DataSourceConfig:
+    name: str
+    base_url: str
+    rate_limit: float  # Minimum seconds between requests
+    quality_weight: float  # Base quality score of results
+    max_concurrency: int = 2  # Requests in flight at once
+    timeout: float = 20.0  # Seconds before a page request is abandoned
+    page_size: int = 20  # Results per request when paging
+    max_pages: int = 5  # Pages fetched before a stream stops on its own
+    enabled: bool = True
+
+# Registry of external sources; add an entry plus an _iter_<name> page generator to extend
+DATA_SOURCES: Dict[str, DataSourceConfig] = {
+    source.name: source for source in [
+        DataSourceConfig("arxiv", "http://export.arxiv.org/api/query",
+                         rate_limit=3.0, quality_weight=0.9, max_concurrency=1),
+        DataSourceConfig("crossref", "https://api.crossref.org/works",
+                         rate_limit=0.5, quality_weight=0.85),
+        DataSourceConfig("semantic_scholar", "https://api.semanticscholar.org/graph/v1",
+                         rate_limit=1.0, quality_weight=0.9, max_concurrency=1, page_size=50),
+        DataSourceConfig("openlibrary", "https://openlibrary.org/search.json",
+                         rate_limit=0.5, quality_weight=0.7),
+    ]
+}
 
 class DataSourceManager:
-    def __init__(self, config: ResearchConfig):
+    def __init__(self, config: ResearchConfig, sources: Optional[Dict[str, DataSourceConfig]] = None,
+                 http: Optional[HttpClient] = None):
         self.config = config
-        self.session = None
+        self._owns_http = http is None
+        self.http = http or HttpClient.from_config(config)
+        self.trace_configs = []  # aiohttp request hooks, e.g. HostRateLimiter.trace_config()
+        self.data_sources = dict(sources or DATA_SOURCES)
+        self._slots = {name: asyncio.Semaphore(source.max_concurrency)
+                       for name, source in self.data_sources.items()}
+        # Keyed by source name; spaces request starts by each source's rate_limit
+        self._pacer = HostRateLimiter(default_rate=0, host_rates={
+            name: 1.0 / source.rate_limit for name, source in self.data_sources.items() if source.rate_limit > 0
+        })
+    
+    def configure_source(self, name: str, **changes):
+        """Override registry settings for one source, e.g. enabled=False"""
+        self.data_sources[name] = replace(self.data_sources[name], **changes)
         
     async def get_session(self):
-        """Get or create HTTP session"""
-        if not self.session or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+        """Get this manager's session on the shared connection pool"""
+        return await self.http.session("data_sources", timeout=30, trace_configs=self.trace_configs)
     
     async def search_source(self, source_name: str, query: str, 
-                          max_results: int = 50) -> List[Dict[str, Any]]:
-        """Search a specific data source"""
+                          max_results: int = 50) -> List[ResearchResult]:
+        """Search a specific data source, paging until max_results are collected"""
+        return [result async for result in self.stream_source(source_name, query, max_results)]
+    
+    async def stream_source(self, source_name: str, query: str, max_results: Optional[int] = None,
+                            errors: Optional[Dict[str, str]] = None) -> AsyncIterator[ResearchResult]:
+        """Yield results from one source, fetching further pages only as they are consumed.
         
+        A failed or timed-out page ends the stream; the error is logged and,
+        if ``errors`` is given, recorded there under the source's name.
+        """
         if source_name not in self.data_sources:
             raise ValueError(f"Unknown data source: {source_name}")
         
         source = self.data_sources[source_name]
+        iterate = getattr(self, f"_iter_{source_name}", None)
+        if iterate is None or not source.enabled:
+            return
         
-        # Route to appropriate search method
-        if source_name == "arxiv":
-            return await self._search_arxiv(query, max_results)
-        elif source_name == "crossref":
-            return await self._search_crossref(query, max_results)
-        elif source_name == "semantic_scholar":
-            return await self._search_semantic_scholar(query, max_results)
-        elif source_name == "openlibrary":
-            return await self._search_openlibrary(query, max_results)
-        else:
-            return []
+        page_size = min(source.page_size, max_results) if max_results else source.page_size
+        pages = iterate(query, page_size)
+        count = 0
+        error = None
+        try:
+            async for result in pages:
+                yield result
+                count += 1
+                if max_results and count >= max_results:
+                    return
+        except DeadlineExceeded:
+            error = "research deadline exceeded"
+        except asyncio.TimeoutError:
+            error = f"page request timed out after {source.timeout}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            await pages.aclose()
+        
+        if error:
+            logging.error(f"{source_name} search error: {error}")
+            if errors is not None:
+                errors[source_name] = error
     
-    async def _search_arxiv(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search ArXiv API"""
-        session = await self.get_session()
+    async def stream_all_sources(self, query: str, sources: Optional[List[str]] = None,
+                                 errors: Optional[Dict[str, str]] = None) -> AsyncIterator[ResearchResult]:
+        """Yield results from several sources concurrently, in arrival order.
+        
+        Each source pages independently into a small bounded queue, so a slow
+        consumer pauses fetching. Stopping iteration (or closing the generator)
+        cancels every source's pending requests. Sources that fail are
+        recorded in ``errors``, if given, by name.
+        """
+        names = self._enabled_sources(sources)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, len(names)) * 4)
+        finished = object()
         
-        params = {
-            'search_query': f'all:{query}',
-            'start': 0,
-            'max_results': max_results,
-            'sortBy': 'relevance',
-            'sortOrder': 'descending'
-        }
+        async def produce(name: str):
+            try:
+                async for result in self.stream_source(name, query, errors=errors):
+                    await queue.put(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error searching {name}: {e}")
+                if errors is not None:
+                    errors[name] = str(e) or type(e).__name__
+            await queue.put(finished)
         
+        tasks = [asyncio.create_task(produce(name)) for name in names]
         try:
-            async with session.get(self.data_sources["arxiv"].base_url, params=params) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    return self._parse_arxiv_response(content)
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is finished:
+                    remaining -= 1
                 else:
-                    logging.error(f"ArXiv API error: {response.status}")
-                    return []
-        except Exception as e:
-            logging.error(f"ArXiv search error: {e}")
-            return []
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
-    def _parse_arxiv_response(self, xml_content: str) -> List[Dict[str, Any]]:
-        """Parse ArXiv XML response"""
-        import xml.etree.ElementTree as ET
-        
-        try:
-            root = ET.fromstring(xml_content)
-            results = []
-            
-            for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-                title = entry.find('{http://www.w3.org/2005/Atom}title')
-                summary = entry.find('{http://www.w3.org/2005/Atom}summary')
-                
-                authors = []
-                for author in entry.findall('{http://www.w3.org/2005/Atom}author'):
-                    name = author.find('{http://www.w3.org/2005/Atom}name')
-                    if name is not None:
-                        authors.append(name.text)
-                
-                url = entry.find('{http://www.w3.org/2005/Atom}id')
-                published = entry.find('{http://www.w3.org/2005/Atom}published')
-                
-                if title is not None and summary is not None:
-                    results.append({
-                        'title': title.text.strip(),
-                        'abstract': summary.text.strip(),
-                        'authors': authors,
-                        'url': url.text if url is not None else '',
-                        'published': published.text if published is not None else '',
-                        'source': 'arxiv',
-                        'quality_score': self.data_sources["arxiv"].quality_weight
-                    })
-            
-            return results
-            
-        except ET.ParseError as e:
-            logging.error(f"ArXiv XML parse error: {e}")
-            return []
+    def _enabled_sources(self, sources: Optional[List[str]] = None) -> List[str]:
+        return [name for name in (sources or self.data_sources)
+                if name in self.data_sources and self.data_sources[name].enabled]
     
-    async def _search_crossref(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search CrossRef API"""
-        session = await self.get_session()
+    @asynccontextmanager
+    async def _page_response(self, source_name: str, url: str, params: Dict[str, Any]):
+        """Open one page under the source's concurrency cap, pacing and timeout.
         
-        params = {
-            'query': query,
-            'rows': max_results,
-            'sort': 'relevance',
-            'order': 'desc'
-        }
+        Raises for a non-200 status.
+        """
+        source = self.data_sources[source_name]
+        session = await self.get_session()
         
-        try:
-            async with session.get(self.data_sources["crossref"].base_url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return self._parse_crossref_response(data)
-                else:
-                    logging.error(f"CrossRef API error: {response.status}")
-                    return []
-        except Exception as e:
-            logging.error(f"CrossRef search error: {e}")
-            return []
+        async with self._slots[source_name]:
+            await self._pacer.acquire(source_name)
+            # Stop paging once the research deadline has passed
+            if deadline_expired():
+                raise DeadlineExceeded()
+            async with session.get(url, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=time_left(source.timeout))) as response:
+                response.raise_for_status()
+                yield response
+    
+    async def _fetch_page(self, source_name: str, url: str, params: Dict[str, Any]) -> Any:
+        """Fetch one JSON page; failures raise and end the source's stream"""
+        async with self._page_response(source_name, url, params) as response:
+            return await response.json()
     
-    def _parse_crossref_response(self, data: Dict) -> List[Dict[str, Any]]:
+    async def _iter_arxiv(self, query: str, page_size: int) -> AsyncIterator[ResearchResult]:
+        """Page through ArXiv API results by offset, parsing each feed as it streams in"""
+        source = self.data_sources["arxiv"]
+        for page in range(source.max_pages):
+            params = {
+                'search_query': f'all:{query}',
+                'start': page * page_size,
+                'max_results': page_size,
+                'sortBy': 'relevance',
+                'sortOrder': 'descending'
+            }
+            count = 0
+            async with self._page_response("arxiv", source.base_url, params) as response:
+                async for entry in iter_atom_entries(response):
+                    count += 1
+                    yield self._arxiv_entry_to_result(entry)
+            if count < page_size:
+                return
+    
+    def _arxiv_entry_to_result(self, entry: AtomEntry) -> ResearchResult:
+        return ResearchResult(
+            title=entry.title,
+            authors=entry.authors,
+            abstract=entry.summary,
+            url=entry.url,
+            source_type='arxiv',
+            quality_score=self.data_sources["arxiv"].quality_weight,
+            publication_date=entry.published,
+            citations=0,
+            language='en'
+        )
+    
+    async def _iter_crossref(self, query: str, page_size: int) -> AsyncIterator[ResearchResult]:
+        """Page through CrossRef API results with a deep-paging cursor"""
+        source = self.data_sources["crossref"]
+        cursor = '*'
+        for _ in range(source.max_pages):
+            params = {
+                'query': query,
+                'rows': page_size,
+                'sort': 'relevance',
+                'order': 'desc',
+                'cursor': cursor
+            }
+            data = await self._fetch_page("crossref", source.base_url, params)
+            for result in self._parse_crossref_response(data):
+                yield result
+            
+            message = data.get('message', {})
+            cursor = message.get('next-cursor')
+            if not cursor or len(message.get('items', [])) < page_size:
+                return
+    
+    def _parse_crossref_response(self, data: Dict) -> List[ResearchResult]:
         """Parse CrossRef JSON response"""
         results = []
         
@@ -149,42 +254,43 @@ class DataSourceManager:
                     published = '-'.join(map(str, date_parts[0]))
             
             if title:
-                results.append({
-                    'title': title,
-                    'abstract': abstract,
-                    'authors': authors,
-                    'url': url,
-                    'published': published,
-                    'source': 'crossref',
-                    'quality_score': self.data_sources["crossref"].quality_weight
-                })
+                results.append(ResearchResult(
+                    title=title,
+                    authors=authors,
+                    # CrossRef abstracts are JATS XML
+                    abstract=MARKUP_PATTERN.sub('', abstract).strip(),
+                    url=url,
+                    source_type='crossref',
+                    quality_score=self.data_sources["crossref"].quality_weight,
+                    publication_date=published,
+                    citations=item.get('is-referenced-by-count', 0) or 0,
+                    language=item.get('language') or 'en'
+                ))
         
         return results
     
-    async def _search_semantic_scholar(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search Semantic Scholar API"""
-        session = await self.get_session()
-        
-        url = f"{self.data_sources['semantic_scholar'].base_url}/paper/search"
-        params = {
-            'query': query,
-            'limit': max_results,
-            'fields': 'title,abstract,authors,url,year,citationCount'
-        }
-        
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return self._parse_semantic_scholar_response(data)
-                else:
-                    logging.error(f"Semantic Scholar API error: {response.status}")
-                    return []
-        except Exception as e:
-            logging.error(f"Semantic Scholar search error: {e}")
-            return []
+    async def _iter_semantic_scholar(self, query: str, page_size: int) -> AsyncIterator[ResearchResult]:
+        """Page through Semantic Scholar API results by offset"""
+        source = self.data_sources["semantic_scholar"]
+        url = f"{source.base_url}/paper/search"
+        offset = 0
+        for _ in range(source.max_pages):
+            params = {
+                'query': query,
+                'offset': offset,
+                'limit': page_size,
+                'fields': 'title,abstract,authors,url,year,citationCount'
+            }
+            data = await self._fetch_page("semantic_scholar", url, params)
+            for result in self._parse_semantic_scholar_response(data):
+                yield result
+            
+            # 'next' is absent on the last page
+            if 'next' not in data:
+                return
+            offset = data['next']
     
-    def _parse_semantic_scholar_response(self, data: Dict) -> List[Dict[str, Any]]:
+    def _parse_semantic_scholar_response(self, data: Dict) -> List[ResearchResult]:
         """Parse Semantic Scholar JSON response"""
         results = []
         
@@ -203,51 +309,41 @@ class DataSourceManager:
             
             url = paper.get('url', '')
             year = paper.get('year', '')
-            citation_count = paper.get('citationCount', 0)
-            
-            # Boost quality score based on citations
-            base_quality = self.data_sources["semantic_scholar"].quality_weight
-            citation_boost = min(0.1, citation_count / 1000)  # Max 0.1 boost
-            quality_score = min(1.0, base_quality + citation_boost)
+            citation_count = paper.get('citationCount') or 0
             
             if title:
-                results.append({
-                    'title': title,
-                    'abstract': abstract or '',
-                    'authors': authors,
-                    'url': url,
-                    'published': str(year) if year else '',
-                    'source': 'semantic_scholar',
-                    'quality_score': quality_score,
-                    'citation_count': citation_count
-                })
+                results.append(ResearchResult(
+                    title=title,
+                    authors=authors,
+                    abstract=abstract or '',
+                    url=url,
+                    source_type='semantic_scholar',
+                    # Citations are weighed by QualityScorer along with other features
+                    quality_score=self.data_sources["semantic_scholar"].quality_weight,
+                    publication_date=str(year) if year else '',
+                    citations=citation_count,
+                    language='en'
+                ))
         
         return results
     
-    async def _search_openlibrary(self, query: str, max_results: int) -> List[Dict[str, Any]]:
-        """Search Open Library API"""
-        session = await self.get_session()
-        
-        url = "https://openlibrary.org/search.json"
-        params = {
-            'q': query,
-            'limit': max_results,
-            'fields': 'key,title,author_name,first_publish_year,subject'
-        }
-        
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return self._parse_openlibrary_response(data)
-                else:
-                    logging.error(f"Open Library API error: {response.status}")
-                    return []
-        except Exception as e:
-            logging.error(f"Open Library search error: {e}")
-            return []
+    async def _iter_openlibrary(self, query: str, page_size: int) -> AsyncIterator[ResearchResult]:
+        """Page through Open Library search results"""
+        source = self.data_sources["openlibrary"]
+        for page in range(1, source.max_pages + 1):
+            params = {
+                'q': query,
+                'page': page,
+                'limit': page_size,
+                'fields': 'key,title,author_name,first_publish_year,subject'
+            }
+            data = await self._fetch_page("openlibrary", source.base_url, params)
+            for result in self._parse_openlibrary_response(data):
+                yield result
+            if len(data.get('docs', [])) < page_size:
+                return
     
-    def _parse_openlibrary_response(self, data: Dict) -> List[Dict[str, Any]]:
+    def _parse_openlibrary_response(self, data: Dict) -> List[ResearchResult]:
         """Parse Open Library JSON response"""
         results = []
         
@@ -266,45 +362,43 @@ class DataSourceManager:
             abstract = f"Book covering topics: {', '.join(subjects[:5])}" if subjects else ''
             
             if title:
-                results.append({
-                    'title': title,
-                    'abstract': abstract,
-                    'authors': authors,
-                    'url': url,
-                    'published': str(year) if year else '',
-                    'source': 'openlibrary',
-                    'quality_score': self.data_sources["openlibrary"].quality_weight
-                })
+                results.append(ResearchResult(
+                    title=title,
+                    authors=authors,
+                    abstract=abstract,
+                    url=url,
+                    source_type='openlibrary',
+                    quality_score=self.data_sources["openlibrary"].quality_weight,
+                    publication_date=str(year) if year else '',
+                    citations=0,
+                    language='en'
+                ))
         
         return results
     
-    async def search_all_sources(self, query: str, max_results_per_source: int = 20) -> List[Dict[str, Any]]:
-        """Search all available data sources"""
-        all_results = []
+    async def search_all_sources(self, query: str, max_results_per_source: int = 20,
+                                 sources: Optional[List[str]] = None) -> List[ResearchResult]:
+        """Search all (or the named) enabled data sources concurrently"""
+        names = self._enabled_sources(sources)
         
-        for source_name in self.data_sources:
-            try:
-                results = await self.search_source(source_name, query, max_results_per_source)
-                all_results.extend(results)
-                
-                # Rate limiting
-                await asyncio.sleep(self.data_sources[source_name].rate_limit)
-                
-            except Exception as e:
-                logging.error(f"Error searching {source_name}: {e}")
+        outcomes = await asyncio.gather(
+            *(self.search_source(name, query, max_results_per_source) for name in names),
+            return_exceptions=True
+        )
+        
+        all_results = []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                logging.error(f"Error searching {name}: {outcome}")
                 continue
+            all_results.extend(outcome)
         
         # Sort by quality score
-        all_results.sort(key=lambda x: x.get('quality_score', 0), reverse=True)
+        all_results.sort(key=lambda x: x.quality_score, reverse=True)
         
         return all_results
     
     async def close(self):
-        """Close HTTP session"""
-        if self.session and not self.session.closed:
-            try:
-                await self.session.close()
-            except Exception as e:
-                logging.warning(f"Error closing data sources session: {e}")
-            finally:
-                self.session = None
\ No newline at end of file
+        """Close the HTTP client, unless it is shared and closed by its owner"""
+        if self._owns_http:
+            await self.http.close()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The active deadline passed, or its owner cancelled it"""
+
+
+class Deadline:
+    """Point in time by which a unit of work must finish.
+
+    Installed with ``use_deadline``, a deadline follows the work through every
+    coroutine and task it starts. Fetches and LLM calls bound their waits with
+    ``within_deadline``. Long loops check ``deadline_expired()`` between steps.
+    ``cancel()`` expires the deadline at once, for cooperative cancellation.
+    ``derive`` gives an earlier deadline sharing the same cancellation, which
+    lets a phase leave time for the work that follows it.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, expires_at: Optional[float] = None,
+                 _cancelled: Optional[asyncio.Event] = None):
+        if expires_at is None:
+            expires_at = time.monotonic() + seconds if seconds is not None else float('inf')
+        self.expires_at = expires_at
+        self._cancelled = _cancelled or asyncio.Event()
+
+    def derive(self, reserve: float) -> 'Deadline':
+        """Deadline ``reserve`` seconds before this one, cancelled along with it"""
+        return Deadline(expires_at=self.expires_at - reserve, _cancelled=self._cancelled)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def wait_cancelled(self):
+        await self._cancelled.wait()
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar('deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]):
+    """Make ``deadline`` the active deadline, unless an earlier one is already active"""
+    current = _current.get()
+    if deadline is None or (current is not None and current.expires_at <= deadline.expires_at):
+        yield current
+        return
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def deadline_expired() -> bool:
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+
+def time_left(default: float) -> float:
+    """``default`` seconds, capped by the active deadline"""
+    deadline = _current.get()
+    return default if deadline is None else min(default, deadline.remaining())
+
+
+async def within_deadline(awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Await under ``timeout`` and the active deadline, whichever is sooner.
+
+    Raises DeadlineExceeded when the deadline passes or is cancelled first,
+    and asyncio.TimeoutError when only ``timeout`` ran out.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return await asyncio.wait_for(awaitable, timeout)
+
+    task = asyncio.ensure_future(awaitable)
+    if deadline.expired():
+        task.cancel()
+        raise DeadlineExceeded()
+
+    limit = deadline.remaining()
+    budget = limit if timeout is None else min(timeout, limit)
+    cancelled = asyncio.ensure_future(deadline.wait_cancelled())
+    try:
+        done, _ = await asyncio.wait({task, cancelled}, timeout=budget,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        cancelled.cancel()
+        if not task.done():
+            task.cancel()
+    if task in done:
+        return task.result()
+    if deadline.cancelled or timeout is None or limit <= timeout:
+        raise DeadlineExceeded()
+    raise asyncio.TimeoutError()
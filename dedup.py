@@ -0,0 +1,241 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
+TOKEN_PATTERN = re.compile(r'\w+')
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def shingles(tokens: List[str], size: int = 3) -> Set[str]:
+    """Word k-shingles; short texts fall back to their tokens"""
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """Vectorized MinHash signatures using universal hashing mod a Mersenne prime"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+
+    def signature(self, features: Set[str]) -> np.ndarray:
+        if not features:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.int64)
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) & _MERSENNE_PRIME for feature in features),
+            dtype=np.int64, count=len(features)
+        )
+        return ((self.a * hashes + self.b) % _MERSENNE_PRIME).min(axis=1)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash index over MinHash signatures"""
+
+    def __init__(self, bands: int, rows: int, seed: int = 2):
+        self.bands = bands
+        self.rows = rows
+        self.buckets: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        # Folds each band's rows into one integer key (wrap-around is harmless here)
+        self._fold = np.random.default_rng(seed).integers(1, _MERSENNE_PRIME, size=rows, dtype=np.int64)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        used = signature[:self.bands * self.rows]
+        return (used.reshape(self.bands, self.rows) @ self._fold).tolist()
+
+    def candidates(self, keys: List[int]) -> Set[int]:
+        found = set()
+        for band, key in enumerate(keys):
+            bucket = self.buckets[band].get(key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def insert(self, keys: List[int], item: int):
+        for band, key in enumerate(keys):
+            self.buckets[band][key].append(item)
+
+
+class NearDuplicateDetector:
+    """Near-linear duplicate detection for research results.
+
+    Candidates come from two LSH indexes: one over title tokens, tuned to be
+    permissive because titles are short, and one over word shingles of title
+    plus abstract. Each candidate is then verified exactly. A pair is a
+    duplicate when the title token overlap exceeds ``title_threshold`` (the
+    previous pairwise rule) or the shingle Jaccard similarity reaches
+    ``content_threshold``.
+
+    Duplicates are merged: the highest-quality copy is kept, and the others'
+    URLs and languages are recorded on it as alternates.
+    """
+
+    def __init__(self, title_threshold: float = 0.6, content_threshold: float = 0.5,
+                 num_perm: int = 64):
+        self.title_threshold = title_threshold
+        self.content_threshold = content_threshold
+        self.hasher = MinHasher(num_perm)
+        self.title_index = LSHIndex(bands=num_perm // 3, rows=3)
+        self.content_index = LSHIndex(bands=num_perm // 4, rows=4)
+        self.representatives: List = []
+        self._title_tokens: List[Set[str]] = []
+        self._content_shingles: List[Set[str]] = []
+
+    def _is_duplicate(self, index: int, title_tokens: Set[str], content_shingles: Set[str]) -> bool:
+        seen_title = self._title_tokens[index]
+        if title_tokens and seen_title:
+            overlap = len(title_tokens & seen_title)
+            if overlap / min(len(title_tokens), len(seen_title)) > self.title_threshold:
+                return True
+
+        seen_content = self._content_shingles[index]
+        if content_shingles and seen_content:
+            union = len(content_shingles | seen_content)
+            if len(content_shingles & seen_content) / union >= self.content_threshold:
+                return True
+
+        return False
+
+    def _find_duplicate(self, title_tokens, content_shingles, title_keys, content_keys) -> Optional[int]:
+        candidates = self.title_index.candidates(title_keys) | self.content_index.candidates(content_keys)
+        for index in sorted(candidates):
+            if self._is_duplicate(index, title_tokens, content_shingles):
+                return index
+        return None
+
+    def add(self, result) -> bool:
+        """Add a result; return True if it is new, False if merged into a duplicate"""
+        tokens = tokenize(result.title)
+        title_tokens = set(tokens)
+        content_shingles = shingles(tokens + tokenize(result.abstract or ''))
+        title_keys = self.title_index.band_keys(self.hasher.signature(title_tokens))
+        content_keys = self.content_index.band_keys(self.hasher.signature(content_shingles))
+
+        match = self._find_duplicate(title_tokens, content_shingles, title_keys, content_keys)
+        if match is None:
+            index = len(self.representatives)
+            self.representatives.append(result)
+            self._title_tokens.append(title_tokens)
+            self._content_shingles.append(content_shingles)
+            self.title_index.insert(title_keys, index)
+            self.content_index.insert(content_keys, index)
+            return True
+
+        self.representatives[match] = merge_duplicates(self.representatives[match], result)
+        return False
+
+    def add_all(self, results) -> List:
+        for result in results:
+            self.add(result)
+        return self.representatives
+
+    def results(self) -> List:
+        return list(self.representatives)
+
+
+def merge_duplicates(kept, other):
+    """Merge two duplicate results, keeping the higher-quality one"""
+    if other.quality_score > kept.quality_score:
+        kept, other = other, kept
+
+    for url in [other.url] + list(other.alternate_urls):
+        if url and url != kept.url and url not in kept.alternate_urls:
+            kept.alternate_urls.append(url)
+    for language in [other.language] + list(other.alternate_languages):
+        if language and language != kept.language and language not in kept.alternate_languages:
+            kept.alternate_languages.append(language)
+    return kept
+
+
+class SemanticDeduplicator:
+    """Clusters results whose title and abstract embeddings are nearly identical.
+
+    Catches what token-based detection cannot, such as the same Wikipedia
+    article in several languages. Results are visited best-first. Each one
+    either joins the closest existing cluster above the threshold or starts a
+    new cluster, so every cluster's representative is its highest-quality
+    member. Pairs in different languages use the lower
+    ``cross_language_threshold``, because a monolingual embedding model scores
+    translations below near-identical same-language text.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], np.ndarray], threshold: float = 0.92,
+                 cross_language_threshold: float = 0.8, batch_size: int = 64):
+        self.embed = embed
+        self.threshold = threshold
+        self.cross_language_threshold = cross_language_threshold
+        self.batch_size = batch_size
+
+    @staticmethod
+    def result_text(result) -> str:
+        # Same text VectorDatabase.add_documents embeds, so vectors can be reused
+        return f"{result.title} {result.abstract}"
+
+    def _embed_all(self, texts: List[str]) -> np.ndarray:
+        batches = [self.embed(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        vectors = np.concatenate(batches).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    def _threshold(self, language: str, other_language: str) -> float:
+        return self.threshold if language == other_language else self.cross_language_threshold
+
+    def cluster(self, results: List,
+                stored: Optional[Callable[[np.ndarray], List[Tuple[float, str]]]] = None) -> Tuple[List, np.ndarray]:
+        """Return one representative per cluster and the representatives' embeddings.
+
+        ``stored``, if given, maps an embedding to the (similarity, language)
+        of its nearest already-stored documents. Clusters that duplicate a
+        stored document are dropped, since their stored copy represents them.
+        """
+        if not results:
+            return [], np.zeros((0, 0), dtype=np.float32)
+
+        order = sorted(range(len(results)), key=lambda i: results[i].quality_score, reverse=True)
+        vectors = self._embed_all([self.result_text(results[i]) for i in order])
+
+        representatives: List = []
+        rep_rows: List[int] = []
+        rep_languages: List[str] = []
+        for row, i in enumerate(order):
+            result = results[i]
+            language = result.language or ''
+            if rep_rows:
+                similarities = vectors[rep_rows] @ vectors[row]
+                thresholds = np.array([self._threshold(language, lang) for lang in rep_languages])
+                matches = np.flatnonzero(similarities >= thresholds)
+                if len(matches):
+                    best = matches[np.argmax(similarities[matches])]
+                    representatives[best] = merge_duplicates(representatives[best], result)
+                    continue
+
+            representatives.append(result)
+            rep_rows.append(row)
+            rep_languages.append(language)
+
+        if stored is not None:
+            kept = [
+                i for i, row in enumerate(rep_rows)
+                if not any(similarity >= self._threshold(rep_languages[i], language or '')
+                           for similarity, language in stored(vectors[row]))
+            ]
+            representatives = [representatives[i] for i in kept]
+            rep_rows = [rep_rows[i] for i in kept]
+
+        return representatives, vectors[rep_rows]
+
+    def deduplicate(self, results: List) -> List:
+        return self.cluster(results)[0]
@@ -1,12 +1,22 @@
-from typing import Dict, List
-from dataclasses import dataclass
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import partial
 
 from research_agent import DeepResearchAgent
+from research_result import ResearchResult
+from scoring import QualityScorer
 from data_sources import DataSourceManager
 from storage import VectorDatabase, DocumentStore
+from async_storage import AsyncStorage
+from dedup import SemanticDeduplicator
 from character_engine import CharacterEngine
 from ai_providers import AIProviderManager
 from config import ResearchConfig
+from deadline import Deadline, DeadlineExceeded, deadline_expired, use_deadline
+from http_client import HttpClient
+from context_packing import ContextPacker
+from conversation import ConversationMemory
 import logging
 
 @dataclass
@@ -19,24 +29,104 @@ class CharacterProfile:
     historical_context: Dict[str, str]
     contemporaries: List[str]
 
+@dataclass
+class ResearchRun:
+    """State and counters for one research pass over a character"""
+    character_name: str
+    character_id: int
+    incremental: bool = False
+    max_query_age: float = 0.0  # Seconds before a recorded query is stale
+    queries_fetched: int = 0
+    queries_cached: int = 0
+    documents_added: int = 0
+    documents_unchanged: int = 0
+    profile_rebuilt: bool = True
+    languages: List[str] = field(default_factory=lambda: ["en"])  # Wikipedia editions to search
+    partial: bool = False  # Research stopped at the deadline before every query ran
+    cancelled: bool = False
+    profile_degraded: bool = False  # Profile needed fallbacks, so it was not stored
+
+def results_hash(results: List[ResearchResult]) -> str:
+    """Order-independent hash of a query's results"""
+    digest = hashlib.sha1()
+    for document_hash in sorted(r.content_hash for r in results):
+        digest.update(document_hash.encode('ascii'))
+    return digest.hexdigest()
+
 class DeepCharacterResearcher:
     def __init__(self, config: ResearchConfig):
         self.config = config
-        self.data_sources = DataSourceManager(config)
-        self.vector_db = VectorDatabase(config.vector_db_path)
+        # One connection pool for every source and AI provider
+        self.http = HttpClient.from_config(config)
+        self.data_sources = DataSourceManager(config, http=self.http)
+        self.vector_db = VectorDatabase(
+            config.vector_db_path,
+            embedding_service_url=config.embedding_service_url,
+            embedding_backend=config.embedding_backend,
+            model_cache_dir=config.model_cache_dir,
+            index_backend=config.vector_backend,
+            index_mode=config.vector_index_mode
+        )
         self.doc_store = DocumentStore(config.doc_store_path)
-        self.research_agent = DeepResearchAgent(self.data_sources)
+        self.storage = AsyncStorage(
+            self.doc_store, self.vector_db,
+            max_workers=config.storage_max_workers,
+            max_pending=config.storage_max_pending
+        )
+        self.scorer = QualityScorer.load(config.scoring_weights_path)
+        self.research_agent = DeepResearchAgent(self.data_sources, self.scorer, http=self.http)
         
         # Initialize AI Provider Manager
-        self.ai_manager = AIProviderManager(config.get_ai_config())
+        self.ai_manager = AIProviderManager(config.get_ai_config(), http=self.http)
         
         # Initialize Character Engine with AI Manager
-        self.character_engine = CharacterEngine(self.vector_db, self.doc_store, self.ai_manager)
+        self.character_engine = CharacterEngine(
+            self.vector_db, self.doc_store, self.ai_manager, storage=self.storage,
+            packer=ContextPacker(config.context_token_budget),
+            memory=ConversationMemory(
+                self.storage, self.ai_manager,
+                token_budget=config.conversation_token_budget,
+                recent_turns=config.conversation_recent_turns
+            ),
+            structured_profiles=config.structured_profile_extraction
+        )
         
+    def use_rate_limiter(self, limiter):
+        """Route every research HTTP request through a HostRateLimiter"""
+        self.research_agent.trace_configs.append(limiter.trace_config())
+        self.data_sources.trace_configs.append(limiter.trace_config())
+    
     async def research_character(self, character_name: str, 
                                research_depth: str = "comprehensive",
-                               ai_provider: str = None) -> CharacterProfile:
-        """Main orchestration method for deep character research"""
+                               ai_provider: str = None,
+                               incremental: bool = False,
+                               deadline: Optional[Deadline] = None) -> Optional[CharacterProfile]:
+        """Main orchestration method for deep character research.
+        
+        With ``incremental``, queries run within ``research_query_max_age_hours``
+        are served from their recorded results, and the profile is only rebuilt
+        when the stored document set changed.
+        
+        Research is bounded by ``deadline`` (``research_timeout`` by default).
+        When it passes, whatever was found so far is stored and profiled.
+        Cancelling the deadline stores what was found and skips profiling,
+        returning None.
+        """
+        profile, _ = await self.run_research(character_name, research_depth, ai_provider, incremental, deadline)
+        return profile
+    
+    async def run_research(self, character_name: str, research_depth: str = "comprehensive",
+                           ai_provider: str = None,
+                           incremental: bool = False,
+                           deadline: Optional[Deadline] = None) -> Tuple[Optional[CharacterProfile], ResearchRun]:
+        """Research a character and return the profile with the run's counters"""
+        deadline = deadline or Deadline(self.config.research_timeout or None)
+        with use_deadline(deadline):
+            return await self._run_research(character_name, research_depth, ai_provider, incremental, deadline)
+    
+    async def _run_research(self, character_name: str, research_depth: str, ai_provider: Optional[str],
+                            incremental: bool, deadline: Deadline) -> Tuple[Optional[CharacterProfile], ResearchRun]:
+        """run_research under its deadline"""
         
         # Use config default if no provider specified
         provider = ai_provider or self.config.default_provider
@@ -56,27 +146,70 @@ class DeepCharacterResearcher:
                             logging.info(f"Falling back to {provider}")
                             break
         
-        # Phase 1: Initial character discovery
-        print("🔍 Phase 1: Discovering character basics...")
-        initial_profile = await self._discover_character_basics(character_name)
+        run = ResearchRun(
+            character_name=character_name,
+            character_id=await self.storage.add_character(character_name),
+            incremental=incremental,
+            max_query_age=self.config.research_query_max_age_hours * 3600
+        )
         
-        # Phase 2: Domain-specific deep research
-        print("📚 Phase 2: Conducting deep research...")
-        research_results = await self._conduct_deep_research(initial_profile, research_depth)
+        # Searching stops early enough to leave time for storage and profiling
+        collection_deadline = deadline.derive(min(self.config.research_synthesis_reserve,
+                                                  deadline.remaining() / 2))
+        with use_deadline(collection_deadline):
+            run.languages = await self.research_agent.resolve_languages(character_name)
+            print(f"🌐 Researching {character_name} in: {', '.join(run.languages)}")
+            
+            # Phase 1: Initial character discovery
+            print("🔍 Phase 1: Discovering character basics...")
+            initial_profile = await self._discover_character_basics(character_name, run)
+            
+            # Phase 2: Domain-specific deep research
+            print("📚 Phase 2: Conducting deep research...")
+            research_results = await self._conduct_deep_research(initial_profile, research_depth, run)
+            run.partial = collection_deadline.expired()
         
         # Phase 3: Knowledge synthesis and storage
         print("💾 Phase 3: Synthesizing and storing knowledge...")
-        await self._synthesize_and_store(character_name, research_results)
+        await self._synthesize_and_store(character_name, research_results, run)
+        
+        if deadline.cancelled:
+            run.cancelled = True
+            print(f"🛑 Research cancelled; kept {run.documents_added} new documents")
+            return None, run
         
         # Phase 4: Character engine training with specified AI provider
         print("🎭 Phase 4: Training character engine...")
-        character_profile = await self._train_character_engine(character_name, initial_profile, provider)
+        try:
+            character_profile = await self._train_character_engine(character_name, initial_profile, provider, run)
+        except DeadlineExceeded:
+            character_profile = None
+        
+        if character_profile is None or deadline.cancelled:
+            run.cancelled = deadline.cancelled
+            run.partial = True
+            print(f"🛑 Research {'cancelled' if run.cancelled else 'deadline reached'} while profiling; "
+                  f"kept {run.documents_added} new documents, profile not stored")
+            return None, run
         
-        return character_profile
+        if run.partial:
+            print("⏱️  Research deadline reached; profile built from partial results")
+        
+        if incremental:
+            print(f"♻️  Incremental refresh: {run.queries_fetched} queries fetched, "
+                  f"{run.queries_cached} reused, {run.documents_added} new documents, "
+                  f"profile {'rebuilt' if run.profile_rebuilt else 'unchanged'}")
+        
+        return character_profile, run
     
     async def chat_with_character(self, character_name: str, message: str, 
-                                ai_provider: str = None, model: str = None):
-        """Chat with a researched character using specified AI provider"""
+                                ai_provider: str = None, model: str = None,
+                                session_id: Optional[str] = None):
+        """Chat with a researched character using specified AI provider.
+
+        Pass the same ``session_id`` on every message of a conversation so the
+        character remembers it; without one, each message stands alone.
+        """
         
         # Use config defaults if not specified
         provider = ai_provider or self.config.default_provider
@@ -84,7 +217,7 @@ class DeepCharacterResearcher:
         
         try:
             response = await self.character_engine.respond_as_character(
-                character_name, message, provider, model
+                character_name, message, provider, model, session_id=session_id
             )
             
             print(f"\n{character_name} ({response.provider}/{response.model}):")
@@ -131,12 +264,46 @@ class DeepCharacterResearcher:
         return responses
     
     async def _train_character_engine(self, character_name: str, initial_profile: Dict, 
-                                    provider: str) -> CharacterProfile:
-        """Train character engine using specified AI provider"""
+                                    provider: str, run: Optional[ResearchRun] = None) -> CharacterProfile:
+        """Train character engine using specified AI provider.
+
+        Post-ingest stage: the profile and its chat prompt scaffold are stored
+        next to the documents, so a chat in any process starts from one
+        indexed read instead of building the profile on its first message.
+        """
         
-        profile = await self.character_engine.create_character_embodiment(
-            character_name, provider
-        )
+        profile = None
+        if run:
+            document_set_hash = await self.storage.get_document_set_hash(run.character_id)
+            stored = await self.storage.get_character_profile(run.character_id)
+            if run.incremental and stored and stored['document_set_hash'] == document_set_hash:
+                print("  ✅ Document set unchanged, reusing stored profile")
+                profile = stored['profile']
+                scaffold = self.character_engine.cache_profile(
+                    character_name, profile, stored.get('prompt_scaffold')
+                )
+                if not stored.get('prompt_scaffold'):
+                    # Stored before scaffolds were precomputed
+                    await self.storage.save_character_profile(run.character_id, profile,
+                                                              document_set_hash, scaffold)
+                run.profile_rebuilt = False
+        
+        if profile is None:
+            profile = await self.character_engine.create_character_embodiment(
+                character_name, provider
+            )
+            degraded = (character_name in self.character_engine.fallback_profiles
+                        or deadline_expired())
+            if run and degraded:
+                # A stored profile is reused while the document set is unchanged,
+                # so one with canned values would never be rebuilt
+                run.profile_degraded = True
+                print("  ⚠️  Profile used fallback values; not stored, the next run rebuilds it")
+            elif run:
+                await self.storage.save_character_profile(
+                    run.character_id, profile, document_set_hash,
+                    self.character_engine.prompt_scaffolds.get(character_name)
+                )
         return CharacterProfile(
             name=character_name,
             time_period=profile.get('historical_context', {}).get('time_period', 'Unknown'),
@@ -147,7 +314,37 @@ class DeepCharacterResearcher:
             contemporaries=profile.get('contemporaries', [])
         )
     
-    async def _discover_character_basics(self, character_name: str) -> Dict:
+    async def _run_query(self, run: Optional[ResearchRun], source: str, query: str,
+                         fetch: Callable[[str], Awaitable[List[ResearchResult]]]) -> List[ResearchResult]:
+        """Run a research query, reusing its recorded results if they are still fresh"""
+        if run is None:
+            return await fetch(query)
+        
+        if run.incremental:
+            record = await self.storage.get_research_query(run.character_id, source, query)
+            if record and record['age_seconds'] < run.max_query_age:
+                run.queries_cached += 1
+                return [ResearchResult.from_dict(result) for result in record['results']]
+        
+        results = await fetch(query)
+        run.queries_fetched += 1
+        # Only complete results are reused; a source that timed out, failed, hit the
+        # deadline or lost a language or sub-source is asked again on the next run
+        source_metrics = getattr(results, 'source_metrics', {})
+        if all(metrics['status'] == 'ok' for metrics in source_metrics.values()):
+            await self.storage.record_research_query(
+                run.character_id, source, query, results_hash(results), [r.to_dict() for r in results]
+            )
+        return results
+    
+    def _academic_search(self, run: Optional[ResearchRun]) -> Callable[[str], Awaitable[List[ResearchResult]]]:
+        """Academic search localized to the character's languages"""
+        return partial(self.research_agent.search_academic_sources,
+                       languages=run.languages if run else None,
+                       subject=run.character_name if run else None)
+    
+    async def _discover_character_basics(self, character_name: str,
+                                         run: Optional[ResearchRun] = None) -> Dict:
         """Discover basic information about the character"""
         discovery_queries = [
             f"{character_name} biography historical facts",
@@ -157,39 +354,52 @@ class DeepCharacterResearcher:
         ]
         
         basic_info = {}
+        search_academic = self._academic_search(run)
         for query in discovery_queries:
+            if deadline_expired():
+                break
             print(f"  🔎 Searching: {query}")
-            results = await self.research_agent.search_academic_sources(query)
+            results = await self._run_query(run, "academic", query, search_academic)
             basic_info[query] = results
             print(f"    Found {len(results)} sources")
             
         return basic_info
     
-    async def _conduct_deep_research(self, initial_profile: Dict, depth: str) -> Dict:
+    async def _conduct_deep_research(self, initial_profile: Dict, depth: str,
+                                     run: Optional[ResearchRun] = None) -> Dict:
         """Conduct comprehensive domain-specific research"""
         research_domains = self._extract_research_domains(initial_profile)
         
         research_results = {}
         for domain in research_domains:
+            if deadline_expired():
+                print("  ⏱️  Deadline reached, skipping remaining domains")
+                break
             print(f"  📖 Researching domain: {domain}")
-            domain_results = await self._research_domain(domain, depth)
+            domain_results = await self._research_domain(domain, depth, run)
             research_results[domain] = domain_results
             print(f"    Found {len(domain_results)} sources for {domain}")
             
         return research_results
     
-    async def _research_domain(self, domain: str, depth: str) -> List[Dict]:
+    async def _research_domain(self, domain: str, depth: str,
+                               run: Optional[ResearchRun] = None) -> List[Dict]:
         """Research a specific domain thoroughly"""
         # Academic sources (ArXiv, Wikipedia, etc.)
-        academic_results = await self.research_agent.search_academic_sources(
-            f"{domain} historical analysis scholarly research"
+        academic_results = await self._run_query(
+            run, "academic", f"{domain} historical analysis scholarly research",
+            self._academic_search(run)
         )
         
         # Primary sources (placeholder)
-        primary_sources = await self.research_agent.search_primary_sources(domain)
+        primary_sources = await self._run_query(
+            run, "primary", domain, self.research_agent.search_primary_sources
+        )
         
         # Contemporary accounts (placeholder)
-        contemporary_accounts = await self.research_agent.search_contemporary_sources(domain)
+        contemporary_accounts = await self._run_query(
+            run, "contemporary", domain, self.research_agent.search_contemporary_sources
+        )
         
         # Cross-reference and validate
         validated_results = await self.research_agent.cross_validate_sources([
@@ -231,49 +441,97 @@ class DeepCharacterResearcher:
         print(f"  📊 Extracted domains: {domain_list}")
         return domain_list
     
-    async def _synthesize_and_store(self, character_name: str, research_results: Dict):
+    async def _synthesize_and_store(self, character_name: str, research_results: Dict,
+                                    run: Optional[ResearchRun] = None):
         """Synthesize and store research results"""
         # Add character to document store
-        character_id = self.doc_store.add_character(character_name)
+        character_id = run.character_id if run else await self.storage.add_character(character_name)
         print(f"  💾 Created character record with ID: {character_id}")
         
-        # Process and store research results
-        documents = []
-        total_stored = 0
-        
+        # Only new or changed documents are stored and embedded; results merged
+        # into a stored document on an earlier run are skipped too
+        stored_hashes = await self.storage.get_document_hashes(character_id)
+        known_hashes = stored_hashes | await self.storage.get_duplicate_hashes(character_id)
+        new_results = []
+        unchanged = 0
         for domain, results in research_results.items():
-            print(f"    📄 Storing {len(results)} documents for domain: {domain}")
-            
             for result in results:
-                doc = {
-                    'title': result.title if hasattr(result, 'title') else 'Research Document',
-                    'content': result.abstract if hasattr(result, 'abstract') else str(result),
-                    'url': result.url if hasattr(result, 'url') else '',
-                    'source_type': result.source_type if hasattr(result, 'source_type') else 'unknown',
-                    'quality_score': result.quality_score if hasattr(result, 'quality_score') else 0.5,
-                    'metadata': {
-                        'domain': domain,
-                        'authors': result.authors if hasattr(result, 'authors') else [],
-                        'publication_date': result.publication_date if hasattr(result, 'publication_date') else '',
-                        'language': result.language if hasattr(result, 'language') else 'en'
-                    }
-                }
-                
-                # Add to document store
-                doc_id = self.doc_store.add_document(character_id, doc)
-                documents.append(doc)
-                total_stored += 1
+                result_hash = result.content_hash
+                if result_hash in known_hashes:
+                    unchanged += 1
+                    continue
+                known_hashes.add(result_hash)
+                result.domain = domain
+                new_results.append(result)
+        if unchanged:
+            print(f"  ⏭️  Skipping {unchanged} documents already stored")
+        if run:
+            run.documents_unchanged += unchanged
         
-        print(f"  ✅ Stored {total_stored} documents total")
+        # Score on a common scale so dedup keeps the best copy across sources
+        self.scorer.apply(new_results, character_name)
         
-        # Add to vector database
-        if documents:
-            print(f"  🔢 Adding {len(documents)} documents to vector database...")
-            self.vector_db.add_documents(character_name, documents)
+        # Cluster near-identical results across domains and languages before storing
+        results = new_results
+        embeddings = None
+        if results:
+            deduplicator = SemanticDeduplicator(
+                self.vector_db.embed,
+                threshold=self.config.semantic_dedup_threshold,
+                cross_language_threshold=self.config.semantic_dedup_cross_language_threshold
+            )
+            # New results are also compared with what is already stored, so a copy
+            # merged away on an earlier run is not stored on this one
+            stored = partial(self._stored_neighbours, character_name) if stored_hashes else None
+            try:
+                results, embeddings = await self.storage.run("semantic_dedup", deduplicator.cluster,
+                                                             results, stored)
+                print(f"  🧬 Semantic dedup kept {len(results)} of {len(new_results)} documents")
+                kept = {id(result) for result in results}
+                merged = [result.content_hash for result in new_results if id(result) not in kept]
+                if merged:
+                    await self.storage.add_duplicate_hashes(character_id, merged)
+            except Exception as e:
+                logging.warning(f"Semantic dedup failed, storing all results: {e}")
+        
+        # Process and store research results
+        for result in results:
+            await self.storage.add_document(character_id, result.to_storage_row())
+        
+        print(f"  ✅ Stored {len(results)} documents total")
+        if run:
+            run.documents_added += len(results)
+        
+        # Add to vector database, reusing the dedup embeddings
+        if results:
+            print(f"  🔢 Adding {len(results)} documents to vector database...")
+            await self.storage.add_vector_documents(character_name, results, embeddings)
             print(f"  ✅ Vector database updated")
         else:
             print(f"  ⚠️  No documents to add to vector database")
     
+    def _stored_neighbours(self, character_name: str, embedding) -> List[Tuple[float, str]]:
+        """Similarity and language of the stored documents nearest to ``embedding``"""
+        try:
+            hits = self.vector_db.search_by_embedding(character_name, embedding, limit=5)
+        except Exception as e:
+            logging.warning(f"Could not compare with stored documents of {character_name}: {e}")
+            return []
+        return [(hit['similarity'], hit['language']) for hit in hits]
+    
+    async def reindex_vectors(self) -> int:
+        """Rebuild the vector index from the document store.
+        
+        Needed after switching VECTOR_BACKEND or VECTOR_INDEX_MODE.
+        """
+        total = 0
+        for character in await self.storage.get_characters():
+            documents = await self.storage.get_character_documents(character['name'])
+            await self.storage.add_vector_documents(character['name'], documents)
+            total += len(documents)
+            print(f"  🔢 Indexed {len(documents)} documents for {character['name']}")
+        return total
+    
     def filter_characters_by_profession(self, profession: str) -> List[CharacterProfile]:
         """
         Filter stored characters by profession (known_roles).
@@ -287,6 +545,11 @@ class DeepCharacterResearcher:
 
     async def cleanup(self):
         """Cleanup resources"""
+        # Let pending conversation summaries finish while providers are still open
+        await self.character_engine.memory.flush()
+        await self.character_engine.chat_log.close()
         await self.ai_manager.close_all()
         await self.research_agent.close()
-        await self.data_sources.close()
\ No newline at end of file
+        await self.data_sources.close()
+        await self.http.close()
+        self.storage.close()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# Keywords that suggest a knowledge domain, matched as substrings of lowercased text
+DOMAIN_KEYWORDS = {
+    'Art': ['art', 'paint', 'sculpture', 'drawing'],
+    'Science & Engineering': ['science', 'engineer', 'invention', 'machine'],
+    'Anatomy & Medicine': ['anatomy', 'medical', 'body', 'dissection'],
+    'Military Strategy': ['military', 'war', 'battle', 'strategy'],
+    'Philosophy': ['philosophy', 'thought', 'idea', 'belief'],
+    'Mathematics': ['mathematics', 'geometry', 'calculation'],
+    'Architecture': ['architecture', 'building', 'design'],
+}
+
+# Life dates, most specific first
+YEAR_RANGE_PATTERN = re.compile(r'(\d{4})-(\d{4})')  # 1452-1519
+BORN_PATTERN = re.compile(r'born[^\n]*?(\d{4})')  # born 1452
+DIED_PATTERN = re.compile(r'died[^\n]*?(\d{4})')  # died 1519
+YEAR_PATTERN = re.compile(r'\d{4}')
+
+
+@dataclass
+class DocumentFeatures:
+    """What the analysis steps need from a character's documents, gathered in one pass"""
+    time_period: Optional[str] = None
+    domains: List[str] = field(default_factory=list)
+
+
+def _first_year_pair(text: str) -> Optional[str]:
+    """First two years on one line, e.g. "1452 ... 1519", without backtracking over the text"""
+    for line in text.split('\n'):
+        years = YEAR_PATTERN.findall(line)
+        if len(years) >= 2:
+            return f"{years[0]}-{years[1]}"
+    return None
+
+
+def _time_period(text: str) -> Optional[str]:
+    match = YEAR_RANGE_PATTERN.search(text)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    for pattern in (BORN_PATTERN, DIED_PATTERN):
+        match = pattern.search(text)
+        if match:
+            return f"Around {match.group(1)}"
+    return _first_year_pair(text)
+
+
+def _domains(text: str, found: Dict[str, None]):
+    # Substring checks run in C and short-circuit; each domain is dropped once found,
+    # so later documents are only scanned for domains not seen yet
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        if domain not in found and any(keyword in text for keyword in keywords):
+            found[domain] = None
+
+
+def extract_features(documents: Iterable[Dict[str, Any]]) -> DocumentFeatures:
+    """Time period and knowledge domains of a character's documents.
+
+    The time period comes from the first document with a date in it. Domains
+    come from document metadata and keyword matches in titles and content,
+    in the order they are first seen.
+    """
+    features = DocumentFeatures()
+    found: Dict[str, None] = {}
+    for doc in documents:
+        if features.time_period is None:
+            features.time_period = _time_period(doc.get('content', '') + ' ' + doc.get('abstract', ''))
+
+        # Stored rows always carry a domain key, often empty
+        metadata = doc.get('metadata') or {}
+        if isinstance(metadata, dict) and metadata.get('domain'):
+            found.setdefault(metadata['domain'])
+        if not all(domain in found for domain in DOMAIN_KEYWORDS):
+            content = doc.get('content', doc.get('abstract', ''))
+            _domains((doc.get('title', '') + ' ' + content).lower(), found)
+    features.domains = list(found)
+    return features
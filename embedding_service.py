@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Local Embedding Service
+A single process owns the embedding model and serves embedding requests from
+every API worker over a Unix socket or local TCP port. Requests that arrive
+close together are coalesced into one batched forward pass.
+
+Protocol: one JSON object per line.
+    request:  {"texts": ["...", "..."]}
+    response: {"embeddings": [[...], [...]]} or {"error": "..."}
+
+Usage:
+    python embedding_service.py --address unix:/tmp/dcr-embeddings.sock
+    python embedding_service.py --address tcp://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import time
+from typing import List, Optional, Tuple
+
+from embeddings import EMBEDDING_MODEL_NAME, create_embedding_backend
+
+DEFAULT_ADDRESS = "tcp://127.0.0.1:8765"
+STREAM_LIMIT = 64 * 1024 * 1024  # Allow large batches on a single line
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """Parse 'unix:/path' or 'tcp://host:port' into (family, target)"""
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if path.startswith("//"):  # unix:///tmp/x.sock
+            path = path[2:]
+        return "unix", path
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class EmbeddingService:
+    """Embedding server that batches concurrent requests into one model call"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 backend: str = "sentence_transformers", cache_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.backend_name = backend
+        self.cache_dir = cache_dir
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.backend = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.batches = 0
+        self.texts_embedded = 0
+
+    def load_model(self):
+        """Load the model up front so the first request is not a cold start"""
+        start = time.perf_counter()
+        self.backend = create_embedding_backend(self.backend_name, self.model_name, self.cache_dir)
+        logging.info(f"Loaded {self.model_name} ({self.backend_name}) in {time.perf_counter() - start:.1f}s")
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Queue texts for the next batch and wait for their embeddings"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _batch_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            batch_size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            # Coalesce whatever else arrives before the wait window closes
+            while batch_size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                batch_size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(
+                    None, lambda: self.backend.embed(texts).tolist()
+                )
+            except Exception as e:
+                logging.error(f"Embedding batch failed: {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts_embedded += len(texts)
+            offset = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    embeddings = await self.embed(list(request.get("texts", [])))
+                    response = {"embeddings": embeddings}
+                except Exception as e:
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str = DEFAULT_ADDRESS):
+        """Load the model and serve requests until cancelled"""
+        if self.backend is None:
+            self.load_model()
+        self.queue = asyncio.Queue()
+        worker = asyncio.create_task(self._batch_worker())
+
+        family, target = parse_address(address)
+        if family == "unix":
+            server = await asyncio.start_unix_server(self._handle_client, path=target, limit=STREAM_LIMIT)
+        else:
+            host, port = target
+            server = await asyncio.start_server(self._handle_client, host, port, limit=STREAM_LIMIT)
+
+        logging.info(f"Embedding service listening on {address}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+
+class EmbeddingServiceClient:
+    """Blocking client for EmbeddingService, safe to call from worker threads"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = 30.0):
+        self.address = address
+        self.timeout = timeout
+        self.family, self.target = parse_address(address)
+
+    def _connect(self) -> socket.socket:
+        if self.family == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.target)
+        return sock
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts through the shared service"""
+        if not texts:
+            return []
+
+        with self._connect() as sock:
+            sock.sendall(json.dumps({"texts": texts}).encode() + b"\n")
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+
+        if not line:
+            raise ConnectionError("Embedding service closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"Embedding service error: {response['error']}")
+        return response["embeddings"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding service")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS,
+                        help="unix:/path/to.sock or tcp://host:port")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--backend", default="sentence_transformers",
+                        help="Embedding backend: sentence_transformers or onnx")
+    parser.add_argument("--cache-dir", default=None, help="Where ONNX models are cached")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="How long to wait for more requests before running a batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = EmbeddingService(args.model, args.max_batch_size, args.max_wait_ms,
+                               backend=args.backend, cache_dir=args.cache_dir)
+    try:
+        asyncio.run(service.serve(args.address))
+    except KeyboardInterrupt:
+        logging.info(f"Stopped after {service.batches} batches, {service.texts_embedded} texts")
+
+
+if __name__ == "__main__":
+    main()
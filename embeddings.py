@@ -0,0 +1,155 @@
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+class EmbeddingBackend:
+    """Turns texts into L2-normalised float32 vectors of shape (len(texts), dim)"""
+
+    name = "base"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """PyTorch SentenceTransformer model (the original implementation)"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = batch_size
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """ONNX Runtime CPU backend, optionally with int8 dynamic quantization.
+
+    Uses the ONNX export published alongside the sentence-transformers model
+    and quantizes it once into ``cache_dir``. Pooling and normalisation match
+    SentenceTransformer so vectors stay compatible with existing collections.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, cache_dir: Optional[str] = None,
+                 quantize: bool = True, batch_size: int = 64, max_length: int = 256,
+                 num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.batch_size = batch_size
+
+        model_path, tokenizer_path = self._download_model()
+        if quantize:
+            model_path = self._quantize(model_path)
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _download_model(self):
+        from huggingface_hub import hf_hub_download
+
+        repo_id = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+        cache_dir = str(self.cache_dir) if self.cache_dir else None
+        model_path = hf_hub_download(repo_id, "onnx/model.onnx", cache_dir=cache_dir)
+        tokenizer_path = hf_hub_download(repo_id, "tokenizer.json", cache_dir=cache_dir)
+        return model_path, tokenizer_path
+
+    def _quantize(self, model_path: str) -> str:
+        """Quantize weights to int8 once and reuse the result"""
+        target_dir = self.cache_dir or Path(model_path).parent
+        target_dir.mkdir(parents=True, exist_ok=True)
+        quantized_path = target_dir / f"{self.model_name.replace('/', '_')}.int8.onnx"
+
+        if not quantized_path.exists():
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            start = time.perf_counter()
+            quantize_dynamic(model_path, str(quantized_path), weight_type=QuantType.QInt8)
+            logging.info(f"Quantized {self.model_name} to int8 in {time.perf_counter() - start:.1f}s")
+
+        return str(quantized_path)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalisation
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Batch texts of similar length together to minimise padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = []
+        for start in range(0, len(order), self.batch_size):
+            batch = [texts[i] for i in order[start:start + self.batch_size]]
+            batches.append(self._embed_batch(batch))
+
+        vectors = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.concatenate(batches)
+        return vectors
+
+
+class ServiceEmbeddingBackend(EmbeddingBackend):
+    """Client for the shared embedding service (see embedding_service.py)"""
+
+    name = "service"
+
+    def __init__(self, address: str):
+        from embedding_service import EmbeddingServiceClient
+        self.client = EmbeddingServiceClient(address)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.client.embed(texts), dtype=np.float32)
+
+
+EMBEDDING_BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxEmbeddingBackend.name: OnnxEmbeddingBackend,
+}
+
+
+def create_embedding_backend(name: str = SentenceTransformerBackend.name,
+                             model_name: str = EMBEDDING_MODEL_NAME,
+                             cache_dir: Optional[str] = None) -> EmbeddingBackend:
+    """Create a local embedding backend by name"""
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}. "
+                         f"Available: {', '.join(EMBEDDING_BACKENDS)}")
+
+    if name == OnnxEmbeddingBackend.name:
+        return OnnxEmbeddingBackend(model_name, cache_dir=cache_dir)
+    return SentenceTransformerBackend(model_name)
@@ -0,0 +1,121 @@
+import logging
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+
+METRIC_NAMES = ("requests", "connections_created", "connections_reused", "dns_cache_hits", "dns_cache_misses")
+
+
+class HttpClient:
+    """One connection pool shared by every component that makes HTTP requests.
+
+    Components get their own lightweight ClientSession, with their own
+    timeout, headers and trace hooks. All sessions borrow a single
+    TCPConnector, so keep-alive connections, TLS sessions and cached DNS
+    lookups are reused across components and across requests. aiohttp speaks
+    HTTP/1.1 only; keep-alive is what amortizes handshakes here.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 8,
+                 keepalive_timeout: float = 30.0, dns_cache_ttl: int = 300):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._connector: Optional['aiohttp.TCPConnector'] = None
+        self._sessions: Dict[str, 'aiohttp.ClientSession'] = {}
+        self._metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(METRIC_NAMES, 0))
+
+    @classmethod
+    def from_config(cls, config) -> 'HttpClient':
+        return cls(
+            limit=config.http_max_connections,
+            limit_per_host=config.http_max_connections_per_host,
+            keepalive_timeout=config.http_keepalive_timeout,
+            dns_cache_ttl=config.http_dns_cache_ttl
+        )
+
+    def _get_connector(self) -> 'aiohttp.TCPConnector':
+        # Created on first use, inside the running event loop
+        if self._connector is None or self._connector.closed:
+            import aiohttp
+
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+        return self._connector
+
+    async def session(self, name: str, timeout: float = 30.0, headers: Optional[Dict[str, str]] = None,
+                      trace_configs: Optional[List['aiohttp.TraceConfig']] = None) -> 'aiohttp.ClientSession':
+        """The session for component ``name``, created on first call.
+
+        Options only apply when the session is created, so register trace
+        hooks (e.g. HostRateLimiter.trace_config()) before the first request.
+        """
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            # Imported here so importing this module (e.g. via ai_providers) stays cheap
+            import aiohttp
+            session = aiohttp.ClientSession(
+                connector=self._get_connector(),
+                connector_owner=False,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                headers=headers,
+                trace_configs=[self._metrics_trace_config(name)] + list(trace_configs or [])
+            )
+            self._sessions[name] = session
+        return session
+
+    def _metrics_trace_config(self, name: str) -> 'aiohttp.TraceConfig':
+        import aiohttp
+        metrics = self._metrics[name]
+
+        def counter(metric: str):
+            async def count(session, context, params):
+                metrics[metric] += 1
+            return count
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(counter("requests"))
+        trace_config.on_connection_create_end.append(counter("connections_created"))
+        trace_config.on_connection_reuseconn.append(counter("connections_reused"))
+        trace_config.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace_config
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        totals = dict.fromkeys(METRIC_NAMES, 0)
+        for metrics in self._metrics.values():
+            for metric, value in metrics.items():
+                totals[metric] += value
+        connections = totals["connections_created"] + totals["connections_reused"]
+        totals["reuse_rate"] = round(totals["connections_reused"] / connections, 3) if connections else 0.0
+        return {
+            "pool": {
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+                "keepalive_timeout": self.keepalive_timeout,
+                "dns_cache_ttl": self.dns_cache_ttl,
+            },
+            "totals": totals,
+            "components": {name: dict(metrics) for name, metrics in sorted(self._metrics.items())},
+        }
+
+    async def close(self):
+        """Close every session, then the shared connector"""
+        for name, session in self._sessions.items():
+            if not session.closed:
+                try:
+                    await session.close()
+                except Exception as e:
+                    logging.warning(f"Error closing {name} HTTP session: {e}")
+        self._sessions.clear()
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
@@ -0,0 +1,215 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+
+# Wikidata properties
+INSTANCE_OF = 'P31'
+HUMAN = 'Q5'
+CITIZENSHIP = 'P27'
+NATIVE_LANGUAGE = 'P103'
+LANGUAGES_SPOKEN = 'P1412'
+OFFICIAL_LANGUAGE = 'P37'
+WIKIMEDIA_LANGUAGE_CODE = 'P424'
+
+# Historical language codes without a Wikipedia of their own, mapped to the
+# edition that covers them
+WIKIPEDIA_EDITIONS = {
+    'grc': 'el',
+    'gmy': 'el',
+    'lzh': 'zh',
+    'och': 'zh',
+    'ojp': 'ja',
+    'ang': 'en',
+    'enm': 'en',
+    'fro': 'fr',
+    'frm': 'fr',
+    'goh': 'de',
+    'gmh': 'de',
+    'osp': 'es',
+    'orv': 'ru',
+    'itc-ola': 'la',
+}
+
+# Used when Wikidata is unreachable or has no usable claims
+KNOWN_LANGUAGES = {
+    "leonardo da vinci": ["it", "en"],
+    "da vinci": ["it", "en"],
+    "michelangelo": ["it", "en"],
+    "galileo": ["it", "en"],
+    "dante": ["it", "en"],
+    "machiavelli": ["it", "en"],
+    "julius caesar": ["la", "it", "en"],
+    "cicero": ["la", "it", "en"],
+    "augustus": ["la", "it", "en"],
+    "marcus aurelius": ["la", "en"],
+    "virgil": ["la", "it", "en"],
+    "napoleon": ["fr", "en"],
+    "voltaire": ["fr", "en"],
+    "descartes": ["fr", "en"],
+    "rousseau": ["fr", "en"],
+    "marie curie": ["fr", "pl", "en"],
+    "einstein": ["de", "en"],
+    "beethoven": ["de", "en"],
+    "goethe": ["de", "en"],
+    "kant": ["de", "en"],
+    "marx": ["de", "en"],
+    "cervantes": ["es", "en"],
+    "picasso": ["es", "en"],
+    "goya": ["es", "en"],
+    "plato": ["el", "en"],
+    "aristotle": ["el", "en"],
+    "socrates": ["el", "en"],
+    "homer": ["el", "en"],
+    "tolstoy": ["ru", "en"],
+    "dostoevsky": ["ru", "en"],
+    "tchaikovsky": ["ru", "en"],
+    "confucius": ["zh", "en"],
+    "sun tzu": ["zh", "en"],
+    "lao tzu": ["zh", "en"],
+    "hirohito": ["ja", "en"],
+    "akira kurosawa": ["ja", "en"],
+}
+
+LANGUAGE_CODE_PATTERN = re.compile(r'^[a-z]{2,3}(-[a-z]+)?$')
+
+
+def _normalize(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+
+def _claim_ids(entity: Dict[str, Any], prop: str) -> List[str]:
+    """Item ids referenced by an entity's claims for ``prop``, preferred rank first"""
+    claims = entity.get('claims', {}).get(prop, [])
+    claims = sorted(claims, key=lambda claim: claim.get('rank') != 'preferred')
+    ids = []
+    for claim in claims:
+        value = claim.get('mainsnak', {}).get('datavalue', {}).get('value')
+        if isinstance(value, dict) and value.get('id') and value['id'] not in ids:
+            ids.append(value['id'])
+    return ids
+
+
+def _claim_strings(entity: Dict[str, Any], prop: str) -> List[str]:
+    return [
+        claim['mainsnak']['datavalue']['value']
+        for claim in entity.get('claims', {}).get(prop, [])
+        if isinstance(claim.get('mainsnak', {}).get('datavalue', {}).get('value'), str)
+    ]
+
+
+def wikipedia_edition(code: str) -> Optional[str]:
+    """Wikipedia subdomain for a Wikimedia language code, if it looks usable"""
+    code = code.lower()
+    code = WIKIPEDIA_EDITIONS.get(code, code)
+    if not LANGUAGE_CODE_PATTERN.match(code):
+        return None
+    # Regional variants (zh-hans, pt-br) share their language's edition
+    return WIKIPEDIA_EDITIONS.get(code.split('-')[0], code.split('-')[0])
+
+
+class LanguageResolver:
+    """Works out which Wikipedia editions to search for a historical figure.
+
+    Languages come from the figure's Wikidata native language and languages
+    spoken, then the official languages of their countries of citizenship,
+    with English always last. Each name is resolved once and then served from
+    a per-character cache, so lookups during research are a dict access.
+    """
+
+    def __init__(self, max_languages: int = 3):
+        self.max_languages = max_languages
+        self._cache: Dict[str, List[str]] = {}
+
+    def get(self, character_name: str) -> Optional[List[str]]:
+        """Cached languages for a character, if already resolved"""
+        return self._cache.get(_normalize(character_name))
+
+    async def resolve(self, session, character_name: str) -> List[str]:
+        key = _normalize(character_name)
+        if key in self._cache:
+            return self._cache[key]
+
+        try:
+            codes = await self._from_wikidata(session, character_name)
+        except Exception as e:
+            # Not cached, so the next run retries Wikidata
+            logging.warning(f"Wikidata language lookup failed for {character_name}: {e}")
+            return self._known_languages(key)
+
+        languages = self._finalize(codes) if codes else self._known_languages(key)
+        self._cache[key] = languages
+        return languages
+
+    def _finalize(self, codes: Iterable[str]) -> List[str]:
+        languages = []
+        for code in codes:
+            edition = wikipedia_edition(code)
+            if edition and edition != 'en' and edition not in languages:
+                languages.append(edition)
+        return languages[:self.max_languages - 1] + ['en']
+
+    @staticmethod
+    def _known_languages(key: str) -> List[str]:
+        if key in KNOWN_LANGUAGES:
+            return KNOWN_LANGUAGES[key]
+        for token in key.split():
+            if len(token) > 3 and token in KNOWN_LANGUAGES:
+                return KNOWN_LANGUAGES[token]
+        return ["en"]
+
+    async def _from_wikidata(self, session, character_name: str) -> List[str]:
+        """Language codes from Wikidata claims, most specific first"""
+        async with session.get(WIKIDATA_API, params={
+            'action': 'wbsearchentities',
+            'format': 'json',
+            'language': 'en',
+            'search': character_name,
+            'type': 'item',
+            'limit': '3'
+        }) as response:
+            # Failures raise, so resolve() leaves them uncached and a later run retries
+            response.raise_for_status()
+            candidates = [hit['id'] for hit in (await response.json()).get('search', []) if hit.get('id')]
+        if not candidates:
+            return []
+
+        entities = await self._get_claims(session, candidates)
+        people = [entities[qid] for qid in candidates
+                  if qid in entities and HUMAN in _claim_ids(entities[qid], INSTANCE_OF)]
+        if not people:
+            return []
+        person = people[0]
+
+        language_ids = _claim_ids(person, NATIVE_LANGUAGE) + _claim_ids(person, LANGUAGES_SPOKEN)
+        country_ids = _claim_ids(person, CITIZENSHIP)
+        related = await self._get_claims(session, language_ids + country_ids)
+
+        official_ids = []
+        for country_id in country_ids:
+            for language_id in _claim_ids(related.get(country_id, {}), OFFICIAL_LANGUAGE):
+                if language_id not in language_ids and language_id not in official_ids:
+                    official_ids.append(language_id)
+        if official_ids:
+            related.update(await self._get_claims(session, official_ids))
+
+        codes = []
+        for language_id in language_ids + official_ids:
+            codes.extend(_claim_strings(related.get(language_id, {}), WIKIMEDIA_LANGUAGE_CODE)[:1])
+        return codes
+
+    @staticmethod
+    async def _get_claims(session, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Claims for up to 50 entities in one request"""
+        ids = list(dict.fromkeys(ids))[:50]
+        if not ids:
+            return {}
+        async with session.get(WIKIDATA_API, params={
+            'action': 'wbgetentities',
+            'format': 'json',
+            'ids': '|'.join(ids),
+            'props': 'claims'
+        }) as response:
+            response.raise_for_status()
+            return (await response.json()).get('entities', {})
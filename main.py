@@ -4,6 +4,7 @@ import uvicorn
 from api import app
 
 import asyncio
+import uuid
 import logging
 from config import ResearchConfig
 from deep_character_researcher import DeepCharacterResearcher, CharacterProfile
@@ -28,6 +29,10 @@ async def main():
             # No need to specify ai_provider - will use config default
         )
         
+        if character_profile is None:
+            print("Research stopped before a profile was built; documents found so far were kept")
+            return
+        
         print(f"Research complete for {character_profile.name}")
         print(f"Domains: {character_profile.research_domains}")
         
@@ -41,6 +46,8 @@ async def main():
         current_provider = config.default_provider
         current_model = config.default_model
         
+        # One conversation per chat session, so the character remembers earlier turns
+        session_id = uuid.uuid4().hex
         while True:
             user_input = input(f"\nYou ({current_provider}/{current_model}): ").strip()
             
@@ -66,7 +73,8 @@ async def main():
                     character_profile.name, 
                     user_input, 
                     current_provider,
-                    current_model
+                    current_model,
+                    session_id=session_id
                 )
     
     finally:
@@ -0,0 +1,212 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from context_packing import ContextPacker
+from deadline import DeadlineExceeded
+
+# Shape of a character profile, sent as the response schema for structured output
+PROFILE_SCHEMA: Dict[str, Any] = {
+    "title": "character_profile",
+    "type": "object",
+    "properties": {
+        "personality": {
+            "type": "object",
+            "properties": {
+                "traits": {"type": "array", "items": {"type": "string"}},
+                "temperament": {"type": "string"},
+                "notable_qualities": {"type": "array", "items": {"type": "string"}},
+                "description": {"type": "string"}
+            },
+            "required": ["traits", "temperament", "notable_qualities", "description"]
+        },
+        "knowledge_domains": {"type": "array", "items": {"type": "string"}},
+        "speech_patterns": {
+            "type": "object",
+            "properties": {
+                "style": {"type": "string"},
+                "characteristics": {"type": "array", "items": {"type": "string"}},
+                "typical_phrases": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["style", "characteristics", "typical_phrases"]
+        },
+        "response_style": {"type": "string"},
+        "core_beliefs": {"type": "array", "items": {"type": "string"}},
+        "historical_context": {
+            "type": "object",
+            "properties": {
+                "time_period": {"type": "string"},
+                "cultural_context": {"type": "string"},
+                "major_events": {"type": "string"},
+                "social_environment": {"type": "string"}
+            },
+            "required": ["time_period", "cultural_context", "major_events", "social_environment"]
+        }
+    },
+    "required": ["personality", "knowledge_domains", "speech_patterns", "response_style",
+                 "core_beliefs", "historical_context"]
+}
+
+PROFILE_FIELDS = tuple(PROFILE_SCHEMA["required"])
+
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$')
+TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+
+
+def parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """The JSON object in a model reply, tolerating code fences, prose and trailing commas"""
+    text = CODE_FENCE_PATTERN.sub('', (text or '').strip())
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    text = text[start:end + 1]
+    for candidate in (text, TRAILING_COMMA_PATTERN.sub(r'\1', text)):
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def _string(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, list):
+        return '; '.join(item for item in (_string(item) for item in value) if item) or None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def _strings(value: Any) -> Optional[List[str]]:
+    if isinstance(value, str):
+        value = re.split(r'[,;\n]', value)
+    if not isinstance(value, list):
+        return None
+    items = [item for item in (_string(item) for item in value) if item]
+    return list(dict.fromkeys(items)) or None
+
+
+def _object(value: Any, properties: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not isinstance(value, dict):
+        return None
+    result = {}
+    for key, spec in properties.items():
+        item = (_strings if spec["type"] == "array" else _string)(value.get(key))
+        if item is not None:
+            result[key] = item
+    return result if len(result) == len(properties) else None
+
+
+def validate_profile(data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Coerce ``data`` to the profile schema.
+
+    Returns the fields that are usable, normalized (comma-separated strings
+    become lists, lists in text fields are joined), and the names of the
+    fields that are missing or malformed.
+    """
+    profile = {}
+    invalid = []
+    for field in PROFILE_FIELDS:
+        spec = PROFILE_SCHEMA["properties"][field]
+        value = data.get(field)
+        if spec["type"] == "object":
+            value = _object(value, spec["properties"])
+        elif spec["type"] == "array":
+            value = _strings(value)
+        else:
+            value = _string(value)
+        if value is None:
+            invalid.append(field)
+        else:
+            profile[field] = value
+    return profile, invalid
+
+
+class ProfileExtractor:
+    """Builds a character profile from research documents in one LLM call.
+
+    The reply is requested as JSON under PROFILE_SCHEMA, through the
+    provider's structured output mode where the model supports it. The reply
+    is validated, and fields that are missing or malformed get one repair
+    call. Whatever is still unusable is left out, for the caller to fill in.
+    """
+
+    def __init__(self, ai_manager, packer: Optional[ContextPacker] = None, max_tokens: int = 1500):
+        self.ai_manager = ai_manager
+        self.packer = packer or ContextPacker()
+        self.max_tokens = max_tokens
+
+    async def extract(self, character_name: str, documents: List[Dict[str, Any]],
+                      provider: str, model: Optional[str] = None) -> Dict[str, Any]:
+        """Valid profile fields for ``character_name``; empty when extraction failed"""
+        context = self.packer.pack(
+            documents,
+            f"{character_name} life era personality temperament beliefs values work expertise "
+            f"speech writing style contemporaries described"
+        ).text
+        try:
+            reply = await self._generate(provider, self._extraction_prompt(character_name, context), model)
+            profile, invalid = validate_profile(parse_json_object(reply) or {})
+            if invalid:
+                logging.info(f"Repairing profile fields for {character_name}: {', '.join(invalid)}")
+                repaired = await self._generate(
+                    provider, self._repair_prompt(character_name, context, reply, invalid), model
+                )
+                fixed, _ = validate_profile(parse_json_object(repaired) or {})
+                profile.update({field: fixed[field] for field in invalid if field in fixed})
+            return profile
+        except DeadlineExceeded:
+            # Out of time, or cancelled: not a reason to fall back
+            raise
+        except Exception as e:
+            logging.error(f"Structured profile extraction failed for {character_name}: {e}")
+            return {}
+
+    async def _generate(self, provider: str, prompt: str, model: Optional[str]) -> str:
+        response = await self.ai_manager.generate_response(
+            provider, prompt, model, json_schema=PROFILE_SCHEMA, max_tokens=self.max_tokens
+        )
+        return response.get('content') or ''
+
+    @staticmethod
+    def _extraction_prompt(character_name: str, context: str) -> str:
+        return f"""Build a character profile of {character_name} from this historical information:
+
+{context or "(no documents; rely on well-established historical knowledge)"}
+
+Respond with a single JSON object and nothing else, in exactly this shape:
+{{
+    "personality": {{
+        "traits": ["trait1", "trait2", "trait3"],
+        "temperament": "description",
+        "notable_qualities": ["quality1", "quality2"],
+        "description": "brief personality summary"
+    }},
+    "knowledge_domains": ["domain1", "domain2"],
+    "speech_patterns": {{
+        "style": "how they spoke or wrote",
+        "characteristics": ["characteristic1", "characteristic2"],
+        "typical_phrases": ["phrase1", "phrase2"]
+    }},
+    "response_style": "one line on how they would answer questions",
+    "core_beliefs": ["belief1", "belief2", "belief3"],
+    "historical_context": {{
+        "time_period": "era and life dates",
+        "cultural_context": "description",
+        "major_events": "events of their lifetime",
+        "social_environment": "description"
+    }}
+}}"""
+
+    @staticmethod
+    def _repair_prompt(character_name: str, context: str, reply: str, invalid: List[str]) -> str:
+        return f"""{ProfileExtractor._extraction_prompt(character_name, context)}
+
+A previous answer was missing or had malformed values for: {', '.join(invalid)}.
+Previous answer:
+{reply[:2000]}
+
+Return the complete corrected JSON object only."""
@@ -1,5 +1,7 @@
 import asyncio
-from main import DeepCharacterResearcher
+from dotenv import load_dotenv
+load_dotenv()
+from deep_character_researcher import DeepCharacterResearcher
 from config import ResearchConfig
 
 async def quick_research():
@@ -0,0 +1,58 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional
+
+import aiohttp
+
+# Hosts whose published usage policy is stricter than the default rate
+DEFAULT_HOST_RATES = {
+    "export.arxiv.org": 1 / 3,  # arXiv asks for at most one request every three seconds
+}
+
+
+class HostRateLimiter:
+    """Spaces out requests per host across every session that uses it.
+
+    Each host gets evenly spaced request slots at ``rate`` requests per second.
+    A request reserves the next free slot and sleeps until it arrives, so
+    concurrent callers queue fairly instead of bursting. Attach it to an
+    aiohttp session with ``trace_config()``.
+    """
+
+    def __init__(self, default_rate: float = 2.0, host_rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.host_rates = dict(DEFAULT_HOST_RATES)
+        self.host_rates.update(host_rates or {})
+        self._next_slot: Dict[str, float] = {}
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.wait_time: Dict[str, float] = defaultdict(float)
+
+    async def acquire(self, host: str):
+        """Wait for the host's next request slot"""
+        self.requests[host] += 1
+        rate = self.host_rates.get(host, self.default_rate)
+        if not rate or rate <= 0:
+            return
+
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + 1.0 / rate
+        delay = slot - now
+        if delay > 0:
+            self.wait_time[host] += delay
+            await asyncio.sleep(delay)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp trace hook that rate-limits every request a session starts"""
+        async def on_request_start(session, context, params):
+            await self.acquire(params.url.host or "")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        return trace_config
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        return {
+            host: {"requests": count, "wait_seconds": round(self.wait_time[host], 2)}
+            for host, count in sorted(self.requests.items())
+        }
@@ -1,159 +1,194 @@
-import aiohttp
 import asyncio
-from typing import List, Dict, Optional
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-import requests
+import time
+from typing import Any, Awaitable, Callable, List, Dict, Optional
 from datetime import datetime
 import re
-from dataclasses import dataclass
+from dedup import NearDuplicateDetector
+from research_result import ResearchResult
+from scoring import QualityScorer
+from languages import LanguageResolver
+from atom_feed import AtomEntry, iter_atom_entries
+from deadline import DeadlineExceeded, within_deadline
+from http_client import HttpClient
 
-@dataclass
-class ResearchResult:
-    title: str
-    authors: List[str]
-    abstract: str
-    url: str
-    source_type: str
-    quality_score: float
-    publication_date: Optional[str]
-    citations: int
-    language: Optional[str] = None
+class SearchResults(list):
+    """Results of a multi-source search, with per-source status, result count and latency"""
+    
+    def __init__(self, results=(), source_metrics: Optional[Dict[str, Dict[str, Any]]] = None):
+        super().__init__(results)
+        self.source_metrics = source_metrics or {}
 
 class DeepResearchAgent:
-    def __init__(self, data_sources):
+    # DataSourceManager sources searched alongside arXiv, Wikipedia and Wikidata
+    external_sources = ("crossref", "semantic_scholar", "openlibrary")
+    # Stop paging external sources once this many distinct results reach the quality bar,
+    # as scored by the QualityScorer against the character (every result is still kept)
+    external_target_results = 15
+    external_min_quality = 0.8
+    # Seconds each source may take within one academic search
+    default_source_timeout = 20.0
+    source_timeouts = {"wikipedia": 25.0, "external": 25.0}
+    
+    def __init__(self, data_sources, scorer: Optional[QualityScorer] = None,
+                 http: Optional[HttpClient] = None):
         self.data_sources = data_sources
-        self.session = None
-        
-        # Language mappings for historical figures
-        self.character_languages = {
-            # Italian figures
-            "leonardo da vinci": ["it", "en"],
-            "leonardo": ["it", "en"],
-            "da vinci": ["it", "en"],
-            "davinci": ["it", "en"],
-            "michelangelo": ["it", "en"],
-            "galileo": ["it", "en"],
-            "dante": ["it", "en"],
-            "machiavelli": ["it", "en"],
-            
-            # Roman/Latin figures
-            "julius caesar": ["la", "it", "en"],
-            "caesar": ["la", "it", "en"],
-            "cicero": ["la", "it", "en"],
-            "augustus": ["la", "it", "en"],
-            "marcus aurelius": ["la", "en"],
-            "virgil": ["la", "it", "en"],
-            
-            # French figures
-            "napoleon": ["fr", "en"],
-            "voltaire": ["fr", "en"],
-            "descartes": ["fr", "en"],
-            "rousseau": ["fr", "en"],
-            "marie curie": ["fr", "pl", "en"],
-            
-            # German figures
-            "einstein": ["de", "en"],
-            "beethoven": ["de", "en"],
-            "goethe": ["de", "en"],
-            "kant": ["de", "en"],
-            "marx": ["de", "en"],
-            
-            # Spanish figures
-            "cervantes": ["es", "en"],
-            "picasso": ["es", "en"],
-            "goya": ["es", "en"],
-            
-            # Greek figures
-            "plato": ["el", "en"],
-            "aristotle": ["el", "en"],
-            "socrates": ["el", "en"],
-            "homer": ["el", "en"],
-            
-            # Russian figures
-            "tolstoy": ["ru", "en"],
-            "dostoevsky": ["ru", "en"],
-            "tchaikovsky": ["ru", "en"],
-            "putin": ["ru", "en"],
-            
-            # Chinese figures
-            "confucius": ["zh", "en"],
-            "sun tzu": ["zh", "en"],
-            "lao tzu": ["zh", "en"],
-            
-            # Japanese figures
-            "hirohito": ["ja", "en"],
-            "akira kurosawa": ["ja", "en"],
-        }
+        self.scorer = scorer or QualityScorer()
+        self._owns_http = http is None
+        self.http = http or HttpClient()
+        self.trace_configs = []  # aiohttp request hooks, e.g. HostRateLimiter.trace_config()
+        self.languages = LanguageResolver()
         
     async def get_session(self):
-        """Get or create aiohttp session"""
-        if not self.session:
-            self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=30),
-                headers={'User-Agent': 'DeepCharacterResearch/1.0 (Educational Research Tool)'}
-            )
-        return self.session
+        """Get this agent's session on the shared connection pool"""
+        return await self.http.session(
+            "research_agent",
+            timeout=30,
+            headers={'User-Agent': 'DeepCharacterResearch/1.0 (Educational Research Tool)'},
+            trace_configs=self.trace_configs
+        )
         
-    def _get_character_languages(self, query: str) -> List[str]:
-        """Get relevant languages for a character"""
-        query_lower = query.lower()
+    async def resolve_languages(self, character_name: str) -> List[str]:
+        """Wikipedia languages to research a character in, resolved once per character"""
+        session = await self.get_session()
+        try:
+            return await within_deadline(self.languages.resolve(session, character_name),
+                                         self.default_source_timeout)
+        except asyncio.TimeoutError:
+            return ["en"]
         
-        # Check exact matches first
-        for key, langs in self.character_languages.items():
-            if key in query_lower:
-                return langs
-                
-        # Check partial matches
-        for key, langs in self.character_languages.items():
-            if any(part in query_lower for part in key.split() if len(part) > 3):
-                return langs
-                
-        # Default to English
-        return ["en"]
+    async def search_academic_sources(self, query: str,
+                                      languages: Optional[List[str]] = None,
+                                      subject: Optional[str] = None) -> 'SearchResults':
+        """Search high-quality academic sources; Wikipedia is searched in ``languages``.
         
-    async def search_academic_sources(self, query: str) -> List[ResearchResult]:
-        """Search high-quality academic sources"""
-        results = []
+        ``subject`` is the character being researched (the query by default);
+        external results are scored for relevance to it.
+        
+        All sources are queried concurrently, each under its own timeout. A
+        source that fails or times out contributes whatever it had so far and
+        is reported in the returned list's ``source_metrics``, as is a
+        Wikipedia language or external source that failed on its own.
+        """
+        metrics: Dict[str, Dict[str, Any]] = {}
+        wikipedia_errors: Dict[str, str] = {}
+        fetches = [
+            self._run_source("arxiv", self._search_arxiv(query), metrics),
+            self._run_source("wikipedia",
+                             self._search_wikipedia_multilingual(query, languages, wikipedia_errors),
+                             metrics, errors=wikipedia_errors),
+            self._run_source("wikidata", self._search_wikidata(query), metrics),
+        ]
+        if self.data_sources:
+            # CrossRef, Semantic Scholar and Open Library (streamed concurrently)
+            detector = NearDuplicateDetector()
+            external_errors: Dict[str, str] = {}
+            fetches.append(self._run_source(
+                "external",
+                self._collect_external_sources(query, detector, subject or query, external_errors),
+                metrics, partial=detector.results, errors=external_errors
+            ))
+        
+        results = [result for source_results in await asyncio.gather(*fetches) for result in source_results]
+        self.scorer.apply(results, subject or query)
         
+        # Sort by quality score
+        return SearchResults(sorted(results, key=lambda x: x.quality_score, reverse=True), metrics)
+    
+    async def _run_source(self, name: str, fetch: Awaitable[List[ResearchResult]],
+                          metrics: Dict[str, Dict[str, Any]],
+                          partial: Optional[Callable[[], List[ResearchResult]]] = None,
+                          errors: Optional[Dict[str, str]] = None) -> List[ResearchResult]:
+        """Await one source under its timeout and the active deadline, recording its
+        latency and outcome in ``metrics``.
+        
+        Never raises: on error or timeout the source yields ``partial()`` if given, else nothing.
+        A fetch that finishes with failures in ``errors`` (per language or
+        sub-source) is marked "partial", or "error" if it found nothing.
+        """
+        started_at = time.perf_counter()
+        status, error, results = "ok", None, []
         try:
-            # ArXiv search
-            arxiv_results = await self._search_arxiv(query)
-            results.extend(arxiv_results)
-            
-            # Wikipedia search (multilingual)
-            wikipedia_results = await self._search_wikipedia_multilingual(query)
-            results.extend(wikipedia_results)
-            
-            # Wikidata search
-            wikidata_results = await self._search_wikidata(query)
-            results.extend(wikidata_results)
-            
+            results = await within_deadline(fetch, self.source_timeouts.get(name, self.default_source_timeout))
+        except DeadlineExceeded:
+            status = "deadline"
+        except asyncio.TimeoutError:
+            status = "timeout"
         except Exception as e:
-            print(f"Error in academic search: {e}")
+            status, error = "error", str(e)
         
-        # Sort by quality score
-        return sorted(results, key=lambda x: x.quality_score, reverse=True)
+        if status != "ok":
+            print(f"{name} search {status}{f': {error}' if error else ''}")
+            results = partial() if partial else []
+        elif errors:
+            status = "partial" if results else "error"
+            print(f"{name} search {status}: {', '.join(errors)} failed")
+        metrics[name] = {
+            "status": status,
+            "results": len(results),
+            "seconds": round(time.perf_counter() - started_at, 3),
+        }
+        if error:
+            metrics[name]["error"] = error
+        if errors:
+            metrics[name]["errors"] = dict(errors)
+        return results
     
-    async def _search_wikipedia_multilingual(self, query: str) -> List[ResearchResult]:
-        """Search Wikipedia in multiple languages"""
-        all_results = []
-        languages = self._get_character_languages(query)
+    async def _collect_external_sources(self, query: str,
+                                        detector: Optional[NearDuplicateDetector] = None,
+                                        subject: Optional[str] = None,
+                                        errors: Optional[Dict[str, str]] = None) -> List[ResearchResult]:
+        """Consume the external source stream until enough good, distinct results arrive.
+        
+        Each result is scored by the QualityScorer against ``subject``, so a
+        source's prior alone does not count it towards the target.
+        
+        Results are deduplicated into ``detector`` as they stream in, so a caller
+        that cancels this still has what arrived. Closing the stream early
+        cancels any pages still being fetched. Sources that fail are recorded
+        in ``errors`` by name.
+        """
+        detector = detector if detector is not None else NearDuplicateDetector()
+        accepted = 0
+        stream = self.data_sources.stream_all_sources(query, sources=list(self.external_sources),
+                                                      errors=errors)
+        try:
+            async for result in stream:
+                if not detector.add(result):
+                    continue
+                self.scorer.apply([result], subject or query)
+                if result.quality_score >= self.external_min_quality:
+                    accepted += 1
+                    if accepted >= self.external_target_results:
+                        break
+        finally:
+            await stream.aclose()
+        return detector.results()
+    
+    async def _search_wikipedia_multilingual(self, query: str, languages: Optional[List[str]] = None,
+                                             errors: Optional[Dict[str, str]] = None) -> List[ResearchResult]:
+        """Search Wikipedia in multiple languages; languages that fail are recorded in ``errors``"""
+        languages = languages or ["en"]
         
         print(f"Searching Wikipedia in languages: {languages} for '{query}'")
         
-        for lang in languages:
-            try:
-                results = await self._search_wikipedia_single_language(query, lang)
-                all_results.extend(results)
-                
-                # Add delay between language searches to be respectful
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                print(f"Error searching Wikipedia in {lang}: {e}")
-                continue
-                
+        # Each language edition is a separate host, so they are searched at once
+        outcomes = await asyncio.gather(
+            *(self._search_wikipedia_single_language(query, lang) for lang in languages),
+            return_exceptions=True
+        )
+        
+        all_results = []
+        failures = []
+        for lang, outcome in zip(languages, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error searching Wikipedia in {lang}: {outcome}")
+                failures.append(outcome)
+                if errors is not None:
+                    errors[lang] = str(outcome) or type(outcome).__name__
+            else:
+                all_results.extend(outcome)
+        if failures and len(failures) == len(languages):
+            raise failures[0]
         return all_results
     
     async def _search_wikipedia_single_language(self, query: str, lang: str) -> List[ResearchResult]:
@@ -171,69 +206,59 @@ class DeepResearchAgent:
             'srprop': 'snippet'
         }
         
-        try:
-            async with session.get(search_url, params=search_params) as response:
-                if response.status != 200:
-                    return []
-                    
-                data = await response.json()
-                search_results = data.get('query', {}).get('search', [])
+        async with session.get(search_url, params=search_params) as response:
+            response.raise_for_status()
                 
-                # Get full content for top results
-                results = []
-                for search_result in search_results[:3]:  # Limit to top 3 per language
-                    page_title = search_result['title']
-                    
-                    # Get page content
-                    content_params = {
-                        'action': 'query',
-                        'format': 'json',
-                        'titles': page_title,
-                        'prop': 'extracts|info',
-                        'exintro': '1',  # String instead of True
-                        'explaintext': '1',  # String instead of True
-                        'exsectionformat': 'plain',
-                        'inprop': 'url'
-                    }
-                    
-                    async with session.get(search_url, params=content_params) as content_response:
-                        if content_response.status == 200:
-                            content_data = await content_response.json()
-                            pages = content_data.get('query', {}).get('pages', {})
-                            
-                            for page_id, page_info in pages.items():
-                                if page_id == '-1':  # Page not found
-                                    continue
-                                    
-                                title = page_info.get('title', '')
-                                extract = page_info.get('extract', '')
-                                url = page_info.get('fullurl', '')
-                                
-                                if extract and len(extract) > 100:
-                                    quality_score = self._calculate_quality_score(
-                                        title, extract, [], "wikipedia", lang
-                                    )
-                                    
-                                    results.append(ResearchResult(
-                                        title=f"{title} ({lang.upper()} Wikipedia)",
-                                        authors=["Wikipedia Contributors"],
-                                        abstract=extract[:500] + "..." if len(extract) > 500 else extract,
-                                        url=url,
-                                        source_type="wikipedia",
-                                        quality_score=quality_score,
-                                        publication_date="",
-                                        citations=0,
-                                        language=lang
-                                    ))
-                    
-                    # Add delay between page requests
-                    await asyncio.sleep(0.5)
+            data = await response.json()
+            search_results = data.get('query', {}).get('search', [])
+            
+            # Get full content for top results
+            results = []
+            for search_result in search_results[:3]:  # Limit to top 3 per language
+                page_title = search_result['title']
                 
-                return results
+                # Get page content
+                content_params = {
+                    'action': 'query',
+                    'format': 'json',
+                    'titles': page_title,
+                    'prop': 'extracts|info',
+                    'exintro': '1',  # String instead of True
+                    'explaintext': '1',  # String instead of True
+                    'exsectionformat': 'plain',
+                    'inprop': 'url'
+                }
                 
-        except Exception as e:
-            print(f"Wikipedia search error for {lang}: {e}")
-            return []
+                async with session.get(search_url, params=content_params) as content_response:
+                    if content_response.status == 200:
+                        content_data = await content_response.json()
+                        pages = content_data.get('query', {}).get('pages', {})
+                        
+                        for page_id, page_info in pages.items():
+                            if page_id == '-1':  # Page not found
+                                continue
+                                
+                            title = page_info.get('title', '')
+                            extract = page_info.get('extract', '')
+                            url = page_info.get('fullurl', '')
+                            
+                            if extract and len(extract) > 100:
+                                results.append(ResearchResult(
+                                    title=f"{title} ({lang.upper()} Wikipedia)",
+                                    authors=["Wikipedia Contributors"],
+                                    abstract=extract[:500] + "..." if len(extract) > 500 else extract,
+                                    url=url,
+                                    source_type="wikipedia",
+                                    quality_score=0.0,  # Scored per batch
+                                    publication_date="",
+                                    citations=0,
+                                    language=lang
+                                ))
+                
+                # Add delay between page requests
+                await asyncio.sleep(0.5)
+            
+            return results
     
     async def _search_wikidata(self, query: str) -> List[ResearchResult]:
         """Search Wikidata for structured information"""
@@ -250,46 +275,34 @@ class DeepResearchAgent:
             'limit': '5'  # String instead of int
         }
         
-        try:
-            async with session.get(search_url, params=search_params) as response:
-                if response.status != 200:
-                    return []
-                    
-                data = await response.json()
-                entities = data.get('search', [])
+        async with session.get(search_url, params=search_params) as response:
+            response.raise_for_status()
                 
-                results = []
-                for entity in entities:
-                    entity_id = entity.get('id', '')
-                    title = entity.get('label', '')
-                    description = entity.get('description', '')
-                    url = f"https://www.wikidata.org/wiki/{entity_id}"
-                    
-                    if title and description:
-                        # Get additional data about the entity
-                        entity_data = await self._get_wikidata_entity_details(entity_id)
-                        
-                        quality_score = self._calculate_quality_score(
-                            title, description, [], "wikidata"
-                        )
-                        
-                        results.append(ResearchResult(
-                            title=f"{title} (Wikidata)",
-                            authors=["Wikidata Contributors"],
-                            abstract=description + (f"\n\nAdditional info: {entity_data}" if entity_data else ""),
-                            url=url,
-                            source_type="wikidata",
-                            quality_score=quality_score,
-                            publication_date="",
-                            citations=0,
-                            language="en"
-                        ))
-                
-                return results
-                
-        except Exception as e:
-            print(f"Wikidata search error: {e}")
-            return []
+            data = await response.json()
+            entities = data.get('search', [])
+            
+        entities = [entity for entity in entities if entity.get('label') and entity.get('description')]
+        # Get additional data about every entity at once
+        details = await asyncio.gather(
+            *(self._get_wikidata_entity_details(entity.get('id', '')) for entity in entities)
+        )
+        
+        results = []
+        for entity, entity_data in zip(entities, details):
+            entity_id = entity.get('id', '')
+            results.append(ResearchResult(
+                title=f"{entity['label']} (Wikidata)",
+                authors=["Wikidata Contributors"],
+                abstract=entity['description'] + (f"\n\nAdditional info: {entity_data}" if entity_data else ""),
+                url=f"https://www.wikidata.org/wiki/{entity_id}",
+                source_type="wikidata",
+                quality_score=0.0,  # Scored per batch
+                publication_date="",
+                citations=0,
+                language="en"
+            ))
+        
+        return results
     
     async def _get_wikidata_entity_details(self, entity_id: str) -> str:
         """Get additional details about a Wikidata entity"""
@@ -362,98 +375,23 @@ class DeepResearchAgent:
             'sortOrder': 'descending'
         }
         
-        try:
-            async with session.get(base_url, params=params) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    return self._parse_arxiv_response(content)
-                else:
-                    print(f"ArXiv API error: {response.status}")
-                    return []
-        except Exception as e:
-            print(f"ArXiv search error: {e}")
-            return []
-    
-    def _parse_arxiv_response(self, content: str) -> List[ResearchResult]:
-        """Parse ArXiv XML response"""
-        try:
-            root = ET.fromstring(content)
-            results = []
-            
-            for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-                title_elem = entry.find('{http://www.w3.org/2005/Atom}title')
-                summary_elem = entry.find('{http://www.w3.org/2005/Atom}summary')
-                
-                if title_elem is None or summary_elem is None:
-                    continue
-                
-                title = title_elem.text.strip()
-                summary = summary_elem.text.strip()
-                
-                authors = []
-                for author in entry.findall('{http://www.w3.org/2005/Atom}author'):
-                    name_elem = author.find('{http://www.w3.org/2005/Atom}name')
-                    if name_elem is not None:
-                        authors.append(name_elem.text)
-                
-                url_elem = entry.find('{http://www.w3.org/2005/Atom}id')
-                published_elem = entry.find('{http://www.w3.org/2005/Atom}published')
-                
-                url = url_elem.text if url_elem is not None else ''
-                published = published_elem.text if published_elem is not None else ''
-                
-                quality_score = self._calculate_quality_score(title, summary, authors, "arxiv")
-                
-                results.append(ResearchResult(
-                    title=title,
-                    authors=authors,
-                    abstract=summary,
-                    url=url,
-                    source_type="arxiv",
-                    quality_score=quality_score,
-                    publication_date=published,
-                    citations=0,
-                    language="en"
-                ))
-            
-            return results
-            
-        except ET.ParseError as e:
-            print(f"ArXiv XML parse error: {e}")
-            return []
+        async with session.get(base_url, params=params) as response:
+            response.raise_for_status()
+            return [self._arxiv_entry_to_result(entry) async for entry in iter_atom_entries(response)]
     
-    def _calculate_quality_score(self, title: str, abstract: str, authors: List[str], 
-                               source: str, language: str = "en") -> float:
-        """Calculate quality score for research result"""
-        score = 0.0
-        
-        # Base score by source
-        source_scores = {
-            "arxiv": 0.8,
-            "wikipedia": 0.7,
-            "wikidata": 0.75,
-            "academia": 0.6
-        }
-        score += source_scores.get(source, 0.5)
-        
-        # Language bonus (native language sources often have more detail)
-        if language != "en":
-            score += 0.05  # Slight bonus for non-English sources
-            
-        # Title relevance
-        if len(title) > 10 and any(keyword in title.lower() for keyword in 
-                                 ["historical", "analysis", "study", "biography"]):
-            score += 0.1
-            
-        # Abstract quality
-        if len(abstract) > 100:
-            score += 0.05
-            
-        # Multiple authors (indicates peer review for academic sources)
-        if len(authors) > 1 and source == "arxiv":
-            score += 0.05
-            
-        return min(score, 1.0)
+    def _arxiv_entry_to_result(self, entry: AtomEntry) -> ResearchResult:
+        """Convert a parsed ArXiv Atom entry into a ResearchResult"""
+        return ResearchResult(
+            title=entry.title,
+            authors=entry.authors,
+            abstract=entry.summary,
+            url=entry.url,
+            source_type="arxiv",
+            quality_score=0.0,  # Scored per batch
+            publication_date=entry.published,
+            citations=0,
+            language="en"
+        )
     
     async def search_primary_sources(self, domain: str) -> List[ResearchResult]:
         """Search for primary historical sources"""
@@ -465,47 +403,14 @@ class DeepResearchAgent:
     
     async def cross_validate_sources(self, source_groups: List[List[ResearchResult]]) -> List[ResearchResult]:
         """Cross-validate information across multiple sources"""
-        all_results = []
+        # Merge near-duplicates, keeping the highest-quality copy of each
+        detector = NearDuplicateDetector()
         for group in source_groups:
-            all_results.extend(group)
-        
-        # Remove duplicates and rank by quality and language diversity
-        unique_results = []
-        seen_titles = set()
-        
-        for result in all_results:
-            title_lower = result.title.lower()
-            # More sophisticated duplicate detection
-            is_duplicate = False
-            for seen_title in seen_titles:
-                if self._titles_similar(title_lower, seen_title):
-                    is_duplicate = True
-                    break
-                    
-            if not is_duplicate:
-                seen_titles.add(title_lower)
-                unique_results.append(result)
-        
-        return unique_results
-    
-    def _titles_similar(self, title1: str, title2: str) -> bool:
-        """Check if two titles are similar (basic implementation)"""
-        # Remove common words and check overlap
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        
-        words1 = set(title1.split()) - common_words
-        words2 = set(title2.split()) - common_words
-        
-        if not words1 or not words2:
-            return False
-            
-        overlap = len(words1.intersection(words2))
-        min_length = min(len(words1), len(words2))
+            detector.add_all(group)
         
-        return overlap / min_length > 0.6  # 60% word overlap threshold
+        return detector.results()
     
     async def close(self):
-        """Close the HTTP session"""
-        if self.session:
-            await self.session.close()
-            self.session = None
\ No newline at end of file
+        """Close the HTTP client, unless it is shared and closed by its owner"""
+        if self._owns_http:
+            await self.http.close()
\ No newline at end of file
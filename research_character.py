@@ -1,7 +1,10 @@
 import asyncio
+import uuid
 import sys
 import signal
-from main import DeepCharacterResearcher
+from dotenv import load_dotenv
+load_dotenv()
+from deep_character_researcher import DeepCharacterResearcher
 from config import ResearchConfig
 
 def signal_handler(signum, frame):
@@ -9,7 +12,8 @@ def signal_handler(signum, frame):
     print("\n\n🛑 Received interrupt signal. Cleaning up...")
     raise KeyboardInterrupt
 
-async def research_and_chat(character_name: str, research_depth: str = "comprehensive"):
+async def research_and_chat(character_name: str, research_depth: str = "comprehensive",
+                            incremental: bool = False):
     """Research a character and start interactive chat"""
     
     config = ResearchConfig()
@@ -21,15 +25,22 @@ async def research_and_chat(character_name: str, research_depth: str = "comprehe
         print(f"🤖 AI Provider: {config.default_provider}")
         print(f"🧠 Model: {config.default_model}")
         print(f"💾 Data stored in: {config.base_data_dir}")
+        if incremental:
+            print(f"♻️  Incremental: reusing queries newer than {config.research_query_max_age_hours:g}h")
         print("⏳ This may take several minutes...\n")
         
         # Use config defaults
         character_profile = await researcher.research_character(
             character_name, 
             research_depth,
-            ai_provider=config.default_provider
+            ai_provider=config.default_provider,
+            incremental=incremental
         )
         
+        if character_profile is None:
+            print("🛑 Research stopped before a profile was built; documents found so far were kept")
+            return
+        
         print(f"✅ Research complete for {character_profile.name}")
         print(f"📚 Knowledge domains: {character_profile.research_domains}")
         print(f"🎭 Personality traits: {character_profile.personality_traits}")
@@ -47,6 +58,8 @@ async def research_and_chat(character_name: str, research_depth: str = "comprehe
         current_provider = config.default_provider
         current_model = config.default_model
         
+        # One conversation per chat session, so the character remembers earlier turns
+        session_id = uuid.uuid4().hex
         while True:
             try:
                 user_input = input(f"\nYou ({current_provider}/{current_model}): ").strip()
@@ -82,7 +95,8 @@ async def research_and_chat(character_name: str, research_depth: str = "comprehe
                         character_profile.name, 
                         user_input, 
                         current_provider,
-                        current_model
+                        current_model,
+                        session_id=session_id
                     )
             except KeyboardInterrupt:
                 print("\n\n🛑 Exiting chat...")
@@ -109,9 +123,14 @@ if __name__ == "__main__":
     # Set up signal handler for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     
+    # --incremental only re-fetches stale queries for an already researched character
+    args = sys.argv[1:]
+    incremental = "--incremental" in args
+    args = [arg for arg in args if arg != "--incremental"]
+    
     # Get character name from command line or prompt
-    if len(sys.argv) > 1:
-        character_name = " ".join(sys.argv[1:])
+    if args:
+        character_name = " ".join(args)
     else:
         character_name = input("Enter character name to research: ")
     
@@ -121,6 +140,6 @@ if __name__ == "__main__":
         depth = "comprehensive"
     
     try:
-        asyncio.run(research_and_chat(character_name, depth))
+        asyncio.run(research_and_chat(character_name, depth, incremental))
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
\ No newline at end of file
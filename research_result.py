@@ -0,0 +1,103 @@
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import content_hash
+
+
+@dataclass(slots=True)
+class ResearchResult:
+    """Canonical research record emitted by every fetcher.
+
+    Slotted to keep bulk runs small, with the low-cardinality source type and
+    language strings interned so thousands of results share one copy of each.
+    The ``to_*`` conversions hand out references to the record's own strings
+    and lists rather than copies.
+    """
+    title: str
+    authors: List[str]
+    abstract: str
+    url: str
+    source_type: str
+    quality_score: float
+    publication_date: Optional[str]
+    citations: int
+    language: Optional[str] = None
+    # Filled in when near-duplicates (e.g. other language editions) are merged
+    alternate_urls: List[str] = field(default_factory=list)
+    alternate_languages: List[str] = field(default_factory=list)
+    # Research domain the result was found under, set by the pipeline
+    domain: str = ''
+
+    def __post_init__(self):
+        self.source_type = sys.intern(self.source_type or 'unknown')
+        if self.language:
+            self.language = sys.intern(self.language)
+
+    @property
+    def content_hash(self) -> str:
+        return content_hash(self.title, self.abstract)
+
+    @property
+    def text(self) -> str:
+        """Text that gets embedded for this result"""
+        return f"{self.title} {self.abstract}"
+
+    def to_storage_row(self) -> Dict[str, Any]:
+        """Document dict for DocumentStore.add_document"""
+        return {
+            'title': self.title,
+            'content': self.abstract,
+            'url': self.url,
+            'source_type': self.source_type,
+            'quality_score': self.quality_score,
+            'content_hash': self.content_hash,
+            'metadata': {
+                'domain': self.domain,
+                'authors': self.authors,
+                'publication_date': self.publication_date or '',
+                'citations': self.citations,
+                'language': self.language or '',
+                'alternate_urls': self.alternate_urls,
+                'alternate_languages': self.alternate_languages
+            }
+        }
+
+    def to_vector_payload(self, character_name: str) -> Tuple[str, Dict[str, Any]]:
+        """Embedding text and index metadata for VectorDatabase.add_documents"""
+        return self.text, {
+            'character': character_name,
+            'title': self.title,
+            'source_type': self.source_type,
+            'language': self.language or '',
+            'domain': self.domain,
+            'url': self.url,
+            'quality_score': self.quality_score
+        }
+
+    @classmethod
+    def from_storage_row(cls, row: Dict[str, Any]) -> 'ResearchResult':
+        """Rebuild a record from a DocumentStore document row"""
+        metadata = row.get('metadata') or {}
+        return cls(
+            title=row.get('title') or '',
+            authors=metadata.get('authors') or [],
+            abstract=row.get('content') or '',
+            url=row.get('url') or '',
+            source_type=row.get('source_type') or 'unknown',
+            quality_score=row.get('quality_score') or 0.0,
+            publication_date=metadata.get('publication_date') or None,
+            citations=metadata.get('citations') or 0,
+            language=metadata.get('language') or None,
+            alternate_urls=metadata.get('alternate_urls') or [],
+            alternate_languages=metadata.get('alternate_languages') or [],
+            domain=metadata.get('domain') or ''
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ResearchResult':
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Source-quality scoring for research results
+
+Usage:
+    python scoring.py calibrate [--strength 5.0] [--min-samples 20]
+"""
+
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Prior quality of each source type; unknown types get DEFAULT_SOURCE_PRIOR
+DEFAULT_SOURCE_PRIORS = {
+    "arxiv": 0.8,
+    "wikipedia": 0.7,
+    "wikidata": 0.75,
+    "academia": 0.6,
+    "crossref": 0.85,
+    "semantic_scholar": 0.9,
+    "openlibrary": 0.7,
+}
+DEFAULT_SOURCE_PRIOR = 0.5
+
+FEATURES = ("citations", "length", "non_english", "recency", "relevance", "multi_author")
+YEAR_PATTERN = re.compile(r'(\d{4})')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+@dataclass
+class ScoringWeights:
+    """Linear weights over source one-hot columns plus the FEATURES columns.
+
+    The defaults reproduce the previous hand-tuned scores: source prior, up to
+    +0.1 for citations, +0.05 for a substantial abstract, +0.05 for
+    non-English sources, +0.1 for relevance and +0.05 for multiple authors.
+    """
+    sources: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_SOURCE_PRIORS))
+    other_source: float = DEFAULT_SOURCE_PRIOR
+    citations: float = 0.1
+    length: float = 0.05
+    non_english: float = 0.05
+    recency: float = 0.0
+    relevance: float = 0.1
+    multi_author: float = 0.05
+
+    def to_vector(self, source_names: Sequence[str]) -> np.ndarray:
+        return np.array(
+            [self.sources.get(name, self.other_source) for name in source_names]
+            + [self.other_source]
+            + [getattr(self, name) for name in FEATURES],
+            dtype=np.float64
+        )
+
+    @classmethod
+    def from_vector(cls, vector: np.ndarray, source_names: Sequence[str]) -> 'ScoringWeights':
+        values = [float(v) for v in vector]
+        count = len(source_names)
+        return cls(
+            sources=dict(zip(source_names, values[:count])),
+            other_source=values[count],
+            **dict(zip(FEATURES, values[count + 1:]))
+        )
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'ScoringWeights':
+        """Load calibrated weights, falling back to the defaults"""
+        if not path or not Path(path).exists():
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring invalid scoring weights in {path}: {e}")
+            return cls()
+
+
+class QualityScorer:
+    """Scores batches of results as one matrix-vector product over their features"""
+
+    def __init__(self, weights: Optional[ScoringWeights] = None):
+        self.weights = weights or ScoringWeights()
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'QualityScorer':
+        return cls(ScoringWeights.load(path))
+
+    @property
+    def source_names(self) -> List[str]:
+        return sorted(self.weights.sources)
+
+    def features(self, results: Sequence, subject: Union[str, Sequence[str]] = '') -> np.ndarray:
+        """Feature matrix: source one-hot columns, an "other" column, then FEATURES.
+
+        ``subject`` is the character the results are about, or one per result.
+        """
+        source_names = self.source_names
+        column = {name: i for i, name in enumerate(source_names)}
+        other = len(source_names)
+        n = len(results)
+
+        matrix = np.zeros((n, other + 1 + len(FEATURES)), dtype=np.float64)
+        source_index = np.fromiter((column.get(r.source_type, other) for r in results), dtype=np.int64, count=n)
+        matrix[np.arange(n), source_index] = 1.0
+
+        citations = np.fromiter((r.citations or 0 for r in results), dtype=np.float64, count=n)
+        lengths = np.fromiter((len(r.abstract or '') for r in results), dtype=np.float64, count=n)
+        authors = np.fromiter((len(r.authors or []) for r in results), dtype=np.float64, count=n)
+        years = np.fromiter((self._year(r.publication_date) for r in results), dtype=np.float64, count=n)
+        languages = np.array([r.language or 'en' for r in results], dtype=object)
+        texts = np.array([f"{r.title} {r.abstract}".lower() for r in results] or [''], dtype=str)[:n]
+
+        base = other + 1
+        matrix[:, base + 0] = np.clip(np.log1p(citations) / np.log1p(1000), 0.0, 1.0)
+        matrix[:, base + 1] = np.clip((lengths - 100) / 400, 0.0, 1.0)
+        matrix[:, base + 2] = languages != 'en'
+        # Missing dates count as neutral; otherwise 0 for 1950 and earlier up to 1 for this decade
+        matrix[:, base + 3] = np.where(np.isnan(years), 0.5, np.clip((years - 1950) / 75, 0.0, 1.0))
+        subjects = [subject] * n if isinstance(subject, str) else list(subject)
+        matrix[:, base + 4] = self._relevance(texts, subjects)
+        matrix[:, base + 5] = authors > 1
+        return matrix
+
+    @staticmethod
+    def _year(date: Optional[str]) -> float:
+        match = YEAR_PATTERN.search(date or '')
+        return float(match.group(1)) if match else np.nan
+
+    @staticmethod
+    def _relevance(texts: np.ndarray, subjects: List[str]) -> np.ndarray:
+        """Fraction of each result's subject name tokens that occur in its text"""
+        relevance = np.zeros(len(texts))
+        subject_column = np.array(subjects, dtype=object)
+        for subject in set(subjects):
+            tokens = [token for token in TOKEN_PATTERN.findall(subject.lower()) if len(token) > 2]
+            if not tokens:
+                continue
+            rows = np.flatnonzero(subject_column == subject)
+            hits = sum((np.char.find(texts[rows], token) >= 0).astype(np.float64) for token in tokens)
+            relevance[rows] = hits / len(tokens)
+        return relevance
+
+    def score(self, results: Sequence, subject: str = '') -> np.ndarray:
+        if not results:
+            return np.zeros(0)
+        vector = self.weights.to_vector(self.source_names)
+        return np.clip(self.features(results, subject) @ vector, 0.0, 1.0)
+
+    def apply(self, results: Sequence, subject: str = ''):
+        """Set quality_score on every result in place"""
+        for result, score in zip(results, self.score(results, subject).tolist()):
+            result.quality_score = round(score, 4)
+
+    def calibrate(self, results: Sequence, labels: Sequence[float], subjects: Sequence[str],
+                  strength: float = 5.0) -> ScoringWeights:
+        """Fit weights to feedback labels (1 helpful, 0 not).
+
+        Ridge regression shrunk towards the current weights, so sparse feedback
+        nudges the defaults rather than replacing them.
+        """
+        X = self.features(results, list(subjects))
+        y = np.asarray(labels, dtype=np.float64)
+        prior = self.weights.to_vector(self.source_names)
+
+        regulariser = strength * np.eye(X.shape[1])
+        fitted = np.linalg.solve(X.T @ X + regulariser, X.T @ y + strength * prior)
+        self.weights = ScoringWeights.from_vector(fitted, self.source_names)
+        return self.weights
+
+
+def rerank(documents: List[Dict[str, Any]], quality_weight: float = 0.3) -> List[Dict[str, Any]]:
+    """Order retrieved documents by similarity blended with stored quality score"""
+    return sorted(
+        documents,
+        key=lambda doc: (1 - quality_weight) * doc.get('similarity', 0.0)
+                        + quality_weight * doc.get('quality_score', 0.0),
+        reverse=True
+    )
+
+
+def calibrate_from_feedback(args) -> bool:
+    from config import ResearchConfig
+    from research_result import ResearchResult
+    from storage import DocumentStore
+
+    config = ResearchConfig()
+    store = DocumentStore(config.doc_store_path)
+    samples = store.get_feedback_documents()
+    if len(samples) < args.min_samples:
+        print(f"Only {len(samples)} feedback samples; need at least {args.min_samples}")
+        return False
+
+    scorer = QualityScorer.load(config.scoring_weights_path)
+    before = scorer.weights
+    results = [ResearchResult.from_storage_row(sample) for sample in samples]
+    after = scorer.calibrate(
+        results,
+        [1.0 if sample['helpful'] else 0.0 for sample in samples],
+        [sample['character_name'] for sample in samples],
+        strength=args.strength
+    )
+    after.save(config.scoring_weights_path)
+
+    print(f"Calibrated on {len(samples)} feedback samples -> {config.scoring_weights_path}")
+    for name in FEATURES + ("other_source",):
+        print(f"  {name:<14} {getattr(before, name):+.3f} -> {getattr(after, name):+.3f}")
+    for name in sorted(after.sources):
+        print(f"  {name:<14} {before.sources.get(name, before.other_source):+.3f} -> {after.sources[name]:+.3f}")
+    return True
+
+
+def main():
+    import argparse
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Research result quality scoring")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate = subparsers.add_parser("calibrate", help="Fit scoring weights to stored chat feedback")
+    calibrate.add_argument("--strength", type=float, default=5.0,
+                           help="Pull towards the current weights; higher trusts feedback less")
+    calibrate.add_argument("--min-samples", type=int, default=20)
+    calibrate.set_defaults(func=calibrate_from_feedback)
+
+    args = parser.parse_args()
+    sys.exit(0 if args.func(args) else 1)
+
+
+if __name__ == "__main__":
+    main()
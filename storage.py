@@ -1,10 +1,20 @@
 import sqlite3
 import json
-import chromadb
-from typing import List, Dict, Any, Optional
+import hashlib
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set
 import logging
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+
+# chromadb and the embedding backends (numpy, torch/onnxruntime) are imported
+# on first use so that commands which never touch embeddings start quickly.
+
+
+def content_hash(title: str, content: str) -> str:
+    """Stable hash identifying a document's text"""
+    return hashlib.sha1(f"{title or ''}\n{content or ''}".encode('utf-8')).hexdigest()
+
 
 class DocumentStore:
     def __init__(self, db_path: str):
@@ -82,10 +92,63 @@ class DocumentStore:
                     quality_score REAL,
                     metadata TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    content_hash TEXT,
+                    FOREIGN KEY (character_id) REFERENCES characters (id)
+                )
+            ''')
+            self._migrate_content_hash(conn)
+            
+            # Results semantic dedup merged into a stored document, so later runs skip them
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS duplicate_documents (
+                    character_id INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, content_hash),
                     FOREIGN KEY (character_id) REFERENCES characters (id)
                 )
             ''')
             
+            # Queries run per character, so refreshes only re-fetch stale ones
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS research_queries (
+                    character_id INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    last_run TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    result_hash TEXT,
+                    results TEXT,
+                    PRIMARY KEY (character_id, source, query),
+                    FOREIGN KEY (character_id) REFERENCES characters (id)
+                )
+            ''')
+            
+            # Whether a document shown as a chat source was helpful; calibrates scoring
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS document_feedback (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    character_id INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    helpful INTEGER NOT NULL,
+                    chat_id INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (character_id) REFERENCES characters (id)
+                )
+            ''')
+            
+            # Built profile, its chat prompt scaffold, and the hash of the document set it was built from
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS character_profiles (
+                    character_id INTEGER PRIMARY KEY,
+                    profile TEXT NOT NULL,
+                    document_set_hash TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    prompt_scaffold TEXT,
+                    FOREIGN KEY (character_id) REFERENCES characters (id)
+                )
+            ''')
+            self._migrate_profile_scaffold(conn)
+            
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS chat_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -93,6 +156,25 @@ class DocumentStore:
                     user_message TEXT NOT NULL,
                     character_response TEXT NOT NULL,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    session_id TEXT NOT NULL DEFAULT 'default',
+                    provider TEXT,
+                    model TEXT,
+                    tokens_used INTEGER,
+                    latency_ms REAL,
+                    FOREIGN KEY (character_id) REFERENCES characters (id)
+                )
+            ''')
+            self._migrate_chat_history(conn)
+            
+            # Rolling summary of a conversation's turns up to last_turn_id
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS conversation_summaries (
+                    character_id INTEGER NOT NULL,
+                    session_id TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    last_turn_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (character_id, session_id),
                     FOREIGN KEY (character_id) REFERENCES characters (id)
                 )
             ''')
@@ -108,6 +190,45 @@ class DocumentStore:
             ''')
             conn.commit()
     
+    @staticmethod
+    def _migrate_content_hash(conn: sqlite3.Connection):
+        """Add and backfill documents.content_hash on databases created before it existed"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(documents)')}
+        if 'content_hash' not in columns:
+            conn.execute('ALTER TABLE documents ADD COLUMN content_hash TEXT')
+        
+        rows = conn.execute('SELECT id, title, content FROM documents WHERE content_hash IS NULL').fetchall()
+        if rows:
+            conn.executemany(
+                'UPDATE documents SET content_hash = ? WHERE id = ?',
+                [(content_hash(title, content), doc_id) for doc_id, title, content in rows]
+            )
+        conn.execute('''CREATE INDEX IF NOT EXISTS idx_documents_character_hash
+                        ON documents (character_id, content_hash)''')
+    
+    @staticmethod
+    def _migrate_chat_history(conn: sqlite3.Connection):
+        """Add the session and per-turn metric columns on databases created before them"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(chat_history)')}
+        for column, definition in (
+            ('session_id', "TEXT NOT NULL DEFAULT 'default'"),
+            ('provider', 'TEXT'),
+            ('model', 'TEXT'),
+            ('tokens_used', 'INTEGER'),
+            ('latency_ms', 'REAL'),
+        ):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE chat_history ADD COLUMN {column} {definition}')
+        conn.execute('''CREATE INDEX IF NOT EXISTS idx_chat_history_session
+                        ON chat_history (character_id, session_id, id)''')
+    
+    @staticmethod
+    def _migrate_profile_scaffold(conn: sqlite3.Connection):
+        """Add character_profiles.prompt_scaffold on databases created before it existed"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(character_profiles)')}
+        if 'prompt_scaffold' not in columns:
+            conn.execute('ALTER TABLE character_profiles ADD COLUMN prompt_scaffold TEXT')
+    
     def add_character(self, name: str) -> int:
         """Add a character and return their ID"""
         with sqlite3.connect(self.db_path) as conn:
@@ -125,15 +246,75 @@ class DocumentStore:
                 )
                 return cursor.fetchone()[0]
 
-    def add_chat_history(self, character_id: int, user_message: str, character_response: str) -> int:
+    def add_chat_history(self, character_id: int, user_message: str, character_response: str,
+                         session_id: str = 'default') -> int:
         """Add a chat history record"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.execute(
-                '''INSERT INTO chat_history (character_id, user_message, character_response)
-                   VALUES (?, ?, ?)''',
-                (character_id, user_message, character_response)
+                '''INSERT INTO chat_history (character_id, user_message, character_response, session_id)
+                   VALUES (?, ?, ?, ?)''',
+                (character_id, user_message, character_response, session_id)
             )
             return cursor.lastrowid
+    
+    def add_chat_turns(self, turns: List[Dict[str, Any]]) -> List[int]:
+        """Insert a batch of chat turns in one transaction and return their ids.
+
+        Each turn names its character; characters not stored yet are added.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            names = {turn['character_name'] for turn in turns}
+            conn.executemany('INSERT OR IGNORE INTO characters (name) VALUES (?)', [(name,) for name in names])
+            character_ids = {
+                name: conn.execute('SELECT id FROM characters WHERE name = ?', (name,)).fetchone()[0]
+                for name in names
+            }
+            ids = []
+            for turn in turns:
+                cursor = conn.execute(
+                    '''INSERT INTO chat_history
+                       (character_id, user_message, character_response, session_id,
+                        provider, model, tokens_used, latency_ms)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (character_ids[turn['character_name']], turn['user_message'], turn['character_response'],
+                     turn.get('session_id') or 'default', turn.get('provider'), turn.get('model'),
+                     turn.get('tokens_used'), turn.get('latency_ms'))
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+    
+    def get_chat_turns(self, character_id: int, session_id: str, after_id: int = 0,
+                       limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """The latest ``limit`` turns of a conversation after ``after_id`` (all when None), oldest first"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                '''SELECT id, user_message, character_response FROM chat_history
+                   WHERE character_id = ? AND session_id = ? AND id > ?
+                   ORDER BY id DESC
+                   LIMIT ?''',
+                (character_id, session_id, after_id, -1 if limit is None else limit)
+            )
+            return [dict(row) for row in reversed(cursor.fetchall())]
+    
+    def get_conversation_summary(self, character_id: int, session_id: str) -> Optional[Dict[str, Any]]:
+        """Rolling summary of a conversation and the last turn it covers"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                '''SELECT summary, last_turn_id FROM conversation_summaries
+                   WHERE character_id = ? AND session_id = ?''',
+                (character_id, session_id)
+            ).fetchone()
+            return dict(row) if row else None
+    
+    def save_conversation_summary(self, character_id: int, session_id: str, summary: str, last_turn_id: int):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO conversation_summaries
+                (character_id, session_id, summary, last_turn_id, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (character_id, session_id, summary, last_turn_id))
 
     def get_chat_history(self, character_id: int, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent chat history for a character"""
@@ -191,8 +372,8 @@ class DocumentStore:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.execute('''
                 INSERT INTO documents 
-                (character_id, title, content, url, source_type, quality_score, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                (character_id, title, content, url, source_type, quality_score, metadata, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 character_id,
                 document.get('title', ''),
@@ -200,7 +381,9 @@ class DocumentStore:
                 document.get('url', ''),
                 document.get('source_type', ''),
                 document.get('quality_score', 0.0),
-                json.dumps(document.get('metadata', {}))
+                json.dumps(document.get('metadata', {})),
+                document.get('content_hash') or content_hash(document.get('title', ''),
+                                                             document.get('content', ''))
             ))
             return cursor.lastrowid
     
@@ -222,43 +405,222 @@ class DocumentStore:
                 documents.append(doc)
             
             return documents
+    
+    def get_document_hashes(self, character_id: int) -> Set[str]:
+        """Content hashes of all documents stored for a character"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                'SELECT content_hash FROM documents WHERE character_id = ?',
+                (character_id,)
+            )
+            return {row[0] for row in cursor.fetchall() if row[0]}
+    
+    def get_duplicate_hashes(self, character_id: int) -> Set[str]:
+        """Content hashes of results merged into a character's stored documents"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                'SELECT content_hash FROM duplicate_documents WHERE character_id = ?',
+                (character_id,)
+            )
+            return {row[0] for row in cursor.fetchall()}
+    
+    def add_duplicate_hashes(self, character_id: int, hashes: List[str]):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO duplicate_documents (character_id, content_hash) VALUES (?, ?)',
+                [(character_id, document_hash) for document_hash in hashes]
+            )
+    
+    def get_document_set_hash(self, character_id: int) -> str:
+        """Hash of a character's whole document set, independent of insertion order"""
+        digest = hashlib.sha1()
+        for document_hash in sorted(self.get_document_hashes(character_id)):
+            digest.update(document_hash.encode('ascii'))
+        return digest.hexdigest()
+    
+    def add_document_feedback(self, character_id: int, url: str, helpful: bool,
+                              chat_id: Optional[int] = None) -> int:
+        """Record whether a document used in a chat answer was helpful"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                '''INSERT INTO document_feedback (character_id, url, helpful, chat_id)
+                   VALUES (?, ?, ?, ?)''',
+                (character_id, url, int(helpful), chat_id)
+            )
+            return cursor.lastrowid
+    
+    def get_feedback_documents(self) -> List[Dict[str, Any]]:
+        """Documents that received feedback, one row per feedback entry"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute('''
+                SELECT d.*, c.name AS character_name, f.helpful
+                FROM document_feedback f
+                JOIN documents d ON d.character_id = f.character_id AND d.url = f.url
+                JOIN characters c ON c.id = f.character_id
+            ''')
+            
+            documents = []
+            for row in cursor.fetchall():
+                doc = dict(row)
+                doc['metadata'] = json.loads(doc['metadata']) if doc['metadata'] else {}
+                documents.append(doc)
+            
+            return documents
+    
+    def get_research_query(self, character_id: int, source: str, query: str) -> Optional[Dict[str, Any]]:
+        """Get the last run of a research query, with its age in seconds"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute('''
+                SELECT *, (julianday('now') - julianday(last_run)) * 86400 AS age_seconds
+                FROM research_queries
+                WHERE character_id = ? AND source = ? AND query = ?
+            ''', (character_id, source, query))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            record = dict(row)
+            record['results'] = json.loads(record['results']) if record['results'] else []
+            return record
+    
+    def record_research_query(self, character_id: int, source: str, query: str,
+                              result_hash: str, results: List[Dict[str, Any]]):
+        """Record that a research query ran now, with its results and their hash"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO research_queries
+                (character_id, source, query, last_run, result_hash, results)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+            ''', (character_id, source, query, result_hash, json.dumps(results)))
+    
+    def get_character_profile(self, character_id: int) -> Optional[Dict[str, Any]]:
+        """Get the stored profile and the document set hash it was built from"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                'SELECT * FROM character_profiles WHERE character_id = ?',
+                (character_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            record = dict(row)
+            record['profile'] = json.loads(record['profile'])
+            return record
+    
+    def get_character_profile_by_name(self, character_name: str) -> Optional[Dict[str, Any]]:
+        """Stored profile and prompt scaffold for a character, in one read over the unique name index"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                '''SELECT p.character_id, p.profile, p.prompt_scaffold, p.document_set_hash
+                   FROM characters c JOIN character_profiles p ON p.character_id = c.id
+                   WHERE c.name = ?''',
+                (character_name,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = dict(row)
+            record['profile'] = json.loads(record['profile'])
+            return record
+    
+    def save_character_profile(self, character_id: int, profile: Dict[str, Any], document_set_hash: str,
+                               prompt_scaffold: Optional[str] = None):
+        """Store a character profile built from the given document set"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO character_profiles
+                (character_id, profile, document_set_hash, prompt_scaffold, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (character_id, json.dumps(profile), document_set_hash, prompt_scaffold))
 
 class VectorDatabase:
-    def __init__(self, db_path: str):
+    # Seconds before a failed embedding service is tried again, doubling per failure
+    service_retry_initial = 5.0
+    service_retry_max = 300.0
+    
+    def __init__(self, db_path: str, embedding_service_url: Optional[str] = None,
+                 embedding_backend: str = "sentence_transformers",
+                 model_cache_dir: Optional[str] = None,
+                 index_backend: str = "chroma",
+                 index_mode: str = "per_character"):
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        try:
-            self.client = chromadb.PersistentClient(path=db_path)
-            self.collections = {}
-        except Exception as e:
-            logging.error(f"Error initializing ChromaDB: {e}")
-            self.client = None
+        self.embedding_backend_name = embedding_backend
+        self.model_cache_dir = model_cache_dir
+        self.index_backend_name = index_backend
+        # "per_character": one collection per character; "unified": a single
+        # collection with character, source_type, language and domain as metadata
+        self.index_mode = index_mode
+        self._embedding_backend = None
+        self._index = None
+        self._init_lock = threading.Lock()
         
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Optional shared embedding service (see embedding_service.py)
+        self.embedding_service = None
+        self._service_retry_at = 0.0
+        self._service_backoff = 0.0
+        if embedding_service_url:
+            from embeddings import ServiceEmbeddingBackend
+            self.embedding_service = ServiceEmbeddingBackend(embedding_service_url)
     
-    def _get_collection(self, character_name: str):
-        """Get or create collection for character"""
-        if not self.client:
-            return None
-            
-        collection_name = f"character_{character_name.lower().replace(' ', '_')}"
-        
-        if collection_name not in self.collections:
+    @property
+    def index(self):
+        """Vector index backend (see vector_index.py), created on first use"""
+        if self._index is None:
+            with self._init_lock:
+                if self._index is None:
+                    from vector_index import create_vector_index
+                    self._index = create_vector_index(self.index_backend_name, self.db_path)
+        return self._index
+    
+    @property
+    def embedding_backend(self):
+        """Local embedding backend, loaded on first use"""
+        if self._embedding_backend is None:
+            with self._init_lock:
+                if self._embedding_backend is None:
+                    from embeddings import create_embedding_backend
+                    self._embedding_backend = create_embedding_backend(
+                        self.embedding_backend_name, cache_dir=self.model_cache_dir
+                    )
+        return self._embedding_backend
+    
+    def embed(self, texts: List[str]):
+        """Embed texts as a float32 matrix, preferring the shared service when configured"""
+        if self.embedding_service and time.monotonic() >= self._service_retry_at:
             try:
-                self.collections[collection_name] = self.client.get_or_create_collection(
-                    name=collection_name
-                )
+                embeddings = self.embedding_service.embed(texts)
+                self._service_backoff = 0.0
+                return embeddings
             except Exception as e:
-                logging.error(f"Error creating collection for {character_name}: {e}")
-                return None
+                # Only calls until the next retry use the local model; the service is
+                # tried again afterwards, so a restart does not leave workers on it
+                self._service_backoff = min(self._service_backoff * 2 or self.service_retry_initial,
+                                            self.service_retry_max)
+                self._service_retry_at = time.monotonic() + self._service_backoff
+                logging.warning(f"Embedding service unavailable, using local model for "
+                                f"{self._service_backoff:.0f}s: {e}")
         
-        return self.collections.get(collection_name)
+        return self.embedding_backend.embed(texts)
+    
+    @property
+    def unified(self) -> bool:
+        return self.index_mode == "unified"
     
-    def add_documents(self, character_name: str, documents: List[Dict[str, Any]]):
-        """Add documents to vector database"""
-        collection = self._get_collection(character_name)
-        if not collection:
+    def _collection_for(self, character_name: str) -> str:
+        from vector_index import UNIFIED_COLLECTION
+        return UNIFIED_COLLECTION if self.unified else character_name
+    
+    def add_documents(self, character_name: str, documents: List[Any],
+                      embeddings: Optional[Any] = None):
+        """Add documents (dicts or ResearchResult records) to vector database.
+        
+        Precomputed embeddings, if given, are reused instead of re-embedding.
+        """
+        if not documents:
             return
         
         try:
@@ -266,62 +628,110 @@ class VectorDatabase:
             metadatas = []
             ids = []
             
-            for i, doc in enumerate(documents):
-                # Combine title and content for embedding
-                text = f"{doc.get('title', '')} {doc.get('content', doc.get('abstract', ''))}"
+            for doc in documents:
+                if hasattr(doc, 'to_vector_payload'):
+                    # ResearchResult records carry their own text and metadata
+                    text, metadata = doc.to_vector_payload(character_name)
+                else:
+                    # Combine title and content for embedding
+                    text = f"{doc.get('title', '')} {doc.get('content', doc.get('abstract', ''))}"
+                    
+                    # Prepare metadata (filterable fields must not be None)
+                    doc_metadata = doc.get('metadata') or {}
+                    metadata = {
+                        'character': character_name,
+                        'title': doc.get('title', ''),
+                        'source_type': doc.get('source_type', '') or '',
+                        'language': doc_metadata.get('language') or doc.get('language') or '',
+                        'domain': doc_metadata.get('domain') or '',
+                        'url': doc.get('url', ''),
+                        'quality_score': doc.get('quality_score', 0.0)
+                    }
                 texts.append(text)
-                
-                # Prepare metadata
-                metadata = {
-                    'title': doc.get('title', ''),
-                    'source_type': doc.get('source_type', ''),
-                    'url': doc.get('url', ''),
-                    'quality_score': doc.get('quality_score', 0.0)
-                }
                 metadatas.append(metadata)
                 
-                # Create unique ID
-                ids.append(f"{character_name}_{i}_{hash(text) % 10000}")
+                # Stable ID so re-adding the same text is a no-op
+                ids.append(f"{character_name}_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}")
             
-            # Add to collection
-            collection.add(
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
+            if embeddings is None or len(embeddings) != len(texts):
+                embeddings = self.embed(texts)
+            self.index.add(self._collection_for(character_name), ids, embeddings, texts, metadatas)
             
             logging.info(f"Added {len(documents)} documents to vector DB for {character_name}")
             
         except Exception as e:
             logging.error(f"Error adding documents to vector DB: {e}")
     
+    @staticmethod
+    def _format_hits(hits) -> List[Dict[str, Any]]:
+        documents = []
+        for doc, metadata, score in hits:
+            documents.append({
+                'content': doc,
+                'title': metadata.get('title', ''),
+                'character': metadata.get('character', ''),
+                'source_type': metadata.get('source_type', ''),
+                'language': metadata.get('language', ''),
+                'domain': metadata.get('domain', ''),
+                'url': metadata.get('url', ''),
+                'quality_score': metadata.get('quality_score', 0.0),
+                'similarity': score
+            })
+        return documents
+    
     def search_similar(self, character_name: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for similar documents"""
-        collection = self._get_collection(character_name)
-        if not collection:
+        try:
+            return self.search_by_embedding(character_name, self.embed([query])[0], limit)
+            
+        except Exception as e:
+            logging.error(f"Error searching vector DB: {e}")
             return []
+    
+    def search_by_embedding(self, character_name: str, embedding, limit: int = 5) -> List[Dict[str, Any]]:
+        """A character's documents nearest to an embedding"""
+        where = {'character': character_name} if self.unified else None
+        hits = self.index.query(self._collection_for(character_name), embedding, limit, where=where)
+        return self._format_hits(hits)
+    
+    def search_across_characters(self, query: str, characters: Optional[List[str]] = None,
+                                 source_type: Optional[str] = None, language: Optional[str] = None,
+                                 domain: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search documents of several (or, in unified mode, all) characters at once.
+        
+        In unified mode this is a single filtered ANN query. In per-character
+        mode ``characters`` is required and each collection is queried in turn.
+        """
+        where = {}
+        if characters:
+            where['character'] = list(characters)
+        if source_type:
+            where['source_type'] = source_type
+        if language:
+            where['language'] = language
+        if domain:
+            where['domain'] = domain
         
         try:
-            results = collection.query(
-                query_texts=[query],
-                n_results=limit
-            )
+            embedding = self.embed([query])[0]
             
-            # Format results
-            documents = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i] if results['metadatas'][0] else {}
-                    documents.append({
-                        'content': doc,
-                        'title': metadata.get('title', ''),
-                        'source_type': metadata.get('source_type', ''),
-                        'url': metadata.get('url', ''),
-                        'quality_score': metadata.get('quality_score', 0.0)
-                    })
+            if self.unified:
+                from vector_index import UNIFIED_COLLECTION
+                hits = self.index.query(UNIFIED_COLLECTION, embedding, limit, where=where or None)
+            else:
+                if not characters:
+                    logging.warning("search_across_characters needs a character list in per_character mode")
+                    return []
+                where.pop('character', None)
+                hits = []
+                for character_name in characters:
+                    for doc, metadata, score in self.index.query(character_name, embedding, limit,
+                                                                 where=where or None):
+                        hits.append((doc, {**metadata, 'character': character_name}, score))
+                hits = sorted(hits, key=lambda hit: hit[2], reverse=True)[:limit]
             
-            return documents
+            return self._format_hits(hits)
             
         except Exception as e:
-            logging.error(f"Error searching vector DB: {e}")
-            return []
\ No newline at end of file
+            logging.error(f"Error searching across characters: {e}")
+            return []
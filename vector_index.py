@@ -0,0 +1,274 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (document text, metadata, similarity score)
+SearchHit = Tuple[str, Dict[str, Any], float]
+
+# Collection shared by all characters in unified index mode
+UNIFIED_COLLECTION = "all_characters"
+
+
+class VectorIndex:
+    """Storage backend for embeddings, grouped into named collections.
+
+    A collection is either one character (per-character mode) or
+    UNIFIED_COLLECTION. ``where`` filters on metadata fields and maps each
+    field to a value or a list of accepted values.
+    """
+
+    name = "base"
+
+    def add(self, collection: str, ids: List[str], embeddings: np.ndarray,
+            documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def query(self, collection: str, embedding: np.ndarray, limit: int = 5,
+              where: Optional[Dict[str, Any]] = None) -> List[SearchHit]:
+        raise NotImplementedError
+
+
+class ChromaVectorIndex(VectorIndex):
+    """ChromaDB persistent client with one collection per character"""
+
+    name = "chroma"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.collections = {}
+        self._client = None
+        self._client_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """ChromaDB client, created on first use"""
+        if self._client is None and not self._client_failed:
+            with self._lock:
+                if self._client is None and not self._client_failed:
+                    try:
+                        import chromadb
+                        self._client = chromadb.PersistentClient(path=self.db_path)
+                    except Exception as e:
+                        logging.error(f"Error initializing ChromaDB: {e}")
+                        self._client_failed = True
+        return self._client
+
+    def _get_collection(self, collection: str):
+        """Get or create a Chroma collection"""
+        if not self.client:
+            return None
+
+        if collection == UNIFIED_COLLECTION:
+            collection_name = UNIFIED_COLLECTION
+        else:
+            collection_name = f"character_{collection.lower().replace(' ', '_')}"
+
+        if collection_name not in self.collections:
+            try:
+                self.collections[collection_name] = self.client.get_or_create_collection(
+                    name=collection_name
+                )
+            except Exception as e:
+                logging.error(f"Error creating collection for {collection}: {e}")
+                return None
+
+        return self.collections.get(collection_name)
+
+    @staticmethod
+    def _to_chroma_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not where:
+            return None
+        conditions = []
+        for field, value in where.items():
+            if isinstance(value, (list, tuple, set)):
+                conditions.append({field: {"$in": list(value)}})
+            else:
+                conditions.append({field: value})
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def add(self, collection_key, ids, embeddings, documents, metadatas):
+        collection = self._get_collection(collection_key)
+        if not collection:
+            return
+
+        collection.add(
+            embeddings=embeddings.tolist(),
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def query(self, collection_key, embedding, limit=5, where=None):
+        collection = self._get_collection(collection_key)
+        if not collection:
+            return []
+
+        results = collection.query(
+            query_embeddings=[embedding.tolist()],
+            n_results=limit,
+            where=self._to_chroma_where(where)
+        )
+
+        hits = []
+        if results['documents'] and results['documents'][0]:
+            distances = results.get('distances') or [[]]
+            for i, doc in enumerate(results['documents'][0]):
+                metadata = results['metadatas'][0][i] if results['metadatas'][0] else {}
+                distance = distances[0][i] if i < len(distances[0]) else 0.0
+                # Squared L2 between unit vectors maps to cosine similarity as 1 - d/2
+                hits.append((doc, metadata or {}, 1.0 - distance / 2))
+        return hits
+
+
+class NumpyVectorIndex(VectorIndex):
+    """In-process index: one contiguous float32 matrix per collection.
+
+    Each collection has a directory holding ``vectors.npy`` (row-normalised,
+    memory-mapped on read) and ``records.json`` (ids, texts and metadata in
+    row order). Queries are a single matrix-vector product plus a partial
+    sort, which beats a client/server round trip for small corpora.
+    """
+
+    name = "numpy"
+
+    def __init__(self, root_path: str):
+        self.root = Path(root_path)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _collection_dir(self, collection: str) -> Path:
+        slug = re.sub(r'[^a-z0-9]+', '_', collection.lower()).strip('_') or 'collection'
+        digest = hashlib.sha1(collection.encode('utf-8')).hexdigest()[:8]
+        return self.root / f"{slug}_{digest}"
+
+    def _load(self, collection: str) -> Optional[Dict[str, Any]]:
+        """Load (and cache) a collection's matrix and records"""
+        cached = self._cache.get(collection)
+        if cached is not None:
+            return cached
+
+        directory = self._collection_dir(collection)
+        vectors_path = directory / "vectors.npy"
+        records_path = directory / "records.json"
+        if not vectors_path.exists() or not records_path.exists():
+            return None
+
+        matrix = np.load(vectors_path, mmap_mode='r')
+        with open(records_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        entry = {
+            'matrix': matrix,
+            'records': records,
+            'ids': {record['id'] for record in records},
+            'columns': {},  # Metadata field -> object array, built on first filter
+        }
+        self._cache[collection] = entry
+        return entry
+
+    def _filter_mask(self, entry: Dict[str, Any], where: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a metadata filter"""
+        mask = np.ones(len(entry['records']), dtype=bool)
+        for field, value in where.items():
+            column = entry['columns'].get(field)
+            if column is None:
+                column = np.array([r['metadata'].get(field) for r in entry['records']], dtype=object)
+                entry['columns'][field] = column
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            mask &= np.isin(column, values)
+        return mask
+
+    def add(self, collection, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.clip(norms, 1e-12, None)
+
+        with self._lock:
+            existing = self._load(collection)
+            known_ids = existing['ids'] if existing else set()
+
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in known_ids]
+            if not keep:
+                return
+            new_records = [
+                {'id': ids[i], 'document': documents[i], 'metadata': metadatas[i]} for i in keep
+            ]
+
+            if existing:
+                matrix = np.concatenate([np.asarray(existing['matrix']), vectors[keep]])
+                records = existing['records'] + new_records
+            else:
+                matrix = vectors[keep]
+                records = new_records
+            existing = None  # Release the memory map before replacing its file
+
+            directory = self._collection_dir(collection)
+            directory.mkdir(parents=True, exist_ok=True)
+
+            # Write to temporary files and swap them in so readers never see a partial index
+            tmp_vectors = directory / "vectors.tmp.npy"
+            tmp_records = directory / "records.json.tmp"
+            np.save(tmp_vectors, np.ascontiguousarray(matrix, dtype=np.float32))
+            with open(tmp_records, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            self._cache.pop(collection, None)
+            os.replace(tmp_vectors, directory / "vectors.npy")
+            os.replace(tmp_records, directory / "records.json")
+
+    def query(self, collection, embedding, limit=5, where=None):
+        entry = self._load(collection)
+        if entry is None:
+            return []
+        matrix, records = entry['matrix'], entry['records']
+        if len(records) == 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if where:
+            candidates = np.flatnonzero(self._filter_mask(entry, where))
+            if len(candidates) == 0:
+                return []
+            scores = np.full(len(records), -np.inf, dtype=np.float32)
+            scores[candidates] = matrix[candidates] @ query
+            available = len(candidates)
+        else:
+            scores = matrix @ query
+            available = len(records)
+
+        limit = min(limit, available)
+        if limit < len(records):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(records))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (records[i]['document'], records[i]['metadata'], float(scores[i])) for i in top
+        ]
+
+
+VECTOR_INDEX_BACKENDS = {
+    ChromaVectorIndex.name: ChromaVectorIndex,
+    NumpyVectorIndex.name: NumpyVectorIndex,
+}
+
+
+def create_vector_index(name: str, db_path: str) -> VectorIndex:
+    """Create a vector index backend by name"""
+    if name not in VECTOR_INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector index backend: {name}. "
+                         f"Available: {', '.join(VECTOR_INDEX_BACKENDS)}")
+
+    if name == NumpyVectorIndex.name:
+        return NumpyVectorIndex(str(Path(db_path) / "numpy_index"))
+    return ChromaVectorIndex(db_path)